@@ -1,198 +1,328 @@
 import customtkinter as ctk
 from customtkinter import CTkFont
 from CTkMessagebox import CTkMessagebox
-from tkinter import ttk
-import mysql.connector
-from mysql.connector import Error
-import re
+from tkinter import filedialog, ttk
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import queue
+import sys
+import threading
+import time
+
+from classroom_connect.config import DB_POOL_SIZE, INTAKE_JOURNAL, INTAKE_QUEUE
+from classroom_connect.export import export_donations, export_withdrawals
+from classroom_connect.importer import import_donations
+from classroom_connect.reports import PERIODS, period_range
+from classroom_connect.validation import DONATION_FIELDS, validate_donations
+
+# Process start, used to report how long the window takes to become usable
+STARTED_AT = time.perf_counter()
+
+# Pause in typing before the donation filters are applied
+FILTER_DELAY_MS = 300
+
+# How often the open page checks whether another station changed the data
+AUTO_REFRESH_MS = 3000
+
+# Border of a donation form entry that failed validation
+INVALID_BORDER_COLOR = "#e03131"
+
+# Seconds quit_app waits for queued donations to reach the database
+INTAKE_FLUSH_TIMEOUT = 10
 
 # Admin authentication credentials
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "admin123"
 
-class DatabaseConnection:
-    # Database connection manager with automatic cleanup
-    def __init__(self):
-        self.connection = None
-        try:
-            self.connection = mysql.connector.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="schoolsuppliesdonationdb"
-            )
-            if self.connection.is_connected():
-                print("Successfully connected to the database")
-        except Error as e:
-            print(f"Error connecting to database: {e}")
-            raise Exception(f"Database connection failed: {e}")
-            
-    def __del__(self):
-        if hasattr(self, 'connection') and self.connection and self.connection.is_connected():
-            self.connection.close()
-            print("Database connection closed")
-
-    def update_supply_quantity(self, supply_name, quantity):
-        try:
-            cursor = self.connection.cursor()
-            check_query = "SELECT quantity FROM supplies WHERE supply_name = %s"
-            cursor.execute(check_query, (supply_name,))
-            result = cursor.fetchone()
-            
-            if result:
-                update_query = """
-                    UPDATE supplies 
-                    SET quantity = quantity + %s 
-                    WHERE supply_name = %s
-                """
-                cursor.execute(update_query, (quantity, supply_name))
-            else:
-                insert_query = """
-                    INSERT INTO supplies (supply_name, quantity) 
-                    VALUES (%s, %s)
-                """
-                cursor.execute(insert_query, (supply_name, quantity))
-            
-            self.connection.commit()
-            return True
-        except Error as e:
-            print(f"Error: {e}")
-            return False
-        finally:
-            cursor.close()
-
-    def get_all_supplies(self):
-        try:
-            cursor = self.connection.cursor()
-            query = "SELECT supply_name, quantity FROM supplies ORDER BY supply_name"
-            cursor.execute(query)
-            return cursor.fetchall()
-        except Error as e:
-            print(f"Error: {e}")
-            return []
-        finally:
-            cursor.close()
-
-    def get_supply_id(self, supply_name):
-        try:
-            cursor = self.connection.cursor()
-            query = "SELECT id FROM supplies WHERE supply_name = %s"
-            cursor.execute(query, (supply_name,))
-            result = cursor.fetchone()
-            return result[0] if result else None
-        finally:
-            cursor.close()
-
-    def add_donation(self, donor_name, contact_info, barangay, city, province, supply_name, quantity):
-        try:
-            cursor = self.connection.cursor()
-            supply_id = self.get_supply_id(supply_name)
-            if not supply_id:
-                cursor.execute("""
-                    INSERT INTO supplies (supply_name, quantity) 
-                    VALUES (%s, 0)
-                """, (supply_name,))
-                self.connection.commit()
-                supply_id = cursor.lastrowid
-
-            cursor.execute("""
-                UPDATE supplies 
-                SET quantity = quantity + %s 
-                WHERE id = %s
-            """, (quantity, supply_id))
-
-            full_address = f"{barangay}, {city}, {province}" if barangay else f"{city}, {province}"
-
-            cursor.execute("""
-                INSERT INTO donations 
-                (donor_name, contact_info, address, supply_id, quantity) 
-                VALUES (%s, %s, %s, %s, %s)
-            """, (donor_name, contact_info, full_address, supply_id, quantity))
-            
-            self.connection.commit()
-            return True
-        except Error as e:
-            print(f"Error: {e}")
-            return False
-        finally:
-            cursor.close()
+def connect_database():
+    # The driver is imported here, on a loader thread, so it doesn't hold up the first window.
+    # Opening the intake queue also replays donations a crash left in its journal.
+    from classroom_connect.database import DatabaseConnection
+    db = DatabaseConnection()
+    intake = None
+    if INTAKE_QUEUE:
+        from classroom_connect.intake import IntakeQueue
+        intake = IntakeQueue(db, INTAKE_JOURNAL)
+    return db, intake
+
+class BackgroundLoader:
+    # Runs database calls on worker threads and hands the results back on the Tk main loop
+    def __init__(self, root, workers=DB_POOL_SIZE, poll_interval=50):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-loader")
+        self.results = queue.Queue()
+        self.jobs = {}
+        self._poll = self.root.after(self.poll_interval, self._drain)
+
+    def submit(self, owner, fn, on_done, loading_label=None, on_error=None):
+        """Run fn() off the UI thread and call on_done(result) on it once finished.
+
+        Each owner (usually a page) has at most one request running. Submitting again while
+        one is running replaces any queued request, so repeated clicks collapse into one rerun.
+        """
+        job = self.jobs.setdefault(owner, {"generation": 0, "running": False, "request": None, "pending": None})
+        if job["running"]:
+            job["pending"] = (fn, on_done, loading_label, on_error)
+            return
+        self._start(owner, job, (fn, on_done, loading_label, on_error))
 
-    def get_all_donations(self):
-        try:
-            cursor = self.connection.cursor()
-            query = """
-                SELECT d.donor_name, d.contact_info, d.address, s.supply_name, d.quantity 
-                FROM donations d
-                JOIN supplies s ON d.supply_id = s.id
-                ORDER BY d.donor_name
-            """
-            cursor.execute(query)
-            return cursor.fetchall()
-        except Error as e:
-            print(f"Error: {e}")
-            return []
-        finally:
-            cursor.close()
-
-    def withdraw_supply(self, supply_name, quantity):
-        try:
-            cursor = self.connection.cursor()
-            check_query = "SELECT quantity FROM supplies WHERE supply_name = %s"
-            cursor.execute(check_query, (supply_name,))
-            result = cursor.fetchone()
-            
-            if not result:
-                return False, "Supply not found"
-            
-            current_quantity = result[0]
-            if current_quantity < quantity:
-                return False, "Not enough supply available"
-            
-            update_query = """
-                UPDATE supplies 
-                SET quantity = quantity - %s 
-                WHERE supply_name = %s
-            """
-            cursor.execute(update_query, (quantity, supply_name))
-            self.connection.commit()
-            return True, "Withdrawal successful"
-        except Error as e:
-            print(f"Error: {e}")
-            return False, str(e)
-        finally:
-            cursor.close()
-
-    def record_withdrawal(self, supply_id, quantity):
+    def cancel(self, owner):
+        """Drop any running or queued request of owner, its result will be ignored"""
+        job = self.jobs.get(owner)
+        if not job or not job["running"]:
+            return
+        job["generation"] += 1
+        job["running"] = False
+        job["pending"] = None
+        self._set_loading(job["request"][2], False)
+
+    def is_busy(self, owner):
+        job = self.jobs.get(owner)
+        return bool(job and job["running"])
+
+    def shutdown(self):
+        self.root.after_cancel(self._poll)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, owner, job, request):
+        job["generation"] += 1
+        job["running"] = True
+        job["request"] = request
+        self._set_loading(request[2], True)
+        self.executor.submit(self._run, owner, job["generation"], request[0])
+
+    def _run(self, owner, generation, fn):
+        # Worker thread: never touch Tk here, only the results queue
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("""
-                INSERT INTO withdrawals (supply_id, quantity)
-                VALUES (%s, %s)
-            """, (supply_id, quantity))
-            self.connection.commit()
-            return True
-        except Error as e:
-            print(f"Error: {e}")
-            return False
-        finally:
-            cursor.close()
+            self.results.put((owner, generation, fn(), None))
+        except Exception as e:
+            self.results.put((owner, generation, None, e))
 
-    def get_all_withdrawals(self):
-        try:
-            cursor = self.connection.cursor()
-            query = """
-                SELECT s.supply_name, w.quantity, w.withdrawal_date 
-                FROM withdrawals w
-                JOIN supplies s ON w.supply_id = s.id
-                ORDER BY w.withdrawal_date DESC
-            """
-            cursor.execute(query)
-            return cursor.fetchall()
-        except Error as e:
-            print(f"Error: {e}")
-            return []
-        finally:
-            cursor.close()
+    def _drain(self):
+        while True:
+            try:
+                owner, generation, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            job = self.jobs.get(owner)
+            if not job or generation != job["generation"]:
+                continue  # Cancelled or superseded
+            job["running"] = False
+            fn, on_done, loading_label, on_error = job["request"]
+            if job["pending"]:
+                # A newer request arrived meanwhile, its result supersedes this one
+                pending, job["pending"] = job["pending"], None
+                self._start(owner, job, pending)
+                continue
+            self._set_loading(loading_label, False)
+            if error is not None and on_error is not None:
+                on_error(error)
+            elif error is not None:
+                # No handler of its own: log it and tell the user where the result would have shown
+                print(f"Error: {error}", file=sys.stderr)
+                CTkMessagebox(title="Error", message=f"Loading failed: {error}", icon="cancel")
+            else:
+                on_done(result)
+        self._poll = self.root.after(self.poll_interval, self._drain)
+
+    def _set_loading(self, label, loading):
+        if label is not None:
+            label.configure(text="Loading..." if loading else "")
+
+class TableBinding:
+    # Keeps a Treeview in step with query results by primary key, touching only rows that changed
+    def __init__(self, tree, key_of, values_of=lambda row: row):
+        self.tree = tree
+        self.key_of = key_of        # key_of(row) -> primary key, used as the Treeview item id
+        self.values_of = values_of  # values_of(row) -> the displayed column values
+        self.values = {}            # item id -> values currently shown
+        self.order = []             # item ids in display order
+
+    def update(self, rows):
+        """Show exactly these rows, applying only the inserts, updates and deletes needed"""
+        new_values = {}
+        new_order = []
+        for row in rows:
+            key = str(self.key_of(row))
+            new_values[key] = tuple(self.values_of(row))
+            new_order.append(key)
+        anchor = self._top_row()
+
+        removed = [key for key in self.order if key not in new_values]
+        if removed:
+            self.tree.delete(*removed)
+
+        # Rows whose sort position changed are moved, the rest keep their relative order
+        kept = [key for key in self.order if key in new_values]
+        existing = [key for key in new_order if key in self.values]
+        if kept != existing:
+            for index, key in enumerate(existing):
+                self.tree.move(key, "", index)
+
+        for index, key in enumerate(new_order):
+            values = new_values[key]
+            if key not in self.values:
+                self.tree.insert("", index, iid=key, values=values)
+            elif self.values[key] != values:
+                self.tree.item(key, values=values)
+
+        self.values = new_values
+        self.order = new_order
+        self._scroll_to(anchor)
+
+    def append(self, rows):
+        self._insert(rows, len(self.order))
+
+    def prepend(self, rows):
+        self._insert(rows, 0)
+
+    def remove(self, rows):
+        keys = [str(self.key_of(row)) for row in rows]
+        if not keys:
+            return
+        self.tree.delete(*keys)
+        dropped = set(keys)
+        self.order = [key for key in self.order if key not in dropped]
+        for key in keys:
+            del self.values[key]
+
+    def _insert(self, rows, index):
+        keys = []
+        for offset, row in enumerate(rows):
+            key = str(self.key_of(row))
+            values = tuple(self.values_of(row))
+            self.tree.insert("", index + offset, iid=key, values=values)
+            self.values[key] = values
+            keys.append(key)
+        self.order[index:index] = keys
+
+    def _top_row(self):
+        # First visible row, so the view can be kept on it while rows above change
+        if not self.order:
+            return None
+        index = min(int(float(self.tree.yview()[0]) * len(self.order) + 0.5), len(self.order) - 1)
+        return self.order[index]
+
+    def _scroll_to(self, key):
+        if key in self.values:
+            self.tree.yview_moveto(self.order.index(key) / len(self.order))
+
+class PagedTreeview:
+    # Virtual scrolling for a Treeview: only a sliding window of pages around the viewport is loaded
+    def __init__(self, tree, scrollbar, loader, owner, fetch_page, key_of, loading_label=None, page_size=100, max_pages=4,
+                 descending=False):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.loader = loader
+        self.owner = owner            # Page the background fetches are submitted for
+        self.fetch_page = fetch_page  # fetch_page(after, limit, backward, inclusive) -> rows with the id first
+        self.key_of = key_of          # key_of(row) -> keyset key used to fetch the neighbouring page
+        self.descending = descending  # Whether fetch_page returns rows by key from highest to lowest
+        self.loading_label = loading_label
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.pages = []
+        self.at_start = True
+        self.at_end = True
+        self.rows = TableBinding(tree, key_of=lambda row: row[0], values_of=lambda row: row[1:])
+        self.tree.configure(yscrollcommand=self._on_scroll)
+
+    def reload(self):
+        """Re-read the loaded window in place, or the first page if nothing is loaded yet"""
+        if self.pages and not self.at_start:
+            start = self.key_of(self.pages[0][0])
+        else:
+            start = None
+        limit = max(sum(len(page) for page in self.pages), self.page_size)
+        self._submit(lambda: self.fetch_page(start, limit, False, True), lambda rows: self._show_window(rows, start, limit))
+
+    def restart(self):
+        """Load the first page from scratch, e.g. after the filters behind fetch_page changed"""
+        self._submit(lambda: self.fetch_page(None, self.page_size, False, False), self._show_first_page)
+
+    def add_rows(self, rows):
+        """Place rows written since the window was loaded. Those that sort inside the loaded window
+        go in where they belong, the others are left for the page fetch that reaches them."""
+        loaded = [row for page in self.pages for row in page]
+        shown = {row[0] for row in loaded}
+        first = None if self.at_start or not loaded else self.key_of(loaded[0])
+        last = None if self.at_end or not loaded else self.key_of(loaded[-1])
+        for row in rows:
+            key = self.key_of(row)
+            if row[0] in shown or (first is not None and self._before(key, first)) \
+                    or (last is not None and not self._before(key, last)):
+                continue
+            index = next((i for i, other in enumerate(loaded) if self._before(key, self.key_of(other))), len(loaded))
+            loaded.insert(index, row)
+            shown.add(row[0])
+        self.rows.update(loaded)
+        self.pages = [loaded[i:i + self.page_size] for i in range(0, len(loaded), self.page_size)]
+
+    def _before(self, key, other):
+        # Whether a row with key is listed before one with other
+        return key > other if self.descending else key < other
+
+    def _submit(self, fn, on_done):
+        self.loader.submit(self.owner, fn, on_done, self.loading_label)
+
+    def _show_first_page(self, rows):
+        self._show_window(rows, None, self.page_size)
+        self.tree.yview_moveto(0)
+
+    def _show_window(self, rows, start, limit):
+        self.rows.update(rows)
+        self.pages = [rows[i:i + self.page_size] for i in range(0, len(rows), self.page_size)]
+        self.at_start = start is None or not self.pages
+        self.at_end = len(rows) < limit
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self.loader.is_busy(self.owner) or not self.pages:
+            return
+        first, last = float(first), float(last)
+        if last >= 0.9 and not self.at_end:
+            after = self.key_of(self.pages[-1][-1])
+            self._submit(lambda: self.fetch_page(after, self.page_size, False), self._append_page)
+        elif first <= 0.1 and not self.at_start:
+            before = self.key_of(self.pages[0][0])
+            self._submit(lambda: self.fetch_page(before, self.page_size, True), self._prepend_page)
+
+    def _top_index(self):
+        total = len(self.rows.order)
+        return round(float(self.tree.yview()[0]) * total)
+
+    def _append_page(self, rows):
+        self.at_end = len(rows) < self.page_size
+        if not rows:
+            return
+        top = self._top_index()
+        self.rows.append(rows)
+        self.pages.append(rows)
+        if len(self.pages) > self.max_pages:
+            dropped = self.pages.pop(0)
+            self.rows.remove(dropped)
+            self.at_start = False
+            top -= len(dropped)
+        self._restore_top(top)
+
+    def _prepend_page(self, rows):
+        self.at_start = len(rows) < self.page_size
+        if not rows:
+            return
+        top = self._top_index()
+        self.rows.prepend(rows)
+        self.pages.insert(0, rows)
+        if len(self.pages) > self.max_pages:
+            self.rows.remove(self.pages.pop())
+            self.at_end = False
+        self._restore_top(top + len(rows))
+
+    def _restore_top(self, index):
+        # Keep the rows the user was looking at in place after pages were added or dropped
+        total = len(self.rows.order)
+        if total:
+            self.tree.yview_moveto(max(index, 0) / total)
 
 class MainApp:
     def __init__(self, root):
@@ -204,14 +334,22 @@ class MainApp:
         # Configure dark mode appearance
         ctk.set_appearance_mode("dark")
         ctk.set_default_color_theme("blue")
-        
-        # Initialize database and UI framework
-        try:
-            self.db = DatabaseConnection()
-        except Exception as e:
-            error_label = ctk.CTkLabel(root, text=f"Error connecting to database: {e}")
-            error_label.pack(pady=20)
-            return
+
+        # Database calls for the pages run in the background so slow queries never freeze the window
+        self.loader = BackgroundLoader(root)
+        self.current_frame = None
+
+        # The connection is opened in the background, pages wait for it through get_db()
+        self.db = None
+        self.intake = None  # Write-behind donation queue, when enabled in the config
+        self.db_error = None
+        self.db_ready = threading.Event()
+        self.startup_times = {}
+        self.change_version = None  # Last database write version seen by the auto-refresh poll
+
+        # Connection status along the bottom of the window
+        self.status_bar = ctk.CTkLabel(root, text="Connecting to database...", anchor="w")
+        self.status_bar.pack(side="bottom", fill="x", padx=10)
         
         # Initialize frame management system
         self.container = ctk.CTkFrame(root)
@@ -219,28 +357,119 @@ class MainApp:
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
         
-        # Register all application pages
+        # Pages are built the first time they are shown
         self.frames = {}
         
-        for F in (MainMenu, DonationPage, SuppliesPage, LoginPage, AdminPage, DonationsViewPage, WithdrawalPage, WithdrawalRecordsPage):
-            frame = F(self.container, self)
-            self.frames[F] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
-        
         self.show_frame(MainMenu)
+        self.loader.submit("database", connect_database, self.on_db_connected, on_error=self.on_db_failed)
+        self.root.after_idle(self.on_window_ready)
+        self._refresh_job = self.root.after(AUTO_REFRESH_MS, self.poll_changes)
+
+    def on_window_ready(self):
+        self.startup_times["window_ready_ms"] = (time.perf_counter() - STARTED_AT) * 1000
+        print(f"Window ready {self.startup_times['window_ready_ms']:.0f} ms after start")
+
+    def on_db_connected(self, result):
+        self.db, self.intake = result
+        self.db_ready.set()
+        self.startup_times["db_connected_ms"] = (time.perf_counter() - STARTED_AT) * 1000
+        print(f"Database connected {self.startup_times['db_connected_ms']:.0f} ms after start")
+        self.status_bar.configure(text="Connected to database")
+
+    def on_db_failed(self, error):
+        self.db_error = error
+        self.db_ready.set()
+        self.status_bar.configure(text=f"Error connecting to database: {error}")
+
+    def get_db(self):
+        """The database connection for background jobs, waits until the startup connect has finished"""
+        self.db_ready.wait()
+        if self.db is None:
+            raise Exception(f"Database connection failed: {self.db_error}")
+        return self.db
+
+    def check_db(self):
+        """For actions run on the UI thread: True if connected, otherwise tells the user why not"""
+        if self.db is not None:
+            return True
+        if self.db_error is not None:
+            message = f"Error connecting to database: {self.db_error}"
+        else:
+            message = "Still connecting to the database, please try again in a moment."
+        CTkMessagebox(title="Error", message=message, icon="cancel")
+        return False
         
     def show_frame(self, cont):
-        frame = self.frames[cont]
+        frame = self.frames.get(cont)
+        if frame is None:
+            frame = cont(self.container, self)
+            self.frames[cont] = frame
+            frame.grid(row=0, column=0, sticky="nsew")
+        # Whatever the page being left was still loading is no longer wanted
+        if self.current_frame is not None and self.current_frame is not frame:
+            self.loader.cancel(self.current_frame)
+        self.current_frame = frame
         frame.tkraise()
         # Add on_show method call if it exists
         if hasattr(frame, 'on_show'):
             frame.on_show()
 
+    def poll_changes(self):
+        # One indexed single-row read, the open page only reloads when something was written
+        if self.db is not None and not self.loader.is_busy("changes"):
+            self.loader.submit("changes", self.db.get_change_version, self.on_change_version)
+        self._refresh_job = self.root.after(AUTO_REFRESH_MS, self.poll_changes)
+
+    def on_change_version(self, version):
+        if version is None:
+            return
+        previous, self.change_version = self.change_version, version
+        if previous is not None and version != previous and hasattr(self.current_frame, "on_data_changed"):
+            self.current_frame.on_data_changed(previous)
+
+    def export_records(self, table, filters, status_label):
+        """Ask for a file and export donations or withdrawals to it in the background, showing progress"""
+        path = filedialog.asksaveasfilename(
+            title=f"Export {table.title()}",
+            initialfile=f"{table}.csv",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"),
+                       ("Compressed CSV", "*.csv.gz"), ("Compressed JSON Lines", "*.jsonl.gz")]
+        )
+        if not path:
+            return
+        export = export_donations if table == "donations" else export_withdrawals
+        # Written by the export thread, read by the polling below on the UI thread
+        progress = {"count": 0}
+
+        def record_progress(count):
+            progress["count"] = count
+
+        def show_progress():
+            if self.loader.is_busy("export"):
+                status_label.configure(text=f"Exported {progress['count']} {table}...")
+                self.root.after(250, show_progress)
+
+        def show_result(count):
+            CTkMessagebox(title="Export Finished", message=f"Exported {count} {table} to {path}", icon="check")
+
+        def show_error(error):
+            CTkMessagebox(title="Error", message=f"Export failed: {error}", icon="cancel")
+
+        self.loader.submit("export", lambda: export(self.get_db(), path, filters, progress=record_progress),
+            show_result, status_label, on_error=show_error)
+        self.root.after(250, show_progress)
+
     def quit_app(self):
-        # Close database connection
-        if hasattr(self, 'db'):
-            self.db.connection.close()
-            print("Database connection closed")
+        # Commit queued donations before closing. close() reports on stderr whatever can't be
+        # written, it stays in the journal for the next start.
+        if self.intake is not None:
+            self.intake.close(timeout=INTAKE_FLUSH_TIMEOUT)
+        # Stop background loading and close database connection
+        self.root.after_cancel(self._refresh_job)
+        self.loader.shutdown()
+        if self.db is not None:
+            self.db.close()
         # Destroy the root window
         self.root.quit()
 
@@ -369,6 +598,7 @@ class DonationPage(ctk.CTkFrame):
         quantity_entry = ctk.CTkEntry(form_frame, width=400)
         quantity_entry.grid(row=row, column=1, pady=10, padx=5, columnspan=3)
         self.entries['Quantity:'] = quantity_entry
+        self.border_color = quantity_entry.cget("border_color")
 
         # Buttons
         button_frame = ctk.CTkFrame(form_frame, fg_color="transparent")
@@ -399,58 +629,34 @@ class DonationPage(ctk.CTkFrame):
                 entry.delete(0, "end")
 
     def validate_fields(self):
-        for label, entry in self.entries.items():
-            value = entry.get() if not isinstance(entry, ctk.CTkOptionMenu) else entry.get()
-            
-            # Skip optional Barangay field
-            if label == 'Barangay:' and not value.strip():
-                continue
-                
-            # Validate contact information format
-            if label == 'Contact Info:':
-                email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-                phone_pattern = r'^(09|\+63)[0-9]{9}$'
-                
-                if not (re.match(email_pattern, value) or re.match(phone_pattern, value)):
-                    self.show_warning("Contact info must be a valid email address or Philippine phone number (09XXXXXXXXX or +63XXXXXXXXX)")
-                    return False
-                continue
-            
-            # Validate required fields
-            if not value or value.strip() == "" or value == "Select an item":
-                self.show_warning(f"Please fill in the {label.replace(':', '')} field")
-                return False
-                
-            # Validate quantity constraints
-            if label == 'Quantity:':
-                try:
-                    qty = int(value)
-                    if qty <= 0:
-                        self.show_warning("Quantity must be greater than 0")
-                        return False
-                    if qty > 2147483647:
-                        self.show_warning("Quantity cannot exceed 2,147,483,647")
-                        return False
-                except ValueError:
-                    self.show_warning("Quantity must be a valid number")
-                    return False
-        return True
+        """The trimmed donation tuple, or None after marking every field that needs fixing"""
+        # Same rules the bulk import applies, see validate_donations
+        record = {field: self.entries[f"{name}:"].get() for field, name in DONATION_FIELDS}
+        donations, errors = validate_donations([record])
+        failed = {field for _, field, _ in errors}
+        for field, name in DONATION_FIELDS:
+            entry = self.entries[f"{name}:"]
+            if isinstance(entry, ctk.CTkEntry):
+                entry.configure(border_color=INVALID_BORDER_COLOR if field in failed else self.border_color)
+        if errors:
+            self.show_warning("\n".join(message for _, _, message in errors))
+            return None
+        return donations[0][1]
 
     def show_warning(self, message):
         CTkMessagebox(title="Invalid Input", message=message, icon="warning")
 
     def add_donation(self):
-        if self.validate_fields():
+        donation = self.validate_fields()
+        if donation is not None and self.controller.check_db():
             try:
-                donor_name = self.entries['Donor Name:'].get()
-                contact_info = self.entries['Contact Info:'].get()
-                barangay = self.entries['Barangay:'].get().strip()
-                city = self.entries['City:'].get().strip()
-                province = self.entries['Province:'].get().strip()
-                supply_name = self.entries['Supply Name:'].get()
-                quantity = int(self.entries['Quantity:'].get())
-                
-                if self.controller.db.add_donation(donor_name, contact_info, barangay, city, province, supply_name, quantity):
+                if self.controller.intake is not None:
+                    # Acknowledged once it is safely in the journal, the database write follows in the background
+                    self.controller.intake.submit(*donation)
+                    recorded = True
+                else:
+                    recorded = self.controller.db.add_donation(*donation)
+                if recorded:
                     CTkMessagebox(title="Success", message="Your donation has been recorded.", icon="check")
                     self.clear_fields()
                     self.controller.show_frame(MainMenu)
@@ -501,6 +707,9 @@ class SuppliesPage(ctk.CTkFrame):
         
         self.tree.pack(side="left", fill="both", expand=True)
 
+        # Rows are keyed by supply name, which is unique
+        self.rows = TableBinding(self.tree, key_of=lambda row: row[0])
+
         # Buttons frame
         button_frame = ctk.CTkFrame(self, fg_color="transparent")
         button_frame.pack(pady=10)
@@ -522,19 +731,24 @@ class SuppliesPage(ctk.CTkFrame):
         )
         back_button.pack(side="left", padx=10)
 
+        # Shows "Loading..." while a refresh is running
+        self.status_label = ctk.CTkLabel(self, text="")
+        self.status_label.pack()
+
     def on_show(self):
         """Called when the frame becomes visible"""
         self.refresh_data()
+
+    def on_data_changed(self, since):
+        self.refresh_data()
         
     def refresh_data(self):
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        # Fetch and insert new data
-        supplies = self.controller.db.get_all_supplies()
-        for supply in supplies:
-            self.tree.insert("", "end", values=supply)
+        # Fetch in the background, the tree is filled once the rows arrive
+        self.controller.loader.submit(self, lambda: self.controller.get_db().get_all_supplies(), self.show_supplies, self.status_label)
+
+    def show_supplies(self, supplies):
+        # Only rows that changed since the last refresh are touched
+        self.rows.update(supplies)
 
 class AdminPage(ctk.CTkFrame):
     def __init__(self, parent, controller):
@@ -578,6 +792,15 @@ class AdminPage(ctk.CTkFrame):
         self.supplies_tree.column("Quantity", width=150)
         
         self.supplies_tree.pack(expand=True, fill="both", padx=5, pady=5)
+        self.rows = TableBinding(self.supplies_tree, key_of=lambda row: row[0])
+
+        # Shows "Loading..." while the supplies are being fetched
+        self.status_label = ctk.CTkLabel(self, text="")
+        self.status_label.pack()
+
+        # Supplies forecast to run out before a restock could arrive
+        self.alerts_label = ctk.CTkLabel(self, text="", text_color="#e03131", justify="left")
+        self.alerts_label.pack()
 
         # Button container
         button_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -614,6 +837,28 @@ class AdminPage(ctk.CTkFrame):
             hover_color="#7B1FA2"
         )
         withdrawal_records_btn.pack(side="left", padx=5)
+
+        # Bulk import of donation spreadsheets and the summary reports
+        bottom_buttons_frame = ctk.CTkFrame(button_frame, fg_color="transparent")
+        bottom_buttons_frame.pack(pady=(0, 10))
+
+        import_btn = ctk.CTkButton(bottom_buttons_frame,
+            text="Import Donations",
+            command=self.import_donations,
+            width=200,
+            fg_color="#2f9e44",
+            hover_color="#2b8a3e"
+        )
+        import_btn.pack(side="left", padx=5)
+
+        reports_btn = ctk.CTkButton(bottom_buttons_frame,
+            text="Reports",
+            command=lambda: controller.show_frame(ReportsPage),
+            width=200,
+            fg_color="#0c8599",
+            hover_color="#0b7285"
+        )
+        reports_btn.pack(side="left", padx=5)
         
         # Back button
         back_button = ctk.CTkButton(button_frame,
@@ -628,14 +873,50 @@ class AdminPage(ctk.CTkFrame):
     def on_show(self):
         """Called when the frame becomes visible"""
         self.refresh_supplies()
+
+    def on_data_changed(self, since):
+        self.refresh_supplies()
         
     def refresh_supplies(self):
-        for item in self.supplies_tree.get_children():
-            self.supplies_tree.delete(item)
-            
-        supplies = self.controller.db.get_all_supplies()
-        for supply in supplies:
-            self.supplies_tree.insert("", "end", values=supply)
+        self.controller.loader.submit(self, lambda: self.controller.get_db().get_all_supplies(), self.show_supplies, self.status_label)
+        self.controller.loader.submit("forecast", self.load_alerts, self.show_alerts)
+
+    def show_supplies(self, supplies):
+        self.rows.update(supplies)
+
+    def load_alerts(self):
+        # NumPy is imported here, on a loader thread, so it doesn't hold up the first window
+        from classroom_connect.forecast import forecast_demand
+        return forecast_demand(self.controller.get_db()).alerts()
+
+    def show_alerts(self, alerts):
+        lines = []
+        for supply_name, on_hand, _, _, per_day, days_left, _, order, status in alerts[:5]:
+            if status == "Out of stock":
+                lines.append(f"{supply_name}: out of stock, about {per_day:g} a day are withdrawn, order {order}")
+            else:
+                lines.append(f"{supply_name}: {on_hand} left, about {days_left:g} days at {per_day:g} a day, order {order}")
+        if len(alerts) > 5:
+            lines.append(f"and {len(alerts) - 5} more, see python -m classroom_connect forecast --alerts")
+        self.alerts_label.configure(text="\n".join(lines))
+
+    def import_donations(self):
+        path = filedialog.askopenfilename(
+            title="Import Donations",
+            filetypes=[("Donation files", "*.csv *.json *.jsonl"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        # Imports get their own loader slot so a supplies refresh doesn't supersede them
+        self.controller.loader.submit("import", lambda: import_donations(self.controller.get_db(), path),
+            self.show_import_result, self.status_label)
+
+    def show_import_result(self, summary):
+        message = f"Imported {summary['imported']} of {summary['rows']} rows in {summary['seconds']:.1f}s."
+        if summary["failed"]:
+            message += f"\n{summary['failed']} rows were rejected, see {summary['error_report']}"
+        CTkMessagebox(title="Import Finished", message=message, icon="warning" if summary["failed"] else "check")
+        self.refresh_supplies()
 
 class DonationsViewPage(ctk.CTkFrame):
     def __init__(self, parent, controller):
@@ -648,6 +929,34 @@ class DonationsViewPage(ctk.CTkFrame):
         )
         label.pack(pady=20)
 
+        # Filter bar, the records are searched on the server as the user types
+        self.filters = {}
+        self.filter_job = None
+        self.filter_entries = {}
+        filter_frame = ctk.CTkFrame(self, fg_color="transparent")
+        filter_frame.pack(pady=(0, 5))
+        for column, (key, placeholder, width) in enumerate([
+            ("donor", "Donor", 130),
+            ("contact", "Contact", 120),
+            ("city", "City", 110),
+            ("province", "Province", 110),
+            ("date_from", "From (YYYY-MM-DD)", 130),
+            ("date_to", "To (YYYY-MM-DD)", 130)
+        ]):
+            entry = ctk.CTkEntry(filter_frame, placeholder_text=placeholder, width=width)
+            entry.grid(row=0, column=column, padx=3)
+            entry.bind("<KeyRelease>", self.schedule_filter)
+            self.filter_entries[key] = entry
+
+        clear_button = ctk.CTkButton(filter_frame,
+            text="Clear",
+            command=self.clear_filters,
+            width=60,
+            fg_color="#868e96",
+            hover_color="#495057"
+        )
+        clear_button.grid(row=0, column=len(self.filter_entries), padx=3)
+
         # Create Treeview Frame with transparent background
         self.tree_frame = ctk.CTkFrame(self, width=600, fg_color="transparent")
         self.tree_frame.pack(pady=10, padx=100, fill="y")
@@ -667,8 +976,13 @@ class DonationsViewPage(ctk.CTkFrame):
         scrollbar = ttk.Scrollbar(tree_scroll_frame, orient="vertical", command=self.tree.yview)
         scrollbar.pack(side="right", fill="y")
         
-        # Configure the treeview to use scrollbar
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Load donations a page at a time as the user scrolls
+        self.status_label = ctk.CTkLabel(self, text="")
+        self.rows = PagedTreeview(self.tree, scrollbar, controller.loader, self,
+            fetch_page=lambda *args: controller.get_db().search_donations(self.filters, *args),
+            key_of=lambda row: (row[1], row[0]),
+            loading_label=self.status_label
+        )
 
         # Format columns with balanced widths
         columns = {
@@ -696,6 +1010,15 @@ class DonationsViewPage(ctk.CTkFrame):
             hover_color="#45a049"
         )
         refresh_button.pack(side="left", padx=5)
+
+        # Exports the records matching the current filters
+        export_button = ctk.CTkButton(button_frame,
+            text="Export",
+            command=lambda: controller.export_records("donations", self.filters, self.status_label),
+            fg_color="#1971c2",
+            hover_color="#1864ab"
+        )
+        export_button.pack(side="left", padx=5)
         
         back_button = ctk.CTkButton(button_frame,
             text="Back to Admin",
@@ -705,16 +1028,207 @@ class DonationsViewPage(ctk.CTkFrame):
         )
         back_button.pack(side="left", padx=5)
 
+        self.status_label.pack()
+
     def on_show(self):
         self.refresh_data()
         
     def refresh_data(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        donations = self.controller.db.get_all_donations()
-        for donation in donations:
-            self.tree.insert("", "end", values=donation)
+        self.rows.reload()
+
+    def on_data_changed(self, since):
+        # Only the donations matching the filters written since are read, writes to other tables don't show here
+        filters = self.filters
+        self.controller.loader.submit((self, "new"),
+            lambda: self.controller.get_db().get_new_donations(since, filters, limit=self.rows.page_size),
+            lambda rows: self.show_new_rows(rows, filters))
+
+    def show_new_rows(self, rows, filters):
+        # Rows read for filters that have since been changed are dropped, the restart shows them
+        if not rows or self.controller.current_frame is not self or filters is not self.filters:
+            return
+        if self.controller.loader.is_busy(self):
+            # A scroll fetch is running, changing the window now would mix with its page
+            self.after(FILTER_DELAY_MS, lambda: self.show_new_rows(rows, filters))
+            return
+        if len(rows) == self.rows.page_size:
+            # There may be more than were read, the window is read again instead
+            self.rows.reload()
+        else:
+            self.rows.add_rows(rows)
+
+    def schedule_filter(self, event=None):
+        # Wait for a pause in typing so every keystroke doesn't start a query
+        if self.filter_job is not None:
+            self.after_cancel(self.filter_job)
+        self.filter_job = self.after(FILTER_DELAY_MS, self.apply_filters)
+
+    def apply_filters(self):
+        self.filter_job = None
+        filters = {}
+        for key, entry in self.filter_entries.items():
+            value = entry.get().strip()
+            if value and key in ("date_from", "date_to"):
+                try:
+                    value = datetime.date.fromisoformat(value)
+                except ValueError:
+                    self.status_label.configure(text="Dates must be written as YYYY-MM-DD")
+                    return
+            filters[key] = value
+        if filters == self.filters:
+            return
+        # A new dict rather than an update, the background fetch may be reading the old one
+        self.filters = filters
+        self.rows.restart()
+
+    def clear_filters(self):
+        for entry in self.filter_entries.values():
+            entry.delete(0, "end")
+        self.apply_filters()
+
+class ReportsPage(ctk.CTkFrame):
+    # Report name -> (column widths, fetch(db, start, end), key of a row). All of them read the
+    # summary tables, so switching reports or periods costs a few hundred rows at most.
+    REPORTS = {
+        "Supplies by Month": (
+            {"Month": 100, "Supply Name": 180, "Donated": 100, "Withdrawn": 100},
+            lambda db, start, end: db.get_supply_totals(start, end),
+            lambda row: (row[0], row[1])
+        ),
+        "Top Donors": (
+            {"Donor Name": 180, "Contact": 180, "Quantity": 100, "Donations": 100},
+            lambda db, start, end: db.get_top_donors(start, end, limit=50),
+            lambda row: (row[0], row[1])
+        ),
+        "By Province": (
+            {"Province": 220, "Quantity": 100, "Donations": 100},
+            lambda db, start, end: db.get_location_totals(start, end),
+            lambda row: row[0]
+        ),
+        "By City": (
+            {"Province": 180, "City": 180, "Quantity": 100, "Donations": 100},
+            lambda db, start, end: db.get_location_totals(start, end, by="city"),
+            lambda row: (row[0], row[1])
+        ),
+    }
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, fg_color="transparent")
+        self.controller = controller
+
+        label = ctk.CTkLabel(self,
+            text="Reports",
+            font=CTkFont(family="Helvetica", size=14, weight="bold")
+        )
+        label.pack(pady=20)
+
+        # Report and period selection
+        filter_frame = ctk.CTkFrame(self, fg_color="transparent")
+        filter_frame.pack(pady=(0, 10))
+
+        self.report_selector = ctk.CTkSegmentedButton(filter_frame,
+            values=list(self.REPORTS),
+            command=lambda _: self.show_report()
+        )
+        self.report_selector.set("Supplies by Month")
+        self.report_selector.pack(side="left", padx=5)
+
+        self.period_menu = ctk.CTkOptionMenu(filter_frame,
+            values=PERIODS,
+            command=lambda _: self.refresh_data(),
+            width=160
+        )
+        self.period_menu.set("This Year")
+        self.period_menu.pack(side="left", padx=5)
+
+        # Create Treeview Frame
+        self.tree_frame = ctk.CTkFrame(self, width=600, fg_color="transparent")
+        self.tree_frame.pack(pady=10, padx=100, fill="y")
+        self.tree_frame.pack_propagate(False)
+
+        tree_scroll_frame = ctk.CTkFrame(self.tree_frame, fg_color="transparent")
+        tree_scroll_frame.pack(fill="both", expand=True)
+
+        self.tree = ttk.Treeview(tree_scroll_frame, show='headings', height=10)
+        scrollbar = ttk.Scrollbar(tree_scroll_frame, orient="vertical", command=self.tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.rows = None
+
+        # Buttons Frame
+        button_frame = ctk.CTkFrame(self, fg_color="transparent")
+        button_frame.pack(pady=10)
+
+        refresh_button = ctk.CTkButton(button_frame,
+            text="Refresh",
+            command=self.refresh_data,
+            fg_color="#4CAF50",
+            hover_color="#45a049"
+        )
+        refresh_button.pack(side="left", padx=5)
+
+        rebuild_button = ctk.CTkButton(button_frame,
+            text="Rebuild Totals",
+            command=self.rebuild_summaries,
+            fg_color="#0c8599",
+            hover_color="#0b7285"
+        )
+        rebuild_button.pack(side="left", padx=5)
+
+        back_button = ctk.CTkButton(button_frame,
+            text="Back to Admin",
+            command=lambda: controller.show_frame(AdminPage),
+            fg_color="#f44336",
+            hover_color="#d32f2f"
+        )
+        back_button.pack(side="left", padx=5)
+
+        self.status_label = ctk.CTkLabel(self, text="")
+        self.status_label.pack()
+
+        self.set_columns()
+
+    def on_show(self):
+        self.refresh_data()
+
+    def show_report(self):
+        self.set_columns()
+        self.refresh_data()
+
+    def on_data_changed(self, since):
+        self.refresh_data()
+
+    def set_columns(self):
+        # Different reports have different columns, start from an empty table
+        columns, _, key_of = self.REPORTS[self.report_selector.get()]
+        self.tree.delete(*self.tree.get_children())
+        self.tree.configure(columns=list(columns))
+        for col, width in columns.items():
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width)
+        self.rows = TableBinding(self.tree, key_of=key_of)
+
+    def refresh_data(self):
+        report = self.report_selector.get()
+        _, fetch, _ = self.REPORTS[report]
+        start, end = period_range(self.period_menu.get())
+        self.controller.loader.submit(self, lambda: fetch(self.controller.get_db(), start, end),
+            lambda rows: self.show_rows(report, rows), self.status_label)
+
+    def show_rows(self, report, rows):
+        # A result for the report that was selected before switching is dropped
+        if report == self.report_selector.get():
+            self.rows.update(rows)
+
+    def rebuild_summaries(self):
+        self.controller.loader.submit("rebuild", lambda: self.controller.get_db().rebuild_summaries(),
+            self.show_rebuild_result, self.status_label)
+
+    def show_rebuild_result(self, result):
+        success, message = result
+        CTkMessagebox(title="Rebuild Totals", message=message, icon="check" if success else "cancel")
+        self.refresh_data()
 
 class LoginPage(ctk.CTkFrame):
     def __init__(self, parent, controller):
@@ -854,6 +1368,57 @@ class WithdrawalPage(ctk.CTkFrame):
             width=140
         )
         back_button.pack(side="left", padx=5)
+
+        # Hand the stock out across every open classroom request at once
+        allocate_frame = ctk.CTkFrame(self, fg_color="transparent")
+        allocate_frame.pack(pady=10)
+
+        self.method_combo = ctk.CTkOptionMenu(allocate_frame,
+            values=["max-min", "proportional", "priority"],
+            width=140
+        )
+        self.method_combo.pack(side="left", padx=5)
+
+        allocate_button = ctk.CTkButton(allocate_frame,
+            text="Allocate Requests",
+            command=self.preview_allocation,
+            fg_color="#2196F3",
+            hover_color="#1976D2",
+            width=140
+        )
+        allocate_button.pack(side="left", padx=5)
+
+        self.status_label = ctk.CTkLabel(self, text="")
+        self.status_label.pack()
+
+    def preview_allocation(self):
+        # A dry run first, nothing is withdrawn until the admin confirms it
+        method = self.method_combo.get()
+        self.controller.loader.submit(self,
+            lambda: self.controller.get_db().allocate_requests(method, commit=False),
+            lambda result: self.confirm_allocation(method, result), self.status_label)
+
+    def confirm_allocation(self, method, result):
+        success, message, allocations = result
+        if not success or not any(allocation[4] for allocation in allocations):
+            CTkMessagebox(title="Allocate Requests", message=message, icon="cancel" if not success else "info")
+            return
+        answer = CTkMessagebox(title="Allocate Requests", message=f"{message} ({method}). Withdraw them now?",
+                               icon="question", option_1="Cancel", option_2="Allocate")
+        if answer.get() != "Allocate":
+            return
+        # Its own loader slot, not the page's: leaving the page must not drop the result of a
+        # withdrawal that goes ahead regardless
+        self.controller.loader.submit("allocate",
+            lambda: self.controller.get_db().allocate_requests(method),
+            self.show_allocation, self.status_label, on_error=self.show_allocation_error)
+
+    def show_allocation(self, result):
+        success, message, _ = result
+        CTkMessagebox(title="Allocate Requests", message=message, icon="check" if success else "cancel")
+
+    def show_allocation_error(self, error):
+        CTkMessagebox(title="Allocate Requests", message=f"Allocation failed: {error}", icon="cancel")
         
     def withdraw_supply(self):
         supply_name = self.supply_combo.get()
@@ -869,15 +1434,12 @@ class WithdrawalPage(ctk.CTkFrame):
         except ValueError:
             CTkMessagebox(title="Error", message="Please enter a valid number for quantity", icon="warning")
             return
-            
-        success, message = self.controller.db.withdraw_supply(supply_name, quantity)
+
+        if not self.controller.check_db():
+            return
+        success, message, new_balance = self.controller.db.withdraw_supply(supply_name, quantity)
         if success:
-            # Get supply_id and record withdrawal
-            supply_id = self.controller.db.get_supply_id(supply_name)
-            if supply_id:
-                self.controller.db.record_withdrawal(supply_id, quantity)
-            
-            CTkMessagebox(title="Success", message=message, icon="check")
+            CTkMessagebox(title="Success", message=f"{message}. {new_balance} {supply_name} left in stock.", icon="check")
             self.supply_combo.set("Select an item")
             self.quantity_entry.delete(0, "end")
             self.controller.show_frame(AdminPage)
@@ -914,7 +1476,14 @@ class WithdrawalRecordsPage(ctk.CTkFrame):
         scrollbar = ttk.Scrollbar(tree_scroll_frame, orient="vertical", command=self.tree.yview)
         scrollbar.pack(side="right", fill="y")
         
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Load withdrawals a page at a time as the user scrolls
+        self.status_label = ctk.CTkLabel(self, text="")
+        self.rows = PagedTreeview(self.tree, scrollbar, controller.loader, self,
+            fetch_page=lambda *args: controller.get_db().get_withdrawals_page(*args),
+            key_of=lambda row: (row[3], row[0]),
+            loading_label=self.status_label,
+            descending=True
+        )
 
         # Format columns
         columns = {
@@ -940,6 +1509,14 @@ class WithdrawalRecordsPage(ctk.CTkFrame):
             hover_color="#45a049"
         )
         refresh_button.pack(side="left", padx=5)
+
+        export_button = ctk.CTkButton(button_frame,
+            text="Export",
+            command=lambda: controller.export_records("withdrawals", None, self.status_label),
+            fg_color="#1971c2",
+            hover_color="#1864ab"
+        )
+        export_button.pack(side="left", padx=5)
         
         back_button = ctk.CTkButton(button_frame,
             text="Back to Admin",
@@ -949,16 +1526,30 @@ class WithdrawalRecordsPage(ctk.CTkFrame):
         )
         back_button.pack(side="left", padx=5)
 
+        self.status_label.pack()
+
     def on_show(self):
         self.refresh_data()
         
     def refresh_data(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        withdrawals = self.controller.db.get_all_withdrawals()
-        for withdrawal in withdrawals:
-            self.tree.insert("", "end", values=withdrawal)
+        self.rows.reload()
+
+    def on_data_changed(self, since):
+        self.controller.loader.submit((self, "new"),
+            lambda: self.controller.get_db().get_new_withdrawals(since, limit=self.rows.page_size), self.show_new_rows)
+
+    def show_new_rows(self, rows):
+        if not rows or self.controller.current_frame is not self:
+            return
+        if self.controller.loader.is_busy(self):
+            # A scroll fetch is running, changing the window now would mix with its page
+            self.after(FILTER_DELAY_MS, lambda: self.show_new_rows(rows))
+            return
+        if len(rows) == self.rows.page_size:
+            # There may be more than were read, the window is read again instead
+            self.rows.reload()
+        else:
+            self.rows.add_rows(rows)
 
 if __name__ == "__main__":
     root = ctk.CTk()
@@ -0,0 +1,64 @@
+# Deterministic synthetic data for the benchmarks: the same seed always produces the same rows
+import datetime
+import random
+
+FIRST_NAMES = [
+    "Juan", "Maria", "Jose", "Ana", "Pedro", "Rosa", "Carlo", "Liza", "Mark", "Grace",
+    "Paolo", "Joy", "Miguel", "Carmela", "Rafael", "Bea", "Andres", "Isabel", "Ramon", "Teresa",
+]
+LAST_NAMES = [
+    "Dela Cruz", "Santos", "Reyes", "Garcia", "Mendoza", "Torres", "Castillo", "Flores", "Ramos", "Aquino",
+    "Bautista", "Villanueva", "Navarro", "Domingo", "Salazar", "Gonzales", "Lopez", "Cruz", "Rivera", "Morales",
+]
+# (city, province) pairs, a handful of barangays is generated per city
+CITIES = [
+    ("Manila", "Metro Manila"), ("Quezon City", "Metro Manila"), ("Makati", "Metro Manila"),
+    ("Cebu City", "Cebu"), ("Mandaue", "Cebu"), ("Davao City", "Davao del Sur"),
+    ("Iloilo City", "Iloilo"), ("Bacolod", "Negros Occidental"), ("Baguio", "Benguet"),
+    ("Cagayan de Oro", "Misamis Oriental"), ("Zamboanga City", "Zamboanga del Sur"), ("Tacloban", "Leyte"),
+]
+SUPPLIES = [
+    "Pencil", "Eraser", "Paper", "Pen", "Folder", "Ruler",
+    "Coloring Material", "Glue", "Scissors", "Sharpener",
+    "Notebook", "Books", "Others",
+]
+START_DATE = datetime.datetime(2020, 1, 1)
+
+class DataGenerator:
+    # Produces donors, addresses, donations and withdrawals from a seeded random stream
+    def __init__(self, seed=42, donors=5000, days=5 * 365):
+        self.seed = seed
+        self.donor_count = donors
+        self.days = days
+
+    def donors(self):
+        """(donor_name, contact_info, barangay, city, province) for every synthetic donor"""
+        rng = random.Random(f"{self.seed}-donors")
+        for i in range(self.donor_count):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            if rng.random() < 0.5:
+                contact = f"09{i:09d}"
+            else:
+                contact = f"{name.split()[0].lower()}{i}@example.com"
+            city, province = rng.choice(CITIES)
+            barangay = f"Barangay {rng.randint(1, 40)}" if rng.random() < 0.8 else ""
+            yield (name, contact, barangay, city, province)
+
+    def donations(self, count):
+        """(donor_name, contact_info, barangay, city, province, supply_name, quantity, donation_date) rows"""
+        donors = list(self.donors())
+        rng = random.Random(f"{self.seed}-donations")
+        for _ in range(count):
+            donor = rng.choice(donors)
+            supply_name = rng.choice(SUPPLIES)
+            quantity = rng.randint(1, 100)
+            yield donor + (supply_name, quantity, self._timestamp(rng))
+
+    def withdrawals(self, count):
+        """(supply_name, quantity, withdrawal_date) rows"""
+        rng = random.Random(f"{self.seed}-withdrawals")
+        for _ in range(count):
+            yield (rng.choice(SUPPLIES), rng.randint(1, 20), self._timestamp(rng))
+
+    def _timestamp(self, rng):
+        return START_DATE + datetime.timedelta(seconds=rng.randrange(self.days * 86400))
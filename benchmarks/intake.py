@@ -0,0 +1,87 @@
+# Donation intake benchmark: one commit per add_donation against the group-committing intake queue.
+#
+# Run it against a scratch database, the donations it records are left in place:
+#     python benchmarks/intake.py --backend sqlite --database bench.sqlite3 --volunteers 4 --donations 500
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datagen import SUPPLIES, DataGenerator
+from classroom_connect.config import DB_BACKEND, DB_CONFIG, SQLITE_PATH
+from classroom_connect.database import DatabaseConnection
+from classroom_connect.intake import IntakeQueue
+
+def run(record, volunteers, per_volunteer, donations):
+    # Each volunteer thread enters its share of the donations back to back
+    latencies = []
+    lock = threading.Lock()
+
+    def volunteer(offset):
+        own = []
+        for donation in donations[offset::volunteers][:per_volunteer]:
+            begin = time.perf_counter()
+            record(donation)
+            own.append((time.perf_counter() - begin) * 1000)
+        with lock:
+            latencies.extend(own)
+
+    workers = [threading.Thread(target=volunteer, args=(i,)) for i in range(volunteers)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "donations": len(latencies),
+        "seconds": elapsed,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark direct donation commits against the intake queue")
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default=DB_BACKEND)
+    parser.add_argument("--database", help="database name, or the database file for sqlite")
+    parser.add_argument("--volunteers", type=int, default=4)
+    parser.add_argument("--donations", type=int, default=500, help="donations per volunteer")
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        db_config = {"path": args.database or SQLITE_PATH}
+    else:
+        db_config = dict(DB_CONFIG, database=args.database or DB_CONFIG["database"])
+    db = DatabaseConnection(pool_size=args.volunteers + 1, db_config=db_config, backend=args.backend)
+    total = args.volunteers * args.donations
+    donations = [
+        (donor_name, contact_info, barangay, city, province, SUPPLIES[i % len(SUPPLIES)], 1)
+        for i, (donor_name, contact_info, barangay, city, province) in enumerate(DataGenerator(donors=total).donors())
+    ]
+    journal = os.path.join(tempfile.mkdtemp(), "intake.journal")
+    try:
+        direct = run(lambda donation: db.add_donation(*donation), args.volunteers, args.donations, donations)
+        print(f" direct: {direct['donations'] / direct['seconds']:8.1f} donations/s  "
+              f"acknowledged p50 {direct['p50_ms']:.2f} ms  p99 {direct['p99_ms']:.2f} ms")
+
+        intake = IntakeQueue(db, journal)
+        queued = run(lambda donation: intake.submit(*donation), args.volunteers, args.donations, donations)
+        start = time.perf_counter()
+        intake.close()
+        drained = queued["seconds"] + time.perf_counter() - start
+        print(f" queued: {queued['donations'] / drained:8.1f} donations/s  "
+              f"acknowledged p50 {queued['p50_ms']:.2f} ms  p99 {queued['p99_ms']:.2f} ms  "
+              f"(all committed after {drained:.2f}s)")
+    finally:
+        if os.path.exists(journal):
+            os.remove(journal)
+        os.rmdir(os.path.dirname(journal))
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+# Data layer benchmark suite: loads synthetic data at several scales and times the DatabaseConnection operations.
+#
+# It DROPS and recreates the benchmark database on every scale, point it at a scratch database only:
+#     python benchmarks/suite.py --scales 10000,100000 --output results.json
+#     python benchmarks/suite.py --scales 10000 --baseline results.json   # compare against an earlier run
+#     python benchmarks/suite.py --backend sqlite --database bench.sqlite3  # embedded backend, no server needed
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from contextlib import closing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datagen import START_DATE, SUPPLIES, DataGenerator
+from classroom_connect.config import DB_BACKEND, DB_CONFIG, SQLITE_PATH
+from classroom_connect.database import DatabaseConnection
+from classroom_connect.forecast import forecast_demand
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_FILE = os.path.join(ROOT, "schoolsuppliesdonationdb.sql")
+LOAD_BATCH_SIZE = 5000
+# Stock given to every supply so the withdrawal benchmark never runs dry
+SEED_STOCK = 10 ** 9
+# Second stockroom, stocked by the transfer benchmark
+ANNEX = "Benchmark Annex"
+# Operations timed again on a connection without prepared statements, to report the per-call saving
+UNPREPARED = ["add_donation", "withdraw_supply", "get_change_version", "get_new_donations", "get_location_stock",
+              "get_donations_page.deep", "get_supply_totals"]
+
+def create_database(backend, db_config):
+    """Drop and recreate the benchmark database, from the schema dump on MySQL"""
+    if backend == "sqlite":
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_config["path"] + suffix):
+                os.remove(db_config["path"] + suffix)
+        # DatabaseConnection bootstraps the empty file on connect
+        return
+    import mysql.connector
+
+    server = {key: value for key, value in db_config.items() if key != "database"}
+    name = db_config["database"]
+    with closing(mysql.connector.connect(**server)) as connection, closing(connection.cursor()) as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+        cursor.execute(f"CREATE DATABASE `{name}` CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci")
+        cursor.execute(f"USE `{name}`")
+        for statement in schema_statements():
+            cursor.execute(statement)
+        connection.commit()
+
+def schema_statements():
+    # The dump is plain phpMyAdmin output: skip comments and version-guarded SET lines, split on ';'
+    lines = []
+    with open(SCHEMA_FILE, encoding="utf-8") as file:
+        for line in file:
+            if line.startswith("--") or line.startswith("/*!"):
+                continue
+            lines.append(line)
+    for statement in "".join(lines).split(";\n"):
+        statement = statement.strip().rstrip(";")
+        if statement and statement.upper() not in ("START TRANSACTION", "COMMIT"):
+            yield statement
+
+def load_data(db, generator, donations, withdrawals):
+    db.add_location(ANNEX)
+    location_id = db.get_location_id()
+    with db.connection() as connection, closing(connection.cursor()) as cursor:
+        cursor.executemany(f"{db.backend.insert_ignore} INTO supplies (supply_name, quantity) VALUES (%s, 0)",
+                           [(supply_name,) for supply_name in SUPPLIES])
+        cursor.execute("UPDATE supplies SET quantity = %s", (SEED_STOCK,))
+        # All of it at the default location
+        cursor.execute("DELETE FROM location_stock")
+        cursor.execute("INSERT INTO location_stock (location_id, supply_id, quantity) SELECT %s, id, quantity FROM supplies",
+                       (location_id,))
+        cursor.execute("SELECT supply_name, id FROM supplies")
+        supply_ids = dict(cursor.fetchall())
+        connection.commit()
+
+        batch = []
+        for donor_name, contact_info, barangay, city, province, supply_name, quantity, date in generator.donations(donations):
+            address = f"{barangay}, {city}, {province}" if barangay else f"{city}, {province}"
+            batch.append((donor_name, contact_info, address, barangay, city, province, supply_ids[supply_name], quantity, date))
+            if len(batch) >= LOAD_BATCH_SIZE:
+                _insert_donations(cursor, batch)
+                connection.commit()
+                batch = []
+        if batch:
+            _insert_donations(cursor, batch)
+
+        batch = []
+        for supply_name, quantity, date in generator.withdrawals(withdrawals):
+            batch.append((supply_ids[supply_name], quantity, date))
+            if len(batch) >= LOAD_BATCH_SIZE:
+                _insert_withdrawals(cursor, batch)
+                connection.commit()
+                batch = []
+        if batch:
+            _insert_withdrawals(cursor, batch)
+        connection.commit()
+
+def _insert_donations(cursor, rows):
+    cursor.executemany("""
+        INSERT INTO donations (donor_name, contact_info, address, barangay, city, province, supply_id, quantity, donation_date)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, rows)
+
+def _insert_withdrawals(cursor, rows):
+    cursor.executemany("""
+        INSERT INTO withdrawals (supply_id, quantity, withdrawal_date)
+        VALUES (%s, %s, %s)
+    """, rows)
+
+def sample_keys(db, query, count, max_id, seed):
+    # Random existing rows to seek from, picked by id so it stays cheap on large tables
+    rng = random.Random(seed)
+    keys = []
+    with db.connection() as connection, closing(connection.cursor()) as cursor:
+        while len(keys) < count and max_id:
+            cursor.execute(query, (rng.randint(1, max_id),))
+            row = cursor.fetchone()
+            if row:
+                keys.append(row)
+    return keys
+
+def measure(fn, samples):
+    """Run fn(i) samples times, returns latency percentiles in milliseconds and throughput"""
+    latencies = []
+    start = time.perf_counter()
+    for i in range(samples):
+        begin = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - begin) * 1000)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)]
+
+    return {
+        "samples": samples,
+        "mean_ms": sum(latencies) / samples,
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": latencies[-1],
+        "ops_per_second": samples / elapsed,
+    }
+
+def run_scale(db_config, rows, args):
+    generator = DataGenerator(seed=args.seed)
+    create_database(args.backend, db_config)
+    # The scratch database has no replica, everything is measured against it directly
+    db = DatabaseConnection(db_config=db_config, backend=args.backend, metrics=not args.no_metrics, replica="")
+    try:
+        load_start = time.perf_counter()
+        load_data(db, generator, rows, rows // 4)
+        # The loader writes the record tables directly, bring the summary tables and the stock ledger up to date once
+        db.rebuild_summaries()
+        db.rebuild_ledger()
+        print(f"  loaded {rows} donations and {rows // 4} withdrawals in {time.perf_counter() - load_start:.1f}s")
+
+        samples = args.samples
+        donors = list(DataGenerator(seed=args.seed + 1, donors=samples).donors())
+        rng = random.Random(args.seed)
+        donation_keys = sample_keys(db, "SELECT donor_name, id FROM donations WHERE id = %s", samples, rows, args.seed)
+        withdrawal_keys = sample_keys(db, "SELECT withdrawal_date, id FROM withdrawals WHERE id = %s", samples, rows // 4, args.seed)
+        # Needs lists from 200 classrooms, one request for every ten donations
+        requests = random.Random(args.seed + 2)
+        db.add_classroom_requests([(f"Classroom {n % 200}", requests.choice(SUPPLIES), requests.randint(1, 50),
+                                    requests.randint(0, 2)) for n in range(max(rows // 10, 1))])
+
+        operations = {
+            "add_donation": (lambda i: db.add_donation(*donors[i], rng.choice(SUPPLIES), rng.randint(1, 100)), samples),
+            "withdraw_supply": (lambda i: db.withdraw_supply(rng.choice(SUPPLIES), 1), samples),
+            "get_supply_id": (lambda i: db.get_supply_id(rng.choice(SUPPLIES)), samples),
+            "get_all_supplies": (lambda i: db.get_all_supplies(), samples),
+            "transfer_stock": (lambda i: db.transfer_stock(rng.choice(SUPPLIES), 1, db.location, ANNEX), samples),
+            "get_location_stock": (lambda i: db.get_location_stock(ANNEX), samples),
+            "get_stock_by_location": (lambda i: db.get_stock_by_location(), samples),
+            "get_change_version": (lambda i: db.get_change_version(), samples),
+            # What an auto-refreshing records page checks every few seconds
+            "get_new_donations": (lambda i: db.get_new_donations(db.get_change_version() - 1, limit=1), samples),
+            "get_donations_page.first": (lambda i: db.get_donations_page(), samples),
+            "get_donations_page.deep": (lambda i: db.get_donations_page(donation_keys[i % len(donation_keys)]), samples),
+            "get_withdrawals_page.first": (lambda i: db.get_withdrawals_page(), samples),
+            "get_withdrawals_page.deep": (lambda i: db.get_withdrawals_page(withdrawal_keys[i % len(withdrawal_keys)]), samples),
+            "search_donations.donor": (lambda i: db.search_donations({"donor": donors[i][0][:3]}), samples),
+            "search_donations.city": (lambda i: db.search_donations({"city": donors[i][3]}), samples),
+            "search_donations.province_dates": (lambda i: db.search_donations({
+                "province": donors[i][4], "date_from": datetime.date(2021, 1, 1), "date_to": datetime.date(2021, 3, 31)
+            }), samples),
+            "get_supply_totals": (lambda i: db.get_supply_totals(), samples),
+            "get_top_donors": (lambda i: db.get_top_donors(), samples),
+            "get_location_totals": (lambda i: db.get_location_totals(by="city"), samples),
+            "get_stock_report": (lambda i: db.get_stock_report(), args.scan_samples),
+            # As of the end of the generated history, over all of it
+            "forecast_demand": (lambda i: forecast_demand(db, today=START_DATE + datetime.timedelta(days=generator.days)),
+                                args.scan_samples),
+            # Dry runs, so every sample shares out the same stock across the same open requests
+            "allocate_requests": (lambda i: db.allocate_requests(commit=False), args.scan_samples),
+            "get_stock_at": (lambda i: db.get_stock_at(START_DATE + datetime.timedelta(days=rng.randrange(generator.days))), samples),
+            "reconcile_stock": (lambda i: db.reconcile_stock(), samples),
+            "reconcile_stock.full": (lambda i: db.reconcile_stock(full=True), args.scan_samples),
+            "rebuild_summaries": (lambda i: db.rebuild_summaries(), args.scan_samples),
+            "get_all_donations": (lambda i: db.get_all_donations(), args.scan_samples),
+            "get_all_withdrawals": (lambda i: db.get_all_withdrawals(), args.scan_samples),
+        }
+        # The same calls with the statements parsed on every execution. Without prepared
+        # statements (SQLite, or turned off) they would only time the same calls twice.
+        if db.prepared:
+            for name in UNPREPARED:
+                fn, count = operations[name]
+                operations[name + ".unprepared"] = (_unprepared(db, fn), count)
+        results = {}
+        for name, (fn, count) in operations.items():
+            if args.only and name.split(".")[0] not in args.only:
+                continue
+            if count <= 0 or (name.endswith(".deep") and not (donation_keys and withdrawal_keys)):
+                continue
+            results[name] = measure(fn, count)
+            r = results[name]
+            print(f"  {name:<36} p50 {r['p50_ms']:8.2f} ms  p99 {r['p99_ms']:8.2f} ms  {r['ops_per_second']:9.1f} ops/s")
+        if not db.prepared:
+            print(f"  prepared statements: not applicable, {db.backend.name} statements aren't prepared in this run")
+            return results
+        for name in UNPREPARED:
+            if name in results and name + ".unprepared" in results:
+                saved = (results[name + ".unprepared"]["p50_ms"] - results[name]["p50_ms"]) * 1000
+                print(f"  {name:<36} prepared statements save {saved:7.1f} us per call (p50)")
+        stats = db.statement_stats()
+        print(f"  {stats['statements']} statements prepared on idle connections, "
+              f"{stats['reused']} executions reused one, {stats['prepared']} prepared")
+        return results
+    finally:
+        db.close()
+
+def _unprepared(db, fn):
+    # fn with every statement sent as text on a new cursor, as before the statement registry
+    def run(i):
+        prepared, db.prepared = db.prepared, False
+        try:
+            return fn(i)
+        finally:
+            db.prepared = prepared
+    return run
+
+def compare(results, baseline, threshold):
+    """Print operations whose p50 got worse than the baseline by more than threshold, returns how many"""
+    regressions = 0
+    for scale, operations in results.items():
+        for name, current in operations.items():
+            previous = baseline.get("results", {}).get(scale, {}).get(name)
+            if not previous:
+                continue
+            change = current["p50_ms"] / previous["p50_ms"] - 1 if previous["p50_ms"] else 0
+            marker = ""
+            if change > threshold:
+                marker = "  REGRESSION"
+                regressions += 1
+            print(f"  {scale:>8} {name:<28} {previous['p50_ms']:8.2f} -> {current['p50_ms']:8.2f} ms ({change:+.0%}){marker}")
+    return regressions
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DatabaseConnection operations at several data sizes")
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default=DB_BACKEND)
+    parser.add_argument("--database", help="scratch database (a file for sqlite), dropped and recreated")
+    parser.add_argument("--scales", default="10000,100000", help="comma separated donation row counts, e.g. 10000,100000,1000000")
+    parser.add_argument("--samples", type=int, default=200, help="timed calls per operation")
+    parser.add_argument("--scan-samples", type=int, default=3, help="timed calls of the full-table get_all_* reads")
+    parser.add_argument("--only", help="comma separated operations to run, e.g. add_donation,withdraw_supply")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-metrics", action="store_true", help="run without query timing, to measure its overhead")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p50 slowdown reported as a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+    args.only = set(args.only.split(",")) if args.only else None
+
+    if args.backend == "sqlite":
+        args.database = args.database or DB_CONFIG["database"] + "_bench.sqlite3"
+        if os.path.abspath(args.database) == os.path.abspath(SQLITE_PATH):
+            parser.error("refusing to benchmark against the application database, pass a scratch --database")
+        db_config = {"path": args.database}
+    else:
+        args.database = args.database or DB_CONFIG["database"] + "_bench"
+        if args.database == DB_CONFIG["database"]:
+            parser.error("refusing to benchmark against the application database, pass a scratch --database")
+        db_config = dict(DB_CONFIG, database=args.database)
+
+    results = {}
+    for rows in (int(scale) for scale in args.scales.split(",")):
+        print(f"{rows} rows:")
+        results[str(rows)] = run_scale(db_config, rows, args)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "backend": args.backend,
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "samples": args.samples,
+            "metrics": not args.no_metrics,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        print(f"Compared with {args.baseline}:")
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+# Classroom Connect core: inventory and donation logic with no GUI dependencies.
+#
+# Submodules are imported on demand (for example classroom_connect.database) so that
+# the command line starts without loading the database driver until it is needed.
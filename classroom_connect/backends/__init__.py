@@ -0,0 +1,14 @@
+# Storage backends behind DatabaseConnection: MySQL/MariaDB and embedded SQLite
+from .base import DEFAULT_LOCATION, Backend, PoolError
+
+def create_backend(name, db_config=None):
+    """Backend instance by name ("mysql" or "sqlite"), drivers are imported only when chosen"""
+    if name == "mysql":
+        from .mysql import MySQLBackend
+        return MySQLBackend(db_config)
+    if name == "sqlite":
+        from .sqlite import SQLiteBackend
+        return SQLiteBackend(db_config)
+    raise ValueError(f"Unknown database backend: {name}")
+
+__all__ = ["DEFAULT_LOCATION", "Backend", "PoolError", "create_backend"]
@@ -0,0 +1,163 @@
+# Interface every storage backend implements
+from contextlib import closing
+
+# Catalog every new database starts with, the same rows as the schema dump
+SUPPLY_NAMES = [
+    "Pencil", "Eraser", "Paper", "Pen", "Folder", "Ruler",
+    "Coloring Material", "Glue", "Scissors", "Sharpener",
+    "Notebook", "Books", "Others",
+]
+# Stockroom every new database starts with, it holds all stock from before locations existed
+DEFAULT_LOCATION = "Main Stockroom"
+
+class PoolError(Exception):
+    """No connection could be handed out (pool closed or exhausted)"""
+
+class Backend:
+    # Queries in DatabaseConnection are written once with %s placeholders. A backend opens
+    # connections whose cursors accept that style, and supplies the few statements whose
+    # syntax differs between servers.
+    name = None
+    # Exceptions DatabaseConnection methods treat as a failed operation
+    Error = (PoolError,)
+    # Exceptions after which a connection must not be reused
+    DisconnectErrors = ()
+    # "INSERT IGNORE" in MySQL, "INSERT OR IGNORE" in SQLite
+    insert_ignore = "INSERT IGNORE"
+    # Column definition for short text that is searched by case-insensitive prefix
+    text_column = "VARCHAR(255) NOT NULL DEFAULT ''"
+    # Prefix that turns a statement into a query plan
+    explain_prefix = "EXPLAIN"
+    # Whether prepared_cursor() gives server-side prepared statements worth keeping per connection
+    prepares_statements = False
+
+    def connect(self):
+        """Open a new connection"""
+        raise NotImplementedError
+
+    def ping(self, connection):
+        """Health check on checkout, reconnecting if the server dropped the session.
+
+        Returns True after a reconnect: the new session has none of the old one's prepared statements.
+        """
+        raise NotImplementedError
+
+    def driver(self):
+        """Name and version of the database driver in use"""
+        raise NotImplementedError
+
+    def prepared_cursor(self, connection):
+        """Cursor that prepares the first statement it runs and re-executes it with new parameters after that"""
+        raise NotImplementedError
+
+    def replica_config(self, replica):
+        """Connect arguments for a read replica of this database, given by host (a database file for SQLite)"""
+        raise NotImplementedError
+
+    def replica_lag(self, cursor):
+        """Seconds a replica is behind its primary. 0 for a database that isn't replicating (a copy
+        kept current some other way), None while replication is stopped or its delay is unknown."""
+        raise NotImplementedError
+
+    def schema(self):
+        """Idempotent statements that create every table, index and seed row the application needs"""
+        raise NotImplementedError
+
+    def stream_cursor(self, connection):
+        """Cursor that fetches rows from the server as they are read instead of all at once"""
+        return connection.cursor()
+
+    def bootstrap(self, connection):
+        with closing(connection.cursor()) as cursor:
+            for statement in self.schema():
+                cursor.execute(statement)
+        connection.commit()
+
+    def existing_columns(self, cursor, table):
+        """Names of the columns table currently has"""
+        raise NotImplementedError
+
+    def existing_indexes(self, cursor, table):
+        """{name: [columns]} of the indexes table currently has"""
+        raise NotImplementedError
+
+    def index_name(self, table, name):
+        return name
+
+    def ensure_columns(self, cursor, table, columns):
+        """Add the columns ({name: definition}) table doesn't have yet, returns the names added"""
+        existing = self.existing_columns(cursor, table)
+        added = []
+        for column, definition in columns.items():
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                added.append(column)
+        return added
+
+    def ensure_indexes(self, cursor, table, indexes, replace=False):
+        """Create the indexes ({name: [columns]}) table doesn't have yet, returns the names created.
+
+        With replace=True an existing index with different columns is rebuilt as well.
+        """
+        existing = self.existing_indexes(cursor, table)
+        changed = []
+        for name, columns in indexes.items():
+            index = self.index_name(table, name)
+            if index not in existing:
+                cursor.execute(f"CREATE INDEX {index} ON {table} ({', '.join(columns)})")
+            elif replace and existing[index] != list(columns):
+                self.replace_index(cursor, table, index, columns)
+            else:
+                continue
+            changed.append(name)
+        return changed
+
+    def replace_index(self, cursor, table, index, columns):
+        # One statement, so a foreign key that needs the old index is never left without one
+        cursor.execute(f"ALTER TABLE {table} DROP INDEX {index}, ADD INDEX {index} ({', '.join(columns)})")
+
+    def lock(self, cursor, name, timeout):
+        """Take a lock shared by every client of the database, False if it wasn't free within timeout.
+
+        Held until unlock(), which is called after the work it guards is committed or rolled back.
+        """
+        raise NotImplementedError
+
+    def unlock(self, cursor, name):
+        raise NotImplementedError
+
+    def sync_commits(self, cursor):
+        """Make every committed transaction durable against power loss, False if that can't be done now.
+
+        A server that flushes its log on every commit (InnoDB's default) has nothing left to do.
+        """
+        return True
+
+    def explain(self, cursor, sql, params=()):
+        """Query plan of sql as a list of dicts, one per plan row"""
+        cursor.execute(f"{self.explain_prefix} {sql}", params or ())
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def plan_problems(self, plan, covered=()):
+        """What is slow about an explain() plan: sorting the rows, or reading table rows for
+        one of the covered table aliases instead of answering from an index alone"""
+        raise NotImplementedError
+
+    def upsert_add(self, table, columns, values, keys):
+        """INSERT that adds the non-key columns onto an existing row with the same keys.
+
+        values are the SQL expressions for columns, usually %s placeholders.
+        """
+        raise NotImplementedError
+
+    def month_start(self, expression):
+        """SQL for the first day of the month of a date or timestamp expression"""
+        raise NotImplementedError
+
+    def update_returning(self, cursor, table, column, expression, where, params):
+        """UPDATE table SET column = expression WHERE where, returning the new value.
+
+        Returns None when no row matched. params fill the placeholders of expression then where.
+        """
+        raise NotImplementedError
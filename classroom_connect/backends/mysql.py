@@ -0,0 +1,295 @@
+# MySQL / MariaDB backend through mysql-connector-python
+import mysql.connector
+
+from ..config import DB_CONFIG
+from .base import DEFAULT_LOCATION, SUPPLY_NAMES, Backend, PoolError
+
+class MySQLBackend(Backend):
+    name = "mysql"
+    Error = (mysql.connector.Error, PoolError)
+    DisconnectErrors = (mysql.connector.OperationalError, mysql.connector.InterfaceError)
+    insert_ignore = "INSERT IGNORE"
+    prepares_statements = True
+
+    def __init__(self, db_config=None):
+        self.db_config = dict(db_config or DB_CONFIG)
+        # The C extension decodes packets and rows in C instead of the pure Python protocol
+        self.db_config.setdefault("use_pure", not mysql.connector.HAVE_CEXT)
+
+    def connect(self):
+        return mysql.connector.connect(**self.db_config)
+
+    def ping(self, connection):
+        # is_connected() pings the server
+        if connection.is_connected():
+            return False
+        connection.reconnect(attempts=3, delay=1)
+        return True
+
+    def driver(self):
+        protocol = "pure Python" if self.db_config["use_pure"] else "C extension"
+        return f"mysql-connector-python {mysql.connector.__version__} ({protocol})"
+
+    def prepared_cursor(self, connection):
+        # Server-side prepared statement, executed over the binary protocol. The cursor only
+        # prepares again when handed a different statement object than the last one.
+        return connection.cursor(prepared=True)
+
+    def replica_config(self, replica):
+        return dict(self.db_config, host=replica)
+
+    def replica_lag(self, cursor):
+        # SHOW REPLICA STATUS from MySQL 8.0.22 and MariaDB 10.5, SHOW SLAVE STATUS before that.
+        # Both need the REPLICATION CLIENT privilege, without it the delay is unknown.
+        for statement in ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS"):
+            try:
+                cursor.execute(statement)
+            except mysql.connector.Error:
+                continue
+            columns = [column[0] for column in cursor.description]
+            lags = []
+            for row in cursor.fetchall():
+                status = dict(zip(columns, row))
+                lags.append(status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master")))
+            if not lags:
+                return 0
+            # One row per replication channel, the delay is NULL on any that is stopped
+            return None if None in lags else max(lags)
+        return None
+
+    def stream_cursor(self, connection):
+        # Unbuffered: rows stay on the server socket until fetched
+        return connection.cursor(buffered=False)
+
+    def schema(self):
+        # Same tables as schoolsuppliesdonationdb.sql, for servers where the dump was never imported
+        return [
+            """
+            CREATE TABLE IF NOT EXISTS supplies (
+                id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                supply_name VARCHAR(255) NOT NULL,
+                quantity INT NOT NULL,
+                row_version BIGINT NOT NULL DEFAULT 0,
+                UNIQUE KEY supply_name (supply_name)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS donations (
+                id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                donor_name VARCHAR(255) NOT NULL,
+                contact_info VARCHAR(255) NOT NULL,
+                address TEXT NOT NULL,
+                barangay VARCHAR(255) NOT NULL DEFAULT '',
+                city VARCHAR(255) NOT NULL DEFAULT '',
+                province VARCHAR(255) NOT NULL DEFAULT '',
+                supply_id INT NOT NULL,
+                quantity INT NOT NULL,
+                donation_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                row_version BIGINT NOT NULL DEFAULT 0,
+                location_id INT NOT NULL DEFAULT 1,
+                KEY supply_id (supply_id, quantity),
+                KEY row_version (row_version),
+                KEY donor_name (donor_name, id),
+                CONSTRAINT donations_ibfk_1 FOREIGN KEY (supply_id) REFERENCES supplies (id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS withdrawals (
+                id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                supply_id INT NOT NULL,
+                quantity INT NOT NULL,
+                withdrawal_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                row_version BIGINT NOT NULL DEFAULT 0,
+                location_id INT NOT NULL DEFAULT 1,
+                KEY supply_id (supply_id, quantity),
+                KEY row_version (row_version),
+                KEY withdrawal_date (withdrawal_date, id, supply_id, quantity),
+                CONSTRAINT withdrawals_ibfk_1 FOREIGN KEY (supply_id) REFERENCES supplies (id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS locations (
+                id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                location_name VARCHAR(255) NOT NULL,
+                UNIQUE KEY location_name (location_name)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS location_stock (
+                location_id INT NOT NULL,
+                supply_id INT NOT NULL,
+                quantity INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (location_id, supply_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS transfers (
+                id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                supply_id INT NOT NULL,
+                from_location_id INT NOT NULL,
+                to_location_id INT NOT NULL,
+                quantity INT NOT NULL,
+                transfer_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                row_version BIGINT NOT NULL DEFAULT 0,
+                KEY supply_id (supply_id),
+                KEY from_location_id (from_location_id),
+                KEY to_location_id (to_location_id),
+                KEY transfer_date (transfer_date, id),
+                CONSTRAINT transfers_ibfk_1 FOREIGN KEY (supply_id) REFERENCES supplies (id),
+                CONSTRAINT transfers_ibfk_2 FOREIGN KEY (from_location_id) REFERENCES locations (id),
+                CONSTRAINT transfers_ibfk_3 FOREIGN KEY (to_location_id) REFERENCES locations (id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS classroom_requests (
+                id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                classroom VARCHAR(255) NOT NULL,
+                supply_id INT NOT NULL,
+                quantity INT NOT NULL,
+                allocated INT NOT NULL DEFAULT 0,
+                priority INT NOT NULL DEFAULT 0,
+                status VARCHAR(16) NOT NULL DEFAULT 'open',
+                request_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                row_version BIGINT NOT NULL DEFAULT 0,
+                KEY status (status, supply_id),
+                KEY row_version (row_version),
+                KEY supply_id (supply_id),
+                CONSTRAINT classroom_requests_ibfk_1 FOREIGN KEY (supply_id) REFERENCES supplies (id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS request_allocations (
+                row_version BIGINT NOT NULL,
+                request_id INT NOT NULL,
+                quantity INT NOT NULL,
+                allocation_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (row_version, request_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS table_versions (
+                table_name VARCHAR(64) NOT NULL PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT NOT NULL PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS intake_checkpoints (
+                queue_id VARCHAR(64) NOT NULL PRIMARY KEY,
+                last_seq BIGINT NOT NULL DEFAULT 0
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS stock_movements (
+                id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                supply_id INT NOT NULL,
+                quantity INT NOT NULL,
+                kind VARCHAR(16) NOT NULL,
+                moved_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                KEY moved_at (moved_at, id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS stock_checkpoints (
+                movement_id BIGINT NOT NULL,
+                supply_id INT NOT NULL,
+                balance BIGINT NOT NULL,
+                moved_until TIMESTAMP NULL DEFAULT NULL,
+                PRIMARY KEY (movement_id, supply_id),
+                KEY moved_until (moved_until, movement_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS supply_daily_totals (
+                day DATE NOT NULL,
+                supply_id INT NOT NULL,
+                donated BIGINT NOT NULL DEFAULT 0,
+                donation_count INT NOT NULL DEFAULT 0,
+                withdrawn BIGINT NOT NULL DEFAULT 0,
+                withdrawal_count INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, supply_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS donor_monthly_totals (
+                month DATE NOT NULL,
+                donor_name VARCHAR(255) NOT NULL,
+                contact_info VARCHAR(255) NOT NULL,
+                quantity BIGINT NOT NULL DEFAULT 0,
+                donation_count INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (month, donor_name, contact_info)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS location_monthly_totals (
+                month DATE NOT NULL,
+                province VARCHAR(255) NOT NULL,
+                city VARCHAR(255) NOT NULL,
+                quantity BIGINT NOT NULL DEFAULT 0,
+                donation_count INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (month, province, city)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            """,
+            "INSERT IGNORE INTO supplies (supply_name, quantity) VALUES "
+            + ", ".join(f"('{name}', 0)" for name in SUPPLY_NAMES),
+            f"INSERT IGNORE INTO locations (id, location_name) VALUES (1, '{DEFAULT_LOCATION}')",
+            "INSERT IGNORE INTO table_versions (table_name, version) VALUES ('supplies', 0), ('summaries', 0), ('ledger', 0)",
+        ]
+
+    def existing_columns(self, cursor, table):
+        cursor.execute("""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table,))
+        return {row[0] for row in cursor.fetchall()}
+
+    def existing_indexes(self, cursor, table):
+        cursor.execute("""
+            SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ORDER BY INDEX_NAME, SEQ_IN_INDEX
+        """, (table,))
+        indexes = {}
+        for index, column in cursor.fetchall():
+            indexes.setdefault(index, []).append(column)
+        return indexes
+
+    def lock(self, cursor, name, timeout):
+        # Named server lock, released automatically if the session dies
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+        return cursor.fetchone()[0] == 1
+
+    def unlock(self, cursor, name):
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+        cursor.fetchall()
+
+    def plan_problems(self, plan, covered=()):
+        problems = []
+        for row in plan:
+            extra = [note.strip() for note in (row.get("Extra") or "").split(";")]
+            if "Using filesort" in extra or "Using temporary" in extra:
+                problems.append(f"sorts {row['table']} rows ({row.get('Extra')})")
+            if row.get("table") in covered and "Using index" not in extra:
+                problems.append(f"reads {row['table']} table rows ({row.get('type')} on {row.get('key') or 'no index'})")
+        return problems
+
+    def upsert_add(self, table, columns, values, keys):
+        updates = ", ".join(f"{column} = {column} + VALUES({column})" for column in columns if column not in keys)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(values)}) "
+                f"ON DUPLICATE KEY UPDATE {updates}")
+
+    def month_start(self, expression):
+        return f"(DATE({expression}) - INTERVAL (DAYOFMONTH({expression}) - 1) DAY)"
+
+    def update_returning(self, cursor, table, column, expression, where, params):
+        # LAST_INSERT_ID(expr) hands the new value back in the UPDATE's reply, no extra round trip
+        cursor.execute(f"UPDATE {table} SET {column} = LAST_INSERT_ID({expression}) WHERE {where}", params)
+        if cursor.rowcount == 0:
+            return None
+        return cursor.lastrowid
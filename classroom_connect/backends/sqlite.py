@@ -0,0 +1,313 @@
+# Embedded SQLite backend in WAL mode, for single-site installs without a database server
+import sqlite3
+
+from ..config import SQLITE_PATH
+from .base import DEFAULT_LOCATION, SUPPLY_NAMES, Backend, PoolError
+
+# Milliseconds a connection waits for another one's write lock before giving up
+BUSY_TIMEOUT_MS = 5000
+# Applied to every new connection. WAL lets readers run alongside the single writer and
+# synchronous=NORMAL skips the fsync per commit (the database stays consistent on a crash,
+# only the last few commits before a power loss can be lost). Callers that need a commit to
+# survive power loss call sync_commits().
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+]
+# Compiled statements kept per connection, so repeated queries skip the SQL parser
+STATEMENT_CACHE_SIZE = 256
+
+class FormatCursor(sqlite3.Cursor):
+    # Accepts the %s placeholders the shared queries use, sqlite3 itself only knows ?
+    def execute(self, sql, parameters=()):
+        return super().execute(sql.replace("%s", "?"), parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return super().executemany(sql.replace("%s", "?"), seq_of_parameters)
+
+class FormatConnection(sqlite3.Connection):
+    def cursor(self, factory=FormatCursor):
+        return super().cursor(factory)
+
+class SQLiteBackend(Backend):
+    name = "sqlite"
+    Error = (sqlite3.Error, PoolError)
+    DisconnectErrors = ()
+    insert_ignore = "INSERT OR IGNORE"
+    # NOCASE matches the case-insensitive MySQL collation and lets LIKE 'prefix%' use the index
+    text_column = "TEXT NOT NULL DEFAULT '' COLLATE NOCASE"
+    explain_prefix = "EXPLAIN QUERY PLAN"
+    # Connections already keep compiled statements by SQL text (STATEMENT_CACHE_SIZE). Keeping
+    # cursors around as well measured slower than opening a new one per call.
+    prepares_statements = False
+
+    def __init__(self, db_config=None):
+        self.path = (db_config or {}).get("path", SQLITE_PATH)
+
+    def connect(self):
+        # Pooled connections move between threads, but only one thread uses each at a time
+        connection = sqlite3.connect(
+            self.path,
+            factory=FormatConnection,
+            check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for pragma in PRAGMAS:
+            connection.execute(pragma)
+        return connection
+
+    def ping(self, connection):
+        connection.execute("SELECT 1")
+        return False
+
+    def driver(self):
+        return f"sqlite3 {sqlite3.sqlite_version}"
+
+    def replica_config(self, replica):
+        return {"path": replica}
+
+    def replica_lag(self, cursor):
+        # A second database file doesn't replicate, whatever copies it keeps it current. How far
+        # behind it is shows in its write version alone.
+        return 0
+
+    def schema(self):
+        return [
+            """
+            CREATE TABLE IF NOT EXISTS supplies (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                supply_name TEXT NOT NULL UNIQUE,
+                quantity INTEGER NOT NULL,
+                row_version INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS donations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                donor_name TEXT NOT NULL COLLATE NOCASE,
+                contact_info TEXT NOT NULL COLLATE NOCASE,
+                address TEXT NOT NULL,
+                barangay TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+                city TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+                province TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+                supply_id INTEGER NOT NULL REFERENCES supplies (id),
+                quantity INTEGER NOT NULL,
+                donation_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                row_version INTEGER NOT NULL DEFAULT 0,
+                location_id INTEGER NOT NULL DEFAULT 1
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS donations_supply_id ON donations (supply_id, quantity)",
+            "CREATE INDEX IF NOT EXISTS donations_donor_name ON donations (donor_name, id)",
+            """
+            CREATE TABLE IF NOT EXISTS withdrawals (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                supply_id INTEGER NOT NULL REFERENCES supplies (id),
+                quantity INTEGER NOT NULL,
+                withdrawal_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                row_version INTEGER NOT NULL DEFAULT 0,
+                location_id INTEGER NOT NULL DEFAULT 1
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS withdrawals_supply_id ON withdrawals (supply_id, quantity)",
+            "CREATE INDEX IF NOT EXISTS withdrawals_withdrawal_date ON withdrawals (withdrawal_date, id, supply_id, quantity)",
+            """
+            CREATE TABLE IF NOT EXISTS locations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                location_name TEXT NOT NULL UNIQUE COLLATE NOCASE
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS location_stock (
+                location_id INTEGER NOT NULL,
+                supply_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (location_id, supply_id)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS transfers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                supply_id INTEGER NOT NULL REFERENCES supplies (id),
+                from_location_id INTEGER NOT NULL REFERENCES locations (id),
+                to_location_id INTEGER NOT NULL REFERENCES locations (id),
+                quantity INTEGER NOT NULL,
+                transfer_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                row_version INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS transfers_transfer_date ON transfers (transfer_date, id)",
+            """
+            CREATE TABLE IF NOT EXISTS classroom_requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                classroom TEXT NOT NULL,
+                supply_id INTEGER NOT NULL REFERENCES supplies (id),
+                quantity INTEGER NOT NULL,
+                allocated INTEGER NOT NULL DEFAULT 0,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'open',
+                request_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                row_version INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS classroom_requests_status ON classroom_requests (status, supply_id)",
+            "CREATE INDEX IF NOT EXISTS classroom_requests_row_version ON classroom_requests (row_version)",
+            """
+            CREATE TABLE IF NOT EXISTS request_allocations (
+                row_version INTEGER NOT NULL,
+                request_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                allocation_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (row_version, request_id)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS table_versions (
+                table_name TEXT NOT NULL PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER NOT NULL PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS intake_checkpoints (
+                queue_id TEXT NOT NULL PRIMARY KEY,
+                last_seq INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS stock_movements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                supply_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                moved_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS stock_movements_moved_at ON stock_movements (moved_at, id)",
+            """
+            CREATE TABLE IF NOT EXISTS stock_checkpoints (
+                movement_id INTEGER NOT NULL,
+                supply_id INTEGER NOT NULL,
+                balance INTEGER NOT NULL,
+                moved_until TIMESTAMP,
+                PRIMARY KEY (movement_id, supply_id)
+            ) WITHOUT ROWID
+            """,
+            "CREATE INDEX IF NOT EXISTS stock_checkpoints_moved_until ON stock_checkpoints (moved_until, movement_id)",
+            """
+            CREATE TABLE IF NOT EXISTS supply_daily_totals (
+                day DATE NOT NULL,
+                supply_id INTEGER NOT NULL,
+                donated INTEGER NOT NULL DEFAULT 0,
+                donation_count INTEGER NOT NULL DEFAULT 0,
+                withdrawn INTEGER NOT NULL DEFAULT 0,
+                withdrawal_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, supply_id)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS donor_monthly_totals (
+                month DATE NOT NULL,
+                donor_name TEXT NOT NULL,
+                contact_info TEXT NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 0,
+                donation_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (month, donor_name, contact_info)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS location_monthly_totals (
+                month DATE NOT NULL,
+                province TEXT NOT NULL,
+                city TEXT NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 0,
+                donation_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (month, province, city)
+            ) WITHOUT ROWID
+            """,
+            "INSERT OR IGNORE INTO supplies (supply_name, quantity) VALUES "
+            + ", ".join(f"('{name}', 0)" for name in SUPPLY_NAMES),
+            f"INSERT OR IGNORE INTO locations (id, location_name) VALUES (1, '{DEFAULT_LOCATION}')",
+            "INSERT OR IGNORE INTO table_versions (table_name, version) VALUES ('supplies', 0), ('summaries', 0), ('ledger', 0)",
+        ]
+
+    def existing_columns(self, cursor, table):
+        cursor.execute(f"PRAGMA table_info({table})")
+        return {row[1] for row in cursor.fetchall()}
+
+    def existing_indexes(self, cursor, table):
+        cursor.execute(f"PRAGMA index_list({table})")
+        indexes = {}
+        for index in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f"PRAGMA index_info({index})")
+            indexes[index] = [row[2] for row in sorted(cursor.fetchall())]
+        return indexes
+
+    def replace_index(self, cursor, table, index, columns):
+        cursor.execute(f"DROP INDEX {index}")
+        cursor.execute(f"CREATE INDEX {index} ON {table} ({', '.join(columns)})")
+
+    def lock(self, cursor, name, timeout):
+        # SQLite has no named locks, the database write lock stands in for all of them. DDL is
+        # transactional here, so the guarded work and its commit happen under the same lock.
+        # The connection must not be in a transaction already.
+        try:
+            cursor.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+            cursor.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            return False
+        finally:
+            cursor.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        return True
+
+    def unlock(self, cursor, name):
+        # The commit or rollback that ended the guarded work released the write lock
+        pass
+
+    def sync_commits(self, cursor):
+        # Under synchronous=NORMAL the WAL is only fsynced by a checkpoint. A FULL one waits for
+        # the writer and readers, and has copied every commit into the fsynced database file
+        # unless it reports being blocked.
+        cursor.execute("PRAGMA wal_checkpoint(FULL)")
+        busy, frames, copied = cursor.fetchone()
+        return not busy and frames == copied
+
+    def index_name(self, table, name):
+        # SQLite index names are global to the database, not per table
+        return f"{table}_{name}"
+
+    def plan_problems(self, plan, covered=()):
+        problems = []
+        for row in plan:
+            detail = row["detail"]
+            words = detail.split()
+            if "TEMP B-TREE" in detail:
+                problems.append(detail.lower())
+            elif words[0] in ("SCAN", "SEARCH") and words[1] in covered and "COVERING INDEX" not in detail:
+                problems.append(f"reads {words[1]} table rows ({detail.lower()})")
+        return problems
+
+    def upsert_add(self, table, columns, values, keys):
+        updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in columns if column not in keys)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(values)}) "
+                f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}")
+
+    def month_start(self, expression):
+        return f"date({expression}, 'start of month')"
+
+    def update_returning(self, cursor, table, column, expression, where, params):
+        cursor.execute(f"UPDATE {table} SET {column} = {expression} WHERE {where} RETURNING {column}", params)
+        row = cursor.fetchone()
+        return row[0] if row else None
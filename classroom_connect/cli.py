@@ -0,0 +1,431 @@
+# Command line interface: python -m classroom_connect <command> ...
+#
+# Only argparse is imported up front. The database driver is loaded by the commands that
+# need it and Tk is never imported, so the CLI starts fast and runs on servers without a display.
+import argparse
+import sys
+
+# Connections opened by the running command, closed on the way out so a metrics file gets its final write
+_connections = []
+
+def _connect(**options):
+    from .database import DatabaseConnection
+    db = DatabaseConnection(**options)
+    _connections.append(db)
+    return db
+
+def date(text):
+    # argparse type for YYYY-MM-DD, datetime is only loaded once a date is given
+    import datetime
+    return datetime.date.fromisoformat(text)
+
+def _print_table(headers, rows):
+    rows = [[str(value) for value in row] for row in rows]
+    widths = [max([len(header)] + [len(row[i]) for row in rows]) for i, header in enumerate(headers)]
+    print("  ".join(header.ljust(width) for header, width in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+def cmd_add_donation(args):
+    from .validation import validate_donations
+    record = {
+        "donor_name": args.donor,
+        "contact_info": args.contact,
+        "barangay": args.barangay,
+        "city": args.city,
+        "province": args.province,
+        "supply_name": args.supply,
+        "quantity": args.quantity,
+    }
+    donations, errors = validate_donations([record])
+    if errors:
+        for _, _, message in errors:
+            print(message, file=sys.stderr)
+        return 2
+    db = _connect()
+    if not db.add_donation(*donations[0][1], location=args.location):
+        print("Failed to record donation.", file=sys.stderr)
+        return 1
+    print("Your donation has been recorded.")
+    return 0
+
+def cmd_withdraw(args):
+    if args.quantity <= 0:
+        print("Quantity must be greater than 0", file=sys.stderr)
+        return 2
+    db = _connect()
+    success, message, new_balance = db.withdraw_supply(args.supply, args.quantity, location=args.location)
+    if not success:
+        print(message, file=sys.stderr)
+        return 1
+    print(f"{message}. {new_balance} {args.supply} left in stock at {args.location or db.location}.")
+    return 0
+
+def cmd_transfer(args):
+    if args.quantity <= 0:
+        print("Quantity must be greater than 0", file=sys.stderr)
+        return 2
+    db = _connect()
+    source = args.source or db.location
+    success, message, remaining = db.transfer_stock(args.supply, args.quantity, source, args.destination)
+    if not success:
+        print(message, file=sys.stderr)
+        return 1
+    print(f"{message}. {remaining} {args.supply} left at {source}.")
+    return 0
+
+def cmd_locations(args):
+    db = _connect()
+    if args.add:
+        success, message = db.add_location(args.add)
+        print(message, file=sys.stdout if success else sys.stderr)
+        return 0 if success else 1
+    _print_table(["Location", "On Hand", "Supplies"], db.get_locations())
+    return 0
+
+def cmd_list(args):
+    db = _connect()
+    if args.table == "supplies" and args.location:
+        if not db.get_location_id(args.location):
+            print(f"Location not found: {args.location}", file=sys.stderr)
+            return 1
+        _print_table(["Supply Name", "Quantity"], db.get_location_stock(args.location))
+    elif args.table == "supplies":
+        _print_table(["Supply Name", "Quantity"], db.get_all_supplies())
+    elif args.table == "donations":
+        filters = {
+            "donor": args.donor,
+            "contact": args.contact,
+            "city": args.city,
+            "province": args.province,
+            "supply": args.supply,
+            "date_from": args.start,
+            "date_to": args.end,
+        }
+        rows = db.search_donations(filters, limit=args.limit)
+        _print_table(["ID", "Donor Name", "Contact", "Address", "Supply Name", "Quantity"], rows)
+    elif args.table == "transfers":
+        rows = db.get_transfers(limit=args.limit)
+        _print_table(["ID", "Supply Name", "From", "To", "Quantity", "Date"], rows)
+    else:
+        rows = db.get_withdrawals_page(limit=args.limit)
+        _print_table(["ID", "Supply Name", "Quantity", "Date"], rows)
+    return 0
+
+def cmd_report(args):
+    db = _connect()
+    if args.by_location:
+        locations, rows = db.get_stock_by_location()
+        _print_table(["Supply Name", "Total"] + locations, rows)
+        return 0
+    _print_table(["Supply Name", "On Hand", "Donated", "Withdrawn"], db.get_stock_report())
+    return 0
+
+def cmd_summary(args):
+    from .reports import period_range
+    start, end = period_range(args.period.replace("-", " ").title())
+    start = args.start or start
+    end = args.end or end
+    db = _connect()
+    if args.report == "supplies":
+        rows = db.get_supply_totals(start, end, period="day" if args.daily else "month")
+        _print_table(["Day" if args.daily else "Month", "Supply Name", "Donated", "Withdrawn"], rows)
+    elif args.report == "donors":
+        _print_table(["Donor Name", "Contact", "Quantity", "Donations"], db.get_top_donors(start, end, limit=args.limit))
+    elif args.report == "provinces":
+        _print_table(["Province", "Quantity", "Donations"], db.get_location_totals(start, end))
+    else:
+        _print_table(["Province", "City", "Quantity", "Donations"], db.get_location_totals(start, end, by="city"))
+    return 0
+
+def cmd_forecast(args):
+    from .forecast import LEAD_DAYS, YEAR_DAYS, forecast_demand
+    lead_days = LEAD_DAYS if args.lead_days is None else args.lead_days
+    if not 1 <= lead_days <= YEAR_DAYS:
+        print(f"--lead-days must be between 1 and {YEAR_DAYS}", file=sys.stderr)
+        return 2
+    db = _connect()
+    forecast = forecast_demand(db, lead_days=lead_days)
+    rows = forecast.alerts() if args.alerts else forecast.rows()
+    _print_table(["Supply Name", "On Hand", "Per Day", "Last 7 Days", "Forecast", "Days Left", "Reorder At",
+                  "Order", "Status"],
+                 [row[:5] + ("-" if row[5] is None else row[5],) + row[6:] for row in rows])
+    # Exit status 1 when something needs restocking, for scheduled checks
+    return 1 if args.alerts and rows else 0
+
+def cmd_requests(args):
+    if args.action == "add":
+        from .validation import validate_requests
+        record = {"classroom": args.classroom, "supply_name": args.supply, "quantity": args.quantity,
+                  "priority": args.priority}
+        requests, errors = validate_requests([record])
+        if errors:
+            for _, _, message in errors:
+                print(message, file=sys.stderr)
+            return 2
+        db = _connect()
+        success, message = db.add_classroom_requests([requests[0][1]])
+        print(message, file=sys.stdout if success else sys.stderr)
+        return 0 if success else 1
+    if args.action == "import":
+        if not args.file:
+            print("requests import needs --file", file=sys.stderr)
+            return 2
+        from .importer import import_requests
+        return _import(import_requests, args)
+    db = _connect()
+    if args.action == "list":
+        _print_table(["ID", "Classroom", "Supply Name", "Quantity", "Allocated", "Priority", "Status", "Date"],
+                     db.get_classroom_requests(open_only=not args.all, limit=args.limit))
+        return 0
+    success, message, allocations = db.allocate_requests(args.method, location=args.location, commit=not args.dry_run)
+    if allocations:
+        _print_table(["ID", "Classroom", "Supply Name", "Outstanding", "Allocated"],
+                     allocations if args.verbose else [allocation for allocation in allocations if allocation[4]])
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+def cmd_rebuild_summaries(args):
+    db = _connect()
+    success, message = db.rebuild_summaries()
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+def cmd_ledger(args):
+    if args.action == "at" and not args.day:
+        print("ledger at needs a day, YYYY-MM-DD", file=sys.stderr)
+        return 2
+    db = _connect()
+    if args.action == "at":
+        # The stock at the end of the given day
+        import datetime
+        moment = datetime.datetime.combine(args.day + datetime.timedelta(days=1), datetime.time())
+        _print_table(["Supply Name", "Quantity"], db.get_stock_at(moment))
+        return 0
+    if args.action == "reconcile":
+        success, message, mismatches = db.reconcile_stock(full=args.full)
+        if mismatches:
+            _print_table(["Supply Name", "Quantity", "Ledger"], mismatches)
+        print(message, file=sys.stdout if success and not mismatches else sys.stderr)
+        return 0 if success and not mismatches else 1
+    if args.action == "checkpoint":
+        success, message = db.checkpoint_stock()
+    else:
+        success, message = db.rebuild_ledger()
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+def cmd_migrate(args):
+    # Connect without migrating, so there is a before to compare against
+    db = _connect(migrate=False)
+    if args.status:
+        _print_table(["Version", "Migration", "Applied"],
+                     [(version, name, applied_at or "pending") for version, name, applied_at in db.migration_status()])
+        return 0
+    before = db.check_query_plans() if args.plans else None
+    success, message, _ = db.migrate()
+    print(message, file=sys.stdout if success else sys.stderr)
+    if before is not None:
+        after = db.check_query_plans()
+        _print_table(["Query", "Before", "After"], [
+            (name, "; ".join(old) or "ok", "; ".join(new) or "ok")
+            for (name, old, _), (_, new, _) in zip(before, after)
+        ])
+    return 0 if success else 1
+
+def cmd_plans(args):
+    db = _connect()
+    results = db.check_query_plans()
+    for name, problems, plan in results:
+        print(f"{name}: {'; '.join(problems) if problems else 'ok'}")
+        if args.verbose:
+            for row in plan:
+                print("    " + ", ".join(f"{key}={value}" for key, value in row.items() if value is not None))
+    return 1 if any(problems for _, problems, _ in results) else 0
+
+def cmd_flush_intake(args):
+    from .config import INTAKE_JOURNAL
+    from .intake import IntakeQueue
+    db = _connect()
+    # Opening the queue replays every entry the journal holds beyond the committed checkpoint
+    intake = IntakeQueue(db, args.journal or INTAKE_JOURNAL)
+    backlog = intake.backlog()
+    if not intake.close(timeout=args.timeout):
+        print(f"{intake.backlog()} queued donations could not be saved", file=sys.stderr)
+        return 1
+    if intake.rejected:
+        print(f"Saved {backlog - intake.rejected} queued donations, {intake.rejected} were rejected, "
+              f"see {intake.rejected_path}", file=sys.stderr)
+        return 1
+    print(f"Saved {backlog} queued donations")
+    return 0
+
+def cmd_import(args):
+    from .importer import import_donations
+    return _import(import_donations, args, location=args.location)
+
+def _import(import_file, args, **options):
+    # import_file is import_donations or import_requests
+    from .importer import IMPORT_BATCH_SIZE
+    db = _connect()
+    try:
+        summary = import_file(db, args.file, batch_size=args.batch_size or IMPORT_BATCH_SIZE, error_report=args.errors,
+                              **options)
+    except (OSError, UnicodeDecodeError) as e:
+        # The batches before the one being read stay imported
+        print(f"Could not import {args.file}: {e}", file=sys.stderr)
+        return 1
+    print(f"Imported {summary['imported']} of {summary['rows']} rows in {summary['seconds']:.2f}s.")
+    if summary["failed"]:
+        print(f"{summary['failed']} rows were rejected, see {summary['error_report']}", file=sys.stderr)
+        return 1
+    return 0
+
+def cmd_export(args):
+    from .export import export_donations, export_withdrawals
+    db = _connect()
+    filters = {"supply": args.supply, "date_from": args.start, "date_to": args.end}
+    export = export_donations if args.table == "donations" else export_withdrawals
+
+    def progress(count):
+        if sys.stderr.isatty():
+            print(f"\r{count} {args.table} exported", end="", file=sys.stderr, flush=True)
+
+    count = export(db, args.file, filters, progress=progress)
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    print(f"Exported {count} {args.table} to {args.file}")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="classroom_connect", description="Classroom Connect inventory and donations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add-donation", help="record a donation")
+    add.add_argument("--donor", required=True)
+    add.add_argument("--contact", required=True, help="email or Philippine phone number")
+    add.add_argument("--barangay", default="")
+    add.add_argument("--city", required=True)
+    add.add_argument("--province", required=True)
+    add.add_argument("--supply", required=True)
+    add.add_argument("--quantity", required=True)
+    add.add_argument("--location", help="stockroom (default: CLASSROOM_LOCATION or the main stockroom)")
+    add.set_defaults(handler=cmd_add_donation)
+
+    withdraw = commands.add_parser("withdraw", help="withdraw supplies from stock")
+    withdraw.add_argument("supply")
+    withdraw.add_argument("quantity", type=int)
+    withdraw.add_argument("--location", help="stockroom (default: CLASSROOM_LOCATION or the main stockroom)")
+    withdraw.set_defaults(handler=cmd_withdraw)
+
+    transfer = commands.add_parser("transfer", help="move stock from one location to another")
+    transfer.add_argument("supply")
+    transfer.add_argument("quantity", type=int)
+    transfer.add_argument("--from", dest="source", help="stockroom (default: CLASSROOM_LOCATION or the main stockroom)")
+    transfer.add_argument("--to", dest="destination", required=True)
+    transfer.set_defaults(handler=cmd_transfer)
+
+    locations = commands.add_parser("locations", help="list the stockrooms with their stock on hand")
+    locations.add_argument("--add", metavar="NAME", help="create a new location")
+    locations.set_defaults(handler=cmd_locations)
+
+    listing = commands.add_parser("list", help="list supplies, donations, withdrawals or transfers")
+    listing.add_argument("table", choices=["supplies", "donations", "withdrawals", "transfers"])
+    listing.add_argument("--limit", type=int, default=50, help="rows to show for donations, withdrawals and transfers")
+    listing.add_argument("--location", help="supplies at one location instead of the total across all of them")
+    search = listing.add_argument_group("donation filters", "text filters match the start of the value, ignoring case")
+    search.add_argument("--donor")
+    search.add_argument("--contact")
+    search.add_argument("--city")
+    search.add_argument("--province")
+    search.add_argument("--supply", help="exact supply name")
+    search.add_argument("--from", dest="start", type=date, help="first day, YYYY-MM-DD")
+    search.add_argument("--to", dest="end", type=date, help="last day, YYYY-MM-DD")
+    listing.set_defaults(handler=cmd_list)
+
+    report = commands.add_parser("report", help="stock on hand with donated and withdrawn totals")
+    report.add_argument("--by-location", action="store_true", help="stock on hand at each location instead")
+    report.set_defaults(handler=cmd_report)
+
+    summary = commands.add_parser("summary", help="donation and withdrawal totals from the summary tables")
+    summary.add_argument("report", choices=["supplies", "donors", "provinces", "cities"])
+    summary.add_argument("--period", default="all-time",
+                         choices=["this-month", "this-quarter", "this-year", "last-12-months", "all-time"])
+    summary.add_argument("--from", dest="start", type=date, help="first day, YYYY-MM-DD")
+    summary.add_argument("--to", dest="end", type=date, help="last day, YYYY-MM-DD")
+    summary.add_argument("--daily", action="store_true", help="supplies per day instead of per month")
+    summary.add_argument("--limit", type=int, default=10, help="donors to show")
+    summary.set_defaults(handler=cmd_summary)
+
+    forecast = commands.add_parser("forecast", help="consumption rates, days of stock left and reorder alerts")
+    forecast.add_argument("--alerts", action="store_true", help="only supplies that are out of stock or due for reorder")
+    forecast.add_argument("--lead-days", type=int, help="days a restock takes to arrive (default 14)")
+    forecast.set_defaults(handler=cmd_forecast)
+
+    requests = commands.add_parser("requests", help="classroom supply requests and allocating stock to them")
+    requests.add_argument("action", choices=["add", "import", "list", "allocate"])
+    requests.add_argument("--classroom", help="for add")
+    requests.add_argument("--supply", help="for add")
+    requests.add_argument("--quantity", help="for add")
+    requests.add_argument("--priority", default="0", help="for add, higher is served first (default 0)")
+    requests.add_argument("--file", help="for import, a CSV, JSON or JSON Lines file")
+    requests.add_argument("--batch-size", type=int, help="for import")
+    requests.add_argument("--errors", help="for import, where to write rejected rows (default: <file>.errors.csv)")
+    requests.add_argument("--all", action="store_true", help="for list, filled requests as well")
+    requests.add_argument("--limit", type=int, default=50, help="for list")
+    requests.add_argument("--method", default="max-min", choices=["priority", "proportional", "max-min"],
+                          help="for allocate (default max-min)")
+    requests.add_argument("--location", help="for allocate, stockroom (default: CLASSROOM_LOCATION or the main stockroom)")
+    requests.add_argument("--dry-run", action="store_true", help="for allocate, show the allocation without withdrawing")
+    requests.add_argument("--verbose", action="store_true", help="for allocate, requests that get nothing as well")
+    requests.set_defaults(handler=cmd_requests)
+
+    rebuild = commands.add_parser("rebuild-summaries", help="recompute the summary tables from all records")
+    rebuild.set_defaults(handler=cmd_rebuild_summaries)
+
+    ledger = commands.add_parser("ledger", help="stock movement ledger: past stock levels and reconciliation")
+    ledger.add_argument("action", choices=["at", "reconcile", "checkpoint", "rebuild"])
+    ledger.add_argument("day", nargs="?", type=date, help="YYYY-MM-DD, for at")
+    ledger.add_argument("--full", action="store_true", help="reconcile against the whole ledger, not the last checkpoint")
+    ledger.set_defaults(handler=cmd_ledger)
+
+    migrate = commands.add_parser("migrate", help="apply pending schema migrations")
+    migrate.add_argument("--status", action="store_true", help="list the migrations and when each was applied")
+    migrate.add_argument("--plans", action="store_true", help="compare the query plans before and after migrating")
+    migrate.set_defaults(handler=cmd_migrate)
+
+    plans = commands.add_parser("plans", help="check the record listing and report queries use their indexes")
+    plans.add_argument("--verbose", action="store_true", help="show each query plan")
+    plans.set_defaults(handler=cmd_plans)
+
+    flush = commands.add_parser("flush-intake", help="commit donations left in the intake queue journal")
+    flush.add_argument("--journal", help="journal file (default: CLASSROOM_INTAKE_JOURNAL or intake.journal)")
+    flush.add_argument("--timeout", type=float, default=60, help="seconds to keep retrying")
+    flush.set_defaults(handler=cmd_flush_intake)
+
+    importer = commands.add_parser("import", help="bulk import donations from a CSV, JSON or JSON Lines file")
+    importer.add_argument("file")
+    importer.add_argument("--batch-size", type=int)
+    importer.add_argument("--errors", help="where to write rejected rows (default: <file>.errors.csv)")
+    importer.add_argument("--location", help="stockroom (default: CLASSROOM_LOCATION or the main stockroom)")
+    importer.set_defaults(handler=cmd_import)
+
+    export = commands.add_parser("export", help="export donation or withdrawal records")
+    export.add_argument("table", choices=["donations", "withdrawals"])
+    export.add_argument("file", help="ending in .csv or .jsonl, add .gz to compress")
+    export.add_argument("--supply", help="exact supply name")
+    export.add_argument("--from", dest="start", type=date, help="first day, YYYY-MM-DD")
+    export.add_argument("--to", dest="end", type=date, help="last day, YYYY-MM-DD")
+    export.set_defaults(handler=cmd_export)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    finally:
+        while _connections:
+            _connections.pop().close()
+
+if __name__ == "__main__":
+    sys.exit(main())
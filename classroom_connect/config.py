@@ -0,0 +1,43 @@
+# Database connection settings, each can be overridden through an environment variable
+import os
+
+# "mysql" for a MySQL/MariaDB server, "sqlite" for an embedded database file
+DB_BACKEND = os.environ.get("CLASSROOM_DB_BACKEND", "mysql")
+
+DB_CONFIG = {
+    "host": os.environ.get("CLASSROOM_DB_HOST", "localhost"),
+    "user": os.environ.get("CLASSROOM_DB_USER", "root"),
+    "password": os.environ.get("CLASSROOM_DB_PASSWORD", ""),
+    "database": os.environ.get("CLASSROOM_DB_NAME", "schoolsuppliesdonationdb")
+}
+DB_POOL_SIZE = int(os.environ.get("CLASSROOM_DB_POOL_SIZE", "5"))
+# Read replica for the record listings and reports, empty for none: the replica's host for MySQL
+# (the other connection settings are the primary's), or a copy of the database file for SQLite
+DB_REPLICA = os.environ.get("CLASSROOM_DB_REPLICA", "")
+# Replicas further behind the primary than this many seconds are passed over for the primary
+REPLICA_MAX_LAG = float(os.environ.get("CLASSROOM_DB_REPLICA_MAX_LAG", "5"))
+# Run the frequent queries as statements prepared once per pooled connection
+PREPARED_STATEMENTS = os.environ.get("CLASSROOM_PREPARED_STATEMENTS", "1") == "1"
+# Database file used by the sqlite backend
+SQLITE_PATH = os.environ.get("CLASSROOM_DB_PATH", "schoolsuppliesdonationdb.sqlite3")
+# Write-behind intake queue for donation drives: entries are acknowledged once journaled to disk
+# and committed to the database in batches by a background thread
+INTAKE_QUEUE = os.environ.get("CLASSROOM_INTAKE_QUEUE", "0") == "1"
+INTAKE_JOURNAL = os.environ.get("CLASSROOM_INTAKE_JOURNAL", "intake.journal")
+# Stockroom this client records donations into and withdraws from when no location is given,
+# empty for the one every database starts with
+LOCATION = os.environ.get("CLASSROOM_LOCATION", "")
+# Apply pending schema migrations when the application connects, otherwise only through
+# python -m classroom_connect migrate
+AUTO_MIGRATE = os.environ.get("CLASSROOM_AUTO_MIGRATE", "1") == "1"
+# Query timing and metrics export, see classroom_connect/metrics.py
+METRICS_ENABLED = os.environ.get("CLASSROOM_METRICS", "1") == "1"
+# Statements slower than this many milliseconds go to the slow-query log
+SLOW_QUERY_MS = float(os.environ.get("CLASSROOM_SLOW_QUERY_MS", "200"))
+# JSON Lines file the slow statements are appended to, with their parameters, empty to keep them in memory only
+SLOW_QUERY_LOG = os.environ.get("CLASSROOM_SLOW_QUERY_LOG", "")
+# Also record the query plan of slow SELECT, UPDATE and DELETE statements
+EXPLAIN_SLOW_QUERIES = os.environ.get("CLASSROOM_EXPLAIN_SLOW", "0") == "1"
+# Prometheus text file (or JSON snapshot when the name ends in .json) rewritten every METRICS_INTERVAL seconds
+METRICS_FILE = os.environ.get("CLASSROOM_METRICS_FILE", "")
+METRICS_INTERVAL = float(os.environ.get("CLASSROOM_METRICS_INTERVAL", "15"))
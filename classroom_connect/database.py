@@ -0,0 +1,1939 @@
+# Database access layer: pooled backend connections, the supply catalog cache and all queries.
+# Status and error messages go to stderr so command line output stays clean.
+from contextlib import closing, contextmanager
+import datetime
+import heapq
+import queue
+import sys
+import threading
+import time
+
+from .backends import DEFAULT_LOCATION, PoolError, create_backend
+from .config import (AUTO_MIGRATE, DB_BACKEND, DB_POOL_SIZE, DB_REPLICA, LOCATION, METRICS_ENABLED, METRICS_FILE,
+                     METRICS_INTERVAL, PREPARED_STATEMENTS, REPLICA_MAX_LAG)
+from .metrics import Metrics, timed
+
+# Search indexes on donations, the id makes each one usable for keyset paging
+DONATION_INDEXES = {
+    "contact_info": ["contact_info", "id"],
+    "city": ["city", "id"],
+    "province": ["province", "city", "id"],
+    "donation_date": ["donation_date", "id"],
+}
+ADDRESS_MIGRATION_BATCH = 5000
+# Most statements kept prepared on one pooled connection, the least recently used is closed beyond it
+PREPARED_STATEMENT_LIMIT = 64
+# Seconds between checks of the replica's replication delay, and that a failed replica is left alone for
+REPLICA_CHECK_INTERVAL = 1
+REPLICA_RETRY_AFTER = 30
+# Rows fetched from a streaming cursor at a time
+STREAM_BATCH_SIZE = 1000
+# search_donations filters matched as a prefix of the column
+PREFIX_FILTERS = {
+    "donor": "d.donor_name",
+    "contact": "d.contact_info",
+    "barangay": "d.barangay",
+    "city": "d.city",
+    "province": "d.province",
+}
+# Write version of the last transaction that touched each row, new and changed rows are found by it
+ROW_VERSION_COLUMN = {"row_version": "BIGINT NOT NULL DEFAULT 0"}
+# Stockroom a donation went into or a withdrawal came out of. Records from before locations
+# existed belong to the default location, which every database has as id 1.
+LOCATION_COLUMN = {"location_id": "INT NOT NULL DEFAULT 1"}
+# Schema migrations in the order they are applied: (version, description, method). Each one only
+# adds what a database is missing, so on one created from the current schema they are recorded
+# without changing anything. A released migration is never edited, changes go in a new one.
+MIGRATIONS = [
+    (1, "Paging indexes on donor name and withdrawal date", "_migrate_paging_indexes"),
+    (2, "Structured address columns and search indexes", "_migrate_addresses"),
+    (3, "Row versions for change detection", "_migrate_row_versions"),
+    (4, "Covering indexes for the record listings and stock report", "_migrate_covering_indexes"),
+    (5, "Locations with per-location stock", "_migrate_locations"),
+]
+# Lock that keeps two clients from migrating the same database at once, and how many seconds to wait for it
+MIGRATION_LOCK = "classroom_connect.migrate"
+MIGRATION_LOCK_TIMEOUT = 60
+# Indexes that answer the withdrawal listing and the stock report without reading table rows
+COVERING_INDEXES = {
+    "donations": {"supply_id": ["supply_id", "quantity"]},
+    "withdrawals": {
+        "supply_id": ["supply_id", "quantity"],
+        "withdrawal_date": ["withdrawal_date", "id", "supply_id", "quantity"],
+    },
+}
+# Lock that lets one client at a time allocate stock to classroom requests, the seconds to wait
+# for it, and how often an allocation is recomputed when withdrawals took the stock it counted on
+ALLOCATION_LOCK = "classroom_connect.allocate"
+ALLOCATION_LOCK_TIMEOUT = 30
+ALLOCATION_ATTEMPTS = 3
+# Stock movements written between two automatic balance checkpoints
+STOCK_CHECKPOINT_INTERVAL = 10000
+# History rows copied into the stock ledger per executemany when it is rebuilt
+LEDGER_REBUILD_BATCH = 5000
+
+# Record listing and report queries, also checked by check_query_plans()
+ALL_DONATIONS_QUERY = """
+    SELECT d.donor_name, d.contact_info, d.address, s.supply_name, d.quantity
+    FROM donations d
+    JOIN supplies s ON d.supply_id = s.id
+    ORDER BY d.donor_name
+"""
+ALL_WITHDRAWALS_QUERY = """
+    SELECT s.supply_name, w.quantity, w.withdrawal_date
+    FROM withdrawals w
+    JOIN supplies s ON w.supply_id = s.id
+    ORDER BY w.withdrawal_date DESC
+"""
+STOCK_REPORT_QUERY = """
+    SELECT s.supply_name, s.quantity,
+        COALESCE((SELECT SUM(d.quantity) FROM donations d WHERE d.supply_id = s.id), 0),
+        COALESCE((SELECT SUM(w.quantity) FROM withdrawals w WHERE w.supply_id = s.id), 0)
+    FROM supplies s
+    ORDER BY s.supply_name
+"""
+# Keyset-paged queries, completed by _keyset_query
+DONATION_PAGE_QUERY = """
+    SELECT d.id, d.donor_name, d.contact_info, d.address, s.supply_name, d.quantity
+    FROM donations d
+    JOIN supplies s ON d.supply_id = s.id
+"""
+DONATION_SORT_KEY = ("d.donor_name", "d.id")
+WITHDRAWAL_PAGE_QUERY = """
+    SELECT w.id, s.supply_name, w.quantity, w.withdrawal_date
+    FROM withdrawals w
+    JOIN supplies s ON w.supply_id = s.id
+"""
+WITHDRAWAL_SORT_KEY = ("w.withdrawal_date", "w.id")
+
+class ConnectionPool:
+    # Fixed-size pool of backend connections that are health-checked on checkout
+    def __init__(self, backend, size=DB_POOL_SIZE, timeout=10, ping_after=5):
+        self.backend = backend
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.closed = False
+
+    def acquire(self):
+        if self.closed:
+            raise PoolError("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f"No database connection available after {self.timeout}s")
+        try:
+            try:
+                connection, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self.backend.connect()
+                connection.statements = PreparedStatements(self.backend)
+                return connection
+            # Connections that sat idle may have been dropped by the server
+            if time.monotonic() - released_at > self.ping_after and self.backend.ping(connection):
+                # Reconnected: the old session's prepared statements went with it
+                connection.statements = PreparedStatements(self.backend)
+            return connection
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        try:
+            if discard or self.closed:
+                connection.close()
+            else:
+                if connection.in_transaction:
+                    connection.rollback()
+                self._idle.put((connection, time.monotonic()))
+        except self.backend.Error:
+            # A broken connection is simply dropped, the next checkout opens a fresh one
+            pass
+        finally:
+            self._slots.release()
+
+    def idle_connections(self):
+        """Connections currently waiting in the pool, for statistics"""
+        return [connection for connection, _ in list(self._idle.queue)]
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                connection.close()
+            except self.backend.Error:
+                pass
+
+class PreparedStatements:
+    # Registry of the statements prepared on one pooled connection, one cursor per statement
+    # text. The server parses and plans a statement the first time it runs, after that only its
+    # parameters are sent. It lives as long as the connection, as connection.statements.
+    def __init__(self, backend, limit=PREPARED_STATEMENT_LIMIT):
+        self.backend = backend
+        self.limit = limit
+        self.cursors = {}       # sql -> (sql, cursor), least recently used first
+        self.prepared = 0
+        self.reused = 0
+
+    def get(self, connection, sql):
+        """(sql, cursor) for a statement. The sql returned is the object the cursor was prepared
+        with, a prepared cursor compares by identity and would prepare an equal copy again."""
+        entry = self.cursors.pop(sql, None)
+        if entry is None:
+            if len(self.cursors) >= self.limit:
+                _, cursor = self.cursors.pop(next(iter(self.cursors)))
+                cursor.close()
+            entry = (sql, self.backend.prepared_cursor(connection))
+            self.prepared += 1
+        else:
+            self.reused += 1
+        self.cursors[sql] = entry
+        return entry
+
+class StatementCursor:
+    # Cursor for the frequent queries: each statement runs on its prepared cursor from the
+    # connection's registry. Multi-row INSERTs go through a plain cursor instead, which the MySQL
+    # driver sends as a single statement rather than one execute per row.
+    def __init__(self, connection):
+        self.connection = connection
+        self.current = None
+        self.plain = None
+
+    def execute(self, sql, params=None):
+        sql, self.current = self.connection.statements.get(self.connection, sql)
+        return self.current.execute(sql) if params is None else self.current.execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        if sql.lstrip()[:6].upper() == "INSERT":
+            if self.plain is None:
+                self.plain = self.connection.cursor()
+            self.current = self.plain
+        else:
+            sql, self.current = self.connection.statements.get(self.connection, sql)
+        return self.current.executemany(sql, seq_of_params)
+
+    def close(self):
+        # The prepared cursors stay open with the connection
+        if self.plain is not None:
+            self.plain.close()
+
+    def __getattr__(self, name):
+        # fetchone, fetchall, rowcount and lastrowid of the statement that ran last
+        return getattr(self.current, name)
+
+class ReplicaRouter:
+    # Sends the read-only listing and report queries to a replica of the primary. A session
+    # always reads its own writes: the replica only serves a read once its write version (the
+    # supplies row of table_versions) has reached the last one this process wrote. A replica
+    # more than max_lag seconds behind is passed over, and one that fails is left alone for
+    # REPLICA_RETRY_AFTER seconds. Reads it can't serve go to the primary.
+    def __init__(self, backend, pool_size=DB_POOL_SIZE, max_lag=REPLICA_MAX_LAG):
+        self.backend = backend
+        # When every replica connection is busy the read goes to the primary instead of waiting
+        self.pool = ConnectionPool(backend, size=pool_size, timeout=0)
+        self.max_lag = max_lag
+        self.lock = threading.Lock()
+        self.written_version = 0
+        self.lag = None
+        self.lag_checked_at = None
+        self.down_until = 0
+        # Reads the replica served, and the ones sent to the primary by reason
+        self.reads = {"replica": 0, "behind": 0, "lagging": 0, "busy": 0, "unavailable": 0}
+
+    def wrote(self, version):
+        """Record a write version of this process, its reads wait for the replica to reach it"""
+        with self.lock:
+            self.written_version = max(self.written_version, version)
+
+    def acquire(self):
+        """Replica connection for one read, None when the read has to go to the primary"""
+        if time.monotonic() < self.down_until:
+            self._count("unavailable")
+            return None
+        try:
+            connection = self.pool.acquire()
+        except PoolError:
+            self._count("busy")
+            return None
+        except self.backend.Error as e:
+            self.failed(e)
+            return None
+        try:
+            with closing(connection.cursor()) as cursor:
+                now = time.monotonic()
+                if self.lag_checked_at is None or now - self.lag_checked_at >= REPLICA_CHECK_INTERVAL:
+                    self.lag, self.lag_checked_at = self.backend.replica_lag(cursor), now
+                if self.lag is None or self.lag > self.max_lag:
+                    reason = "lagging"
+                else:
+                    # Under MySQL this read also starts the snapshot the query then reads from
+                    cursor.execute("SELECT version FROM table_versions WHERE table_name = %s", ("supplies",))
+                    result = cursor.fetchone()
+                    reason = "behind" if (result[0] if result else 0) < self.written_version else None
+        except self.backend.Error as e:
+            self.release(connection, discard=True)
+            self.failed(e)
+            return None
+        if reason:
+            self.release(connection)
+            self._count(reason)
+            return None
+        self._count("replica")
+        return connection
+
+    def release(self, connection, discard=False):
+        self.pool.release(connection, discard=discard)
+
+    def failed(self, error):
+        """Send reads to the primary for the next REPLICA_RETRY_AFTER seconds"""
+        with self.lock:
+            self.down_until = time.monotonic() + REPLICA_RETRY_AFTER
+            self.lag_checked_at = None
+            self.reads["unavailable"] += 1
+        print(f"Replica unavailable, reading from the primary for {REPLICA_RETRY_AFTER}s: {error}", file=sys.stderr)
+
+    def _count(self, outcome):
+        with self.lock:
+            self.reads[outcome] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.reads, lag=self.lag, written_version=self.written_version)
+
+    def close(self):
+        self.pool.close()
+
+class SupplyCache:
+    # In-process copy of the small supplies catalog, kept in step with our own writes and
+    # brought up to date with other clients' by re-reading only the rows they changed
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = {}           # supply_name -> id, ids never change once assigned
+        self.names = {}         # id -> supply_name
+        self.quantities = None  # supply_name -> quantity as of self.version, None until loaded
+        self.row_versions = {}  # supply_name -> row_version of the cached quantity
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_id(self, supply_name):
+        with self.lock:
+            supply_id = self.ids.get(supply_name)
+            if supply_id is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return supply_id
+
+    def remember_id(self, supply_name, supply_id):
+        with self.lock:
+            self.ids[supply_name] = supply_id
+            self.names[supply_id] = supply_name
+
+    def get_supplies(self, version):
+        """Cached (supply_name, quantity) rows if they are still at the given catalog version"""
+        with self.lock:
+            if self.quantities is None or self.version != version:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return sorted(self.quantities.items())
+
+    def loaded_version(self):
+        """Version the cached rows are complete up to, None when they must be read in full"""
+        with self.lock:
+            return self.version if self.quantities is not None else None
+
+    def load(self, version, rows, full=True):
+        """Store (id, supply_name, quantity, row_version) rows read at or after version, returns the catalog.
+
+        With full=False rows are only the ones changed since the cached version.
+        """
+        with self.lock:
+            if full or self.quantities is None:
+                self.quantities = {}
+                self.row_versions = {}
+            for supply_id, supply_name, quantity, row_version in rows:
+                self.ids[supply_name] = supply_id
+                self.names[supply_id] = supply_name
+                # A write-through may already have stored something newer
+                if row_version >= self.row_versions.get(supply_name, 0):
+                    self.quantities[supply_name] = quantity
+                    self.row_versions[supply_name] = row_version
+            self.version = max(version, self.version or 0) if not full else version
+            return sorted(self.quantities.items())
+
+    def apply(self, version, supply_id, supply_name, delta):
+        """Write-through of a committed change that moved the catalog to the given version"""
+        self.apply_many(version, [(supply_id, supply_name, delta)])
+
+    def apply_many(self, version, changes):
+        # changes: (supply_id, supply_name, quantity delta) for every supply one commit touched
+        with self.lock:
+            for supply_id, supply_name, _ in changes:
+                self.ids[supply_name] = supply_id
+                self.names[supply_id] = supply_name
+            if self.quantities is None:
+                return
+            for _, supply_name, delta in changes:
+                # Skipped when a read that raced with the commit already brought the new quantity in
+                if self.row_versions.get(supply_name, 0) < version:
+                    self.quantities[supply_name] = self.quantities.get(supply_name, 0) + delta
+                    self.row_versions[supply_name] = version
+            if self.version == version - 1:
+                self.version = version
+            # Otherwise another client wrote in between, the next read fetches the rows it changed
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "supplies": len(self.ids), "version": self.version}
+
+class DatabaseConnection:
+    # Database access layer backed by a connection pool.
+    # backend is "mysql" or "sqlite", db_config the connect arguments for MySQL or {"path": ...} for SQLite.
+    # With metrics on, every method and statement is timed into self.metrics. With migrate off,
+    # pending schema migrations are only reported and left for migrate(). location names the
+    # stockroom used by stock methods called without one. With prepared on, and a backend that
+    # prepares server-side, the frequent queries run as statements prepared once per pooled connection.
+    # replica is the host (a file for SQLite) of a read replica the listings and reports are read from.
+    def __init__(self, pool_size=DB_POOL_SIZE, db_config=None, backend=DB_BACKEND, metrics=METRICS_ENABLED,
+                 migrate=AUTO_MIGRATE, location=LOCATION, prepared=PREPARED_STATEMENTS, replica=DB_REPLICA,
+                 replica_max_lag=REPLICA_MAX_LAG):
+        self.pool = None
+        self.metrics = None
+        self.replica = None
+        self.cache = SupplyCache()
+        self.location = location or DEFAULT_LOCATION
+        self.location_ids = {}          # location_name -> id, ids never change once assigned
+        self.ledger_lock = threading.Lock()
+        self.unchecked_movements = 0    # Movements this process wrote since its last checkpoint
+        self.backend = create_backend(backend, db_config)
+        self.Error = self.backend.Error
+        self.prepared = prepared and self.backend.prepares_statements
+        if replica:
+            self.replica = ReplicaRouter(create_backend(backend, self.backend.replica_config(replica)),
+                                         pool_size, replica_max_lag)
+        if metrics:
+            self.metrics = Metrics(self.backend)
+            if METRICS_FILE:
+                self.metrics.start_export(METRICS_FILE, METRICS_INTERVAL)
+        try:
+            self.pool = ConnectionPool(self.backend, size=pool_size)
+            # Open the first connection eagerly so configuration errors surface at startup,
+            # and create whatever part of the schema is missing
+            with self.connection() as connection:
+                self.backend.bootstrap(connection)
+            print(f"Successfully connected to the {self.backend.name} database", file=sys.stderr)
+            if migrate:
+                success, message, _ = self.migrate()
+                if not success:
+                    raise Exception(f"Database migration failed: {message}")
+            else:
+                pending = self.pending_migrations()
+                if pending:
+                    print(f"{len(pending)} schema migrations pending, run python -m classroom_connect migrate",
+                          file=sys.stderr)
+            self._ensure_summaries()
+            self._ensure_ledger()
+        except self.Error as e:
+            print(f"Error connecting to database: {e}", file=sys.stderr)
+            raise Exception(f"Database connection failed: {e}")
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        if getattr(self, 'metrics', None):
+            self.metrics.close()
+        if getattr(self, 'replica', None) and not self.replica.pool.closed:
+            self.replica.close()
+        if getattr(self, 'pool', None) and not self.pool.closed:
+            self.pool.close()
+            print("Database connection closed", file=sys.stderr)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for the duration of the with-block"""
+        connection = self.pool.acquire()
+        discard = False
+        try:
+            yield self._instrument(connection)
+        except self.backend.DisconnectErrors:
+            # The socket is unusable, don't hand it to the next caller
+            discard = True
+            raise
+        finally:
+            self.pool.release(connection, discard=discard)
+
+    def _instrument(self, connection):
+        return self.metrics.wrap(connection) if self.metrics else connection
+
+    def _cursor(self, connection):
+        """Cursor for the frequent queries, running each one as a prepared statement"""
+        return StatementCursor(connection) if self.prepared else connection.cursor()
+
+    def _read(self, read, prepared=True):
+        """Run read(cursor) for a read-only method: on the replica when it can serve this session,
+        on the primary otherwise. A replica that fails part way is taken out and the read runs
+        again on the primary. prepared=False reads with a plain cursor."""
+        open_cursor = self._cursor if prepared else lambda connection: connection.cursor()
+        connection = self.replica.acquire() if self.replica else None
+        if connection is not None:
+            discard = False
+            try:
+                with closing(open_cursor(self._instrument(connection))) as cursor:
+                    return read(cursor)
+            except self.Error as e:
+                discard = isinstance(e, self.backend.DisconnectErrors)
+                self.replica.failed(e)
+            finally:
+                self.replica.release(connection, discard=discard)
+        with self.connection() as connection, closing(open_cursor(connection)) as cursor:
+            return read(cursor)
+
+    def replica_stats(self):
+        """Reads the replica served and the ones sent to the primary by reason, None without a replica"""
+        return self.replica.stats() if self.replica else None
+
+    def statement_stats(self):
+        """Statements prepared and executions that reused one, over the idle pooled connections"""
+        stats = {"statements": 0, "prepared": 0, "reused": 0}
+        for connection in self.pool.idle_connections():
+            statements = connection.statements
+            stats["statements"] += len(statements.cursors)
+            stats["prepared"] += statements.prepared
+            stats["reused"] += statements.reused
+        return stats
+
+    # Schema migrations. migrate() applies the MIGRATIONS a database hasn't recorded in
+    # schema_migrations yet, one at a time under MIGRATION_LOCK. Each migration method gets
+    # the connection and cursor of the runner and leaves the final commit to it.
+
+    def _applied_migrations(self, cursor):
+        cursor.execute("SELECT version, applied_at FROM schema_migrations")
+        return dict(cursor.fetchall())
+
+    def pending_migrations(self):
+        """(version, description) of the migrations this database hasn't had yet"""
+        return [(version, name) for version, name, applied_at in self.migration_status() if applied_at is None]
+
+    def migration_status(self):
+        """(version, description, applied_at) of every migration, applied_at is None while pending"""
+        with self.connection() as connection, closing(connection.cursor()) as cursor:
+            applied = self._applied_migrations(cursor)
+        return [(version, name, applied.get(version)) for version, name, _ in MIGRATIONS]
+
+    @timed
+    def migrate(self):
+        """Apply the pending migrations in order. Returns (success, message, versions applied)"""
+        migrated = []
+        try:
+            with self.connection() as connection, closing(connection.cursor()) as cursor:
+                applied = self._applied_migrations(cursor)
+                connection.commit()
+                for version, name, method in MIGRATIONS:
+                    if version in applied:
+                        continue
+                    if not self.backend.lock(cursor, MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT):
+                        return False, f"Another client has been migrating the database for over {MIGRATION_LOCK_TIMEOUT}s", migrated
+                    try:
+                        # Another client may have applied it while we waited for the lock. Under SQLite
+                        # a migration that commits part way lets a second client start on it as well,
+                        # which is harmless since every step only adds what is missing.
+                        done = version in self._applied_migrations(cursor)
+                        if not done:
+                            getattr(self, method)(connection, cursor)
+                            cursor.execute(f"{self.backend.insert_ignore} INTO schema_migrations (version, name) VALUES (%s, %s)",
+                                           (version, name))
+                        connection.commit()
+                    finally:
+                        if connection.in_transaction:
+                            connection.rollback()
+                        self.backend.unlock(cursor, MIGRATION_LOCK)
+                    if not done:
+                        migrated.append(version)
+                        print(f"Applied migration {version}: {name}", file=sys.stderr)
+            if not migrated:
+                return True, "Database schema is up to date", migrated
+            return True, f"Applied {len(migrated)} migrations", migrated
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False, str(e), migrated
+
+    def _migrate_paging_indexes(self, connection, cursor):
+        # Tables imported from the original dump only had the supply_id keys
+        self.backend.ensure_indexes(cursor, "donations", {"donor_name": ["donor_name", "id"]})
+        self.backend.ensure_indexes(cursor, "withdrawals", {"withdrawal_date": ["withdrawal_date", "id"]})
+
+    def _migrate_addresses(self, connection, cursor):
+        # Databases from before the structured address columns: add them and the search indexes,
+        # then fill them from the combined address in batches. Rows still missing a province
+        # are picked up again if an earlier run was interrupted.
+        self.backend.ensure_columns(cursor, "donations", {
+            column: self.backend.text_column for column in ("barangay", "city", "province")
+        })
+        self.backend.ensure_indexes(cursor, "donations", DONATION_INDEXES)
+        connection.commit()
+
+        last_id = 0
+        while True:
+            cursor.execute("""
+                SELECT id, address FROM donations
+                WHERE province = '' AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (last_id, ADDRESS_MIGRATION_BATCH))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany("""
+                UPDATE donations SET barangay = %s, city = %s, province = %s WHERE id = %s
+            """, [_parse_address(address) + (donation_id,) for donation_id, address in rows])
+            connection.commit()
+            last_id = rows[-1][0]
+
+    def _migrate_row_versions(self, connection, cursor):
+        # Databases from before change tracking: rows already there count as version 0
+        for table in ("supplies", "donations", "withdrawals"):
+            self.backend.ensure_columns(cursor, table, ROW_VERSION_COLUMN)
+        for table in ("donations", "withdrawals"):
+            self.backend.ensure_indexes(cursor, table, {"row_version": ["row_version"]})
+
+    def _migrate_covering_indexes(self, connection, cursor):
+        # Widens the supply_id and withdrawal_date indexes in place, the stock report's sums and
+        # the withdrawal listing are then read from the index alone
+        for table, indexes in COVERING_INDEXES.items():
+            self.backend.ensure_indexes(cursor, table, indexes, replace=True)
+
+    def _migrate_locations(self, connection, cursor):
+        # The locations tables come with the schema. Existing records are tagged with the default
+        # location and all stock on hand starts out there.
+        for table in ("donations", "withdrawals"):
+            self.backend.ensure_columns(cursor, table, LOCATION_COLUMN)
+        cursor.execute("""
+            INSERT INTO location_stock (location_id, supply_id, quantity)
+            SELECT 1, s.id, s.quantity
+            FROM supplies s
+            WHERE s.quantity <> 0
+                AND NOT EXISTS (SELECT 1 FROM location_stock l WHERE l.supply_id = s.id)
+        """)
+
+    def check_query_plans(self):
+        """EXPLAIN the record listing, paging and stock report queries.
+
+        Returns (name, problems, plan) for each. A problem is a sort the query should have read
+        in index order, or table rows read where COVERING_INDEXES should have answered alone.
+        """
+        checks = [
+            ("get_all_donations", ALL_DONATIONS_QUERY, (), ()),
+            ("get_all_withdrawals", ALL_WITHDRAWALS_QUERY, (), ("w",)),
+            ("get_stock_report", STOCK_REPORT_QUERY, (), ("d", "w")),
+            # Deep pages, so the plans include the keyset seek
+            ("get_donations_page", *_keyset_query(DONATION_PAGE_QUERY, DONATION_SORT_KEY, ("M", 0), 100, False), ()),
+            ("get_withdrawals_page", *_keyset_query(WITHDRAWAL_PAGE_QUERY, WITHDRAWAL_SORT_KEY,
+                                                    (datetime.datetime.now(), 0), 100, False, descending=True), ("w",)),
+        ]
+        results = []
+        with self.connection() as connection, closing(connection.cursor()) as cursor:
+            for name, query, params, covered in checks:
+                plan = self.backend.explain(cursor, query, params)
+                results.append((name, self.backend.plan_problems(plan, covered), plan))
+            connection.rollback()
+        return results
+
+    def _bump_version(self, cursor, table_name):
+        # The row lock taken here also serializes writers until they commit
+        version = self.backend.update_returning(cursor, "table_versions", "version", "version + 1",
+                                                "table_name = %s", (table_name,))
+        if self.replica and table_name == "supplies":
+            # Noted before the commit. A version that is rolled back is handed to the next writer,
+            # until then this session's reads stay on the primary.
+            self.replica.wrote(version)
+        return version
+
+    def _get_version(self, cursor, table_name):
+        cursor.execute("SELECT version FROM table_versions WHERE table_name = %s", (table_name,))
+        result = cursor.fetchone()
+        return result[0] if result else 0
+
+    def _stamp_supplies(self, cursor, version, supply_ids):
+        # Supplies whose quantity this transaction changed, the row locks are already held
+        cursor.executemany("UPDATE supplies SET row_version = %s WHERE id = %s",
+                           [(version, supply_id) for supply_id in supply_ids])
+
+    def cache_stats(self):
+        return self.cache.stats()
+
+    # Change detection. Every write bumps the supplies row of table_versions, which makes it the
+    # database-wide write version, and stamps the rows it inserts or changes with it. Its row
+    # lock is held until commit, so versions are committed in order: once version v is visible,
+    # everything stamped v or lower is too. Clients poll get_change_version, a primary-key read,
+    # and ask for the rows with a row_version above the one they last saw.
+
+    @timed
+    def get_change_version(self):
+        """Current write version, None if the database can't be reached"""
+        try:
+            with self.connection() as connection, closing(self._cursor(connection)) as cursor:
+                return self._get_version(cursor, "supplies")
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return None
+
+    @timed
+    def get_new_donations(self, since, filters=None, limit=100):
+        """Donations recorded after write version since that match filters, shaped like search_donations"""
+        conditions, params = _filter_conditions(filters, "d", "donation_date")
+        conditions.append("d.row_version > %s")
+        try:
+            with self.connection() as connection, closing(self._cursor(connection)) as cursor:
+                cursor.execute(f"""
+                    SELECT d.id, d.donor_name, d.contact_info, d.address, s.supply_name, d.quantity
+                    FROM donations d
+                    JOIN supplies s ON d.supply_id = s.id
+                    WHERE {" AND ".join(conditions)}
+                    ORDER BY d.row_version, d.id
+                    LIMIT %s
+                """, params + [since, limit])
+                return cursor.fetchall()
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return []
+
+    @timed
+    def get_new_withdrawals(self, since, limit=100):
+        """Withdrawals recorded after write version since, shaped like get_withdrawals_page"""
+        try:
+            with self.connection() as connection, closing(self._cursor(connection)) as cursor:
+                cursor.execute("""
+                    SELECT w.id, s.supply_name, w.quantity, w.withdrawal_date
+                    FROM withdrawals w
+                    JOIN supplies s ON w.supply_id = s.id
+                    WHERE w.row_version > %s
+                    ORDER BY w.row_version, w.id
+                    LIMIT %s
+                """, (since, limit))
+                return cursor.fetchall()
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return []
+
+    @timed
+    def update_supply_quantity(self, supply_name, quantity, location=None):
+        try:
+            location_id = self.get_location_id(location)
+            if not location_id:
+                print(f"Error: Location not found: {location or self.location}", file=sys.stderr)
+                return False
+            with self.connection() as connection, closing(self._cursor(connection)) as cursor:
+                check_query = "SELECT id FROM supplies WHERE supply_name = %s"
+                cursor.execute(check_query, (supply_name,))
+                result = cursor.fetchone()
+                
+                if result:
+                    supply_id = result[0]
+                    update_query = """
+                        UPDATE supplies 
+                        SET quantity = quantity + %s 
+                        WHERE id = %s
+                    """
+                    cursor.execute(update_query, (quantity, supply_id))
+                else:
+                    insert_query = """
+                        INSERT INTO supplies (supply_name, quantity) 
+                        VALUES (%s, %s)
+                    """
+                    cursor.execute(insert_query, (supply_name, quantity))
+                    supply_id = cursor.lastrowid
+                self._add_location_stock(cursor, location_id, [(supply_id, quantity)])
+                
+                version = self._bump_version(cursor, "supplies")
+                self._stamp_supplies(cursor, version, [supply_id])
+                moved = self._record_movements(cursor, "adjustment", [(supply_id, quantity)])
+                connection.commit()
+            self.cache.apply(version, supply_id, supply_name, quantity)
+            self._count_movements(moved)
+            return True
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False
+
+    @timed
+    def get_all_supplies(self):
+        try:
+            return self._read(self._read_supplies)
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return []
+
+    def _read_supplies(self, cursor):
+        # A primary-key lookup tells whether the cached catalog is still current
+        version = self._get_version(cursor, "supplies")
+        supplies = self.cache.get_supplies(version)
+        if supplies is not None:
+            return supplies
+        # Other clients wrote since: read only the rows they changed, or all on the first call
+        since = self.cache.loaded_version()
+        query = "SELECT id, supply_name, quantity, row_version FROM supplies"
+        if since is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query + " WHERE row_version > %s", (since,))
+        return self.cache.load(version, cursor.fetchall(), full=since is None)
+
+    @timed
+    def get_supply_id(self, supply_name):
+        supply_id = self.cache.get_id(supply_name)
+        if supply_id is not None:
+            return supply_id
+        with self.connection() as connection, closing(self._cursor(connection)) as cursor:
+            query = "SELECT id FROM supplies WHERE supply_name = %s"
+            cursor.execute(query, (supply_name,))
+            result = cursor.fetchone()
+        if not result:
+            return None
+        self.cache.remember_id(supply_name, result[0])
+        return result[0]
+
+    @timed
+    def add_donation(self, donor_name, contact_info, barangay, city, province, supply_name, quantity, location=None):
+        try:
+            location_id = self.get_location_id(location)
+            if not location_id:
+                print(f"Error: Location not found: {location or self.location}", file=sys.stderr)
+                return False
+            with self.connection() as connection, closing(self._cursor(connection)) as cursor:
+                # A new supply is created inside this transaction, so there is a single commit
+                supply_id = self._resolve_supply_ids(cursor, {supply_name})[supply_name]
+
+                cursor.execute("""
+                    UPDATE supplies 
+                    SET quantity = quantity + %s 
+                    WHERE id = %s
+                """, (quantity, supply_id))
+                self._add_location_stock(cursor, location_id, [(supply_id, quantity)])
+
+                full_address = f"{barangay}, {city}, {province}" if barangay else f"{city}, {province}"
+
+                # The record goes in after the version bump so it can carry the version as its row_version
+                version = self._bump_version(cursor, "supplies")
+                cursor.execute("""
+                    INSERT INTO donations 
+                    (donor_name, contact_info, address, barangay, city, province, supply_id, quantity, row_version,
+                     location_id) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, (donor_name, contact_info, full_address, barangay, city, province, supply_id, quantity, version,
+                      location_id))
+                self._stamp_supplies(cursor, version, [supply_id])
+                self._add_donation_totals(cursor, [(supply_id, donor_name, contact_info, city, province, quantity)])
+                moved = self._record_movements(cursor, "donation", [(supply_id, quantity)])
+                connection.commit()
+            self.cache.apply(version, supply_id, supply_name, quantity)
+            self._count_movements(moved)
+            return True
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False
+
+    @timed
+    def add_donations_batch(self, donations, checkpoint=None, location=None):
+        """Record many validated donations in one transaction.
+
+        donations are (donor_name, contact_info, barangay, city, province, supply_name, quantity)
+        tuples, all received at location. Rows go in with one executemany and each supply's stock
+        is raised by a single UPDATE for the whole batch. checkpoint, a (queue_id, seq) pair, is
+        saved in the same transaction for the intake queue. Returns (success, message).
+        """
+        if not donations:
+            return True, "Nothing to import"
+        try:
+            location_id = self.get_location_id(location)
+            if not location_id:
+                return False, f"Location not found: {location or self.location}"
+            with self.connection() as connection, closing(connection.cursor()) as cursor:
+                supply_ids = self._resolve_supply_ids(cursor, {donation[5] for donation in donations})
+
+                rows = []
+                totals = {}
+                summary_rows = []
+                for donor_name, contact_info, barangay, city, province, supply_name, quantity in donations:
+                    full_address = f"{barangay}, {city}, {province}" if barangay else f"{city}, {province}"
+                    supply_id = supply_ids[supply_name]
+                    rows.append((donor_name, contact_info, full_address, barangay, city, province, supply_id, quantity))
+                    totals[supply_name] = totals.get(supply_name, 0) + quantity
+                    summary_rows.append((supply_id, donor_name, contact_info, city, province, quantity))
+
+                cursor.executemany("""
+                    UPDATE supplies 
+                    SET quantity = quantity + %s 
+                    WHERE id = %s
+                """, [(total, supply_ids[supply_name]) for supply_name, total in totals.items()])
+                self._add_location_stock(cursor, location_id,
+                                         [(supply_ids[supply_name], total) for supply_name, total in totals.items()])
+
+                version = self._bump_version(cursor, "supplies")
+                cursor.executemany("""
+                    INSERT INTO donations 
+                    (donor_name, contact_info, address, barangay, city, province, supply_id, quantity, row_version,
+                     location_id) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, [row + (version, location_id) for row in rows])
+                self._stamp_supplies(cursor, version, [supply_ids[name] for name in totals])
+                self._add_donation_totals(cursor, summary_rows)
+                moved = self._record_movements(cursor, "donation",
+                                               [(supply_ids[name], total) for name, total in totals.items()])
+                if checkpoint:
+                    self._save_intake_checkpoint(cursor, *checkpoint)
+                connection.commit()
+            self.cache.apply_many(version, [(supply_ids[name], name, total) for name, total in totals.items()])
+            self._count_movements(moved)
+            return True, f"Recorded {len(rows)} donations"
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False, str(e)
+
+    @timed
+    def get_intake_checkpoint(self, queue_id):
+        """Sequence number of the last intake queue entry committed for queue_id, 0 if none"""
+        with self.connection() as connection, closing(self._cursor(connection)) as cursor:
+            cursor.execute("SELECT last_seq FROM intake_checkpoints WHERE queue_id = %s", (queue_id,))
+            result = cursor.fetchone()
+        return result[0] if result else 0
+
+    @timed
+    def save_intake_checkpoint(self, queue_id, seq):
+        """Move an intake queue's checkpoint on to seq on its own, past entries the queue gave up on.
+        Returns False if it couldn't be saved."""
+        try:
+            with self.connection() as connection, closing(connection.cursor()) as cursor:
+                self._save_intake_checkpoint(cursor, queue_id, seq)
+                connection.commit()
+            return True
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False
+
+    @timed
+    def sync_commits(self):
+        """Make every committed transaction durable against power loss, not only against a crash
+        of the process. Returns False if it couldn't be done now."""
+        try:
+            with self.connection() as connection, closing(connection.cursor()) as cursor:
+                return self.backend.sync_commits(cursor)
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False
+
+    def _save_intake_checkpoint(self, cursor, queue_id, seq):
+        cursor.execute(f"{self.backend.insert_ignore} INTO intake_checkpoints (queue_id, last_seq) VALUES (%s, 0)",
+                       (queue_id,))
+        cursor.execute("UPDATE intake_checkpoints SET last_seq = %s WHERE queue_id = %s", (seq, queue_id))
+
+    def _resolve_supply_ids(self, cursor, supply_names, create=True):
+        # Ids for every name, creating supplies that don't exist yet inside the caller's transaction.
+        # With create off, names that aren't supplies are left out.
+        supply_ids = {}
+        missing = []
+        for supply_name in supply_names:
+            supply_id = self.cache.get_id(supply_name)
+            if supply_id:
+                supply_ids[supply_name] = supply_id
+            else:
+                missing.append(supply_name)
+        if missing and create:
+            cursor.executemany(f"""
+                {self.backend.insert_ignore} INTO supplies (supply_name, quantity) 
+                VALUES (%s, 0)
+            """, [(supply_name,) for supply_name in missing])
+        if missing:
+            placeholders = ", ".join(["%s"] * len(missing))
+            cursor.execute(f"SELECT id, supply_name FROM supplies WHERE supply_name IN ({placeholders})", missing)
+            for supply_id, supply_name in cursor.fetchall():
+                supply_ids[supply_name] = supply_id
+                self.cache.remember_id(supply_name, supply_id)
+        return supply_ids
+
+    @timed
+    def get_all_donations(self):
+        try:
+            return self._read(_fetch(ALL_DONATIONS_QUERY), prepared=False)
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return []
+
+    @timed
+    def withdraw_supply(self, supply_name, quantity, location=None):
+        """Take stock out of a location and record the withdrawal in one transaction.
+
+        Returns (success, message, new_balance at the location). The stock check is part of the
+        UPDATE itself, so two admins withdrawing at the same time can never take more than is on hand.
+        """
+        if quantity <= 0:
+            # A negative quantity would pass the stock check and add stock instead
+            return False, "Quantity must be greater than 0", None
+        try:
+            supply_id = self.get_supply_id(supply_name)
+            if not supply_id:
+                return False, "Supply not found", None
+            location_id = self.get_location_id(location)
+            if not location_id:
+                return False, "Location not found", None
+            with self.connection() as connection, closing(self._cursor(connection)) as cursor:
+                cursor.execute("UPDATE supplies SET quantity = quantity - %s WHERE id = %s", (quantity, supply_id))
+                # The new balance comes back with the UPDATE itself
+                new_balance = self.backend.update_returning(cursor, "location_stock", "quantity", "quantity - %s",
+                                                            "location_id = %s AND supply_id = %s AND quantity >= %s",
+                                                            (quantity, location_id, supply_id, quantity))
+                if new_balance is None:
+                    connection.rollback()
+                    return False, "Not enough supply available", None
+
+                version = self._bump_version(cursor, "supplies")
+                cursor.execute("""
+                    INSERT INTO withdrawals (supply_id, quantity, row_version, location_id)
+                    VALUES (%s, %s, %s, %s)
+                """, (supply_id, quantity, version, location_id))
+                self._stamp_supplies(cursor, version, [supply_id])
+                self._add_withdrawal_totals(cursor, [(supply_id, quantity)])
+                moved = self._record_movements(cursor, "withdrawal", [(supply_id, -quantity)])
+                connection.commit()
+            self.cache.apply(version, supply_id, supply_name, -quantity)
+            self._count_movements(moved)
+            return True, "Withdrawal successful", new_balance
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False, str(e), None
+
+    @timed
+    def get_all_withdrawals(self):
+        try:
+            return self._read(_fetch(ALL_WITHDRAWALS_QUERY), prepared=False)
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return []
+
+    @timed
+    def get_stock_report(self):
+        """Per supply: (supply_name, on hand, total donated, total withdrawn)"""
+        try:
+            return self._read(_fetch(STOCK_REPORT_QUERY), prepared=False)
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return []
+
+    def _fetch_keyset_page(self, query, sort_key, after, limit, backward, inclusive=False, descending=False,
+                           conditions=(), params=()):
+        query, params = _keyset_query(query, sort_key, after, limit, backward, inclusive, descending, conditions, params)
+        try:
+            rows = self._read(_fetch(query, params))
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return []
+        # Backward pages are read in reverse, flip them back into display order
+        return rows[::-1] if backward else rows
+
+    @timed
+    def get_donations_page(self, after=None, limit=100, backward=False, inclusive=False):
+        """Fetch donations ordered by donor name, starting after (or before) a (donor_name, id) key"""
+        return self.search_donations(None, after, limit, backward, inclusive)
+
+    @timed
+    def search_donations(self, filters=None, after=None, limit=100, backward=False, inclusive=False):
+        """Donations matching filters, paged and shaped like get_donations_page.
+
+        filters may hold donor, contact, barangay, city and province (case-insensitive prefixes),
+        supply (exact name), date_from and date_to (dates, inclusive) and min_quantity and
+        max_quantity. Empty values are ignored.
+        """
+        conditions, params = _filter_conditions(filters, "d", "donation_date")
+        return self._fetch_keyset_page(DONATION_PAGE_QUERY, DONATION_SORT_KEY, after, limit, backward, inclusive,
+                                       conditions=conditions, params=params)
+
+    @timed
+    def get_withdrawals_page(self, after=None, limit=100, backward=False, inclusive=False):
+        """Fetch withdrawals newest first, starting after (or before) a (withdrawal_date, id) key"""
+        return self._fetch_keyset_page(WITHDRAWAL_PAGE_QUERY, WITHDRAWAL_SORT_KEY, after, limit, backward, inclusive,
+                                       descending=True)
+
+    # Locations. Stock on hand is kept per stockroom in location_stock, and supplies.quantity
+    # holds the total across all of them. Every write changes both in the same transaction, so
+    # per-location and cross-site figures are read directly, never summed from the records.
+    # Writers lock the supplies row before the location_stock row, and a transfer, which only
+    # touches location_stock, locks its two rows in location id order.
+
+    @timed
+    def get_location_id(self, location=None):
+        """Id of the named location, or of this client's own. None if there is no such location"""
+        location = location or self.location
+        location_id = self.location_ids.get(location)
+        if location_id is not None:
+            return location_id
+        with self.connection() as connection, closing(self._cursor(connection)) as cursor:
+            cursor.execute("SELECT id FROM locations WHERE location_name = %s", (location,))
+            result = cursor.fetchone()
+        if not result:
+            return None
+        self.location_ids[location] = result[0]
+        return result[0]
+
+    @timed
+    def add_location(self, location_name):
+        """Create a new stockroom, returns (success, message)"""
+        try:
+            with self.connection() as connection, closing(connection.cursor()) as cursor:
+                cursor.execute(f"{self.backend.insert_ignore} INTO locations (location_name) VALUES (%s)",
+                               (location_name,))
+                created = cursor.rowcount == 1
+                if created:
+                    # Like every other write, so location lists read elsewhere pick it up
+                    version = self._bump_version(cursor, "supplies")
+                connection.commit()
+            if not created:
+                return False, f"Location {location_name} already exists"
+            self.cache.apply_many(version, [])
+            return True, f"Location {location_name} added"
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False, str(e)
+
+    @timed
+    def get_locations(self):
+        """(location_name, units on hand, supplies in stock) for every location"""
+        rows = self._fetch_summary("""
+            SELECT l.location_name, SUM(ls.quantity), SUM(CASE WHEN ls.quantity > 0 THEN 1 ELSE 0 END)
+            FROM locations l
+            LEFT JOIN location_stock ls ON ls.location_id = l.id
+            GROUP BY l.id, l.location_name
+            ORDER BY l.location_name
+        """, ())
+        return [(location_name, int(quantity or 0), int(supplies or 0)) for location_name, quantity, supplies in rows]
+
+    @timed
+    def get_location_stock(self, location=None):
+        """(supply_name, quantity) of every supply at one location, shaped like get_all_supplies"""
+        try:
+            location_id = self.get_location_id(location)
+            if not location_id:
+                return []
+            with self.connection() as connection, closing(self._cursor(connection)) as cursor:
+                cursor.execute("""
+                    SELECT s.supply_name, COALESCE(ls.quantity, 0)
+                    FROM supplies s
+                    LEFT JOIN location_stock ls ON ls.supply_id = s.id AND ls.location_id = %s
+                    ORDER BY s.supply_name
+                """, (location_id,))
+                return cursor.fetchall()
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return []
+
+    @timed
+    def get_stock_by_location(self):
+        """Cross-site stock table: (location names, rows) where each row is
+        (supply_name, total, quantity at each location in the order of the names)"""
+        def read(cursor):
+            cursor.execute("SELECT id, location_name FROM locations ORDER BY location_name")
+            locations = cursor.fetchall()
+            cursor.execute("""
+                SELECT s.supply_name, s.quantity, ls.location_id, ls.quantity
+                FROM supplies s
+                LEFT JOIN location_stock ls ON ls.supply_id = s.id
+                ORDER BY s.supply_name
+            """)
+            return locations, cursor.fetchall()
+
+        try:
+            locations, stock = self._read(read, prepared=False)
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return [], []
+        columns = {location_id: i for i, (location_id, _) in enumerate(locations)}
+        rows = {}
+        for supply_name, total, location_id, quantity in stock:
+            row = rows.setdefault(supply_name, [supply_name, total] + [0] * len(locations))
+            if location_id in columns:
+                row[2 + columns[location_id]] = quantity
+        return [name for _, name in locations], [tuple(row) for row in rows.values()]
+
+    @timed
+    def transfer_stock(self, supply_name, quantity, from_location, to_location):
+        """Move stock from one location to another in one transaction.
+
+        Returns (success, message, balance left at from_location). The total on hand doesn't
+        change, so transfers don't appear in the summaries or the stock ledger.
+        """
+        if quantity <= 0:
+            # A negative quantity would pass the stock check and move stock the other way
+            return False, "Quantity must be greater than 0", None
+        try:
+            supply_id = self.get_supply_id(supply_name)
+            if not supply_id:
+                return False, "Supply not found", None
+            from_id = self.get_location_id(from_location)
+            to_id = self.get_location_id(to_location)
+            if not from_id or not to_id:
+                return False, "Location not found", None
+            if from_id == to_id:
+                return False, "Stock can only be transferred to another location", None
+            with self.connection() as connection, closing(self._cursor(connection)) as cursor:
+                if to_id < from_id:
+                    self._add_location_stock(cursor, to_id, [(supply_id, quantity)])
+                remaining = self.backend.update_returning(cursor, "location_stock", "quantity", "quantity - %s",
+                                                          "location_id = %s AND supply_id = %s AND quantity >= %s",
+                                                          (quantity, from_id, supply_id, quantity))
+                if remaining is None:
+                    connection.rollback()
+                    return False, "Not enough supply available", None
+                if to_id > from_id:
+                    self._add_location_stock(cursor, to_id, [(supply_id, quantity)])
+
+                version = self._bump_version(cursor, "supplies")
+                cursor.execute("""
+                    INSERT INTO transfers (supply_id, from_location_id, to_location_id, quantity, row_version)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (supply_id, from_id, to_id, quantity, version))
+                connection.commit()
+            # No total changed, but the cached catalog has to follow the version
+            self.cache.apply_many(version, [])
+            return True, "Transfer successful", remaining
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False, str(e), None
+
+    @timed
+    def get_transfers(self, limit=50):
+        """(id, supply_name, from location, to location, quantity, transfer_date), newest first"""
+        return self._fetch_summary("""
+            SELECT t.id, s.supply_name, f.location_name, d.location_name, t.quantity, t.transfer_date
+            FROM transfers t
+            JOIN supplies s ON t.supply_id = s.id
+            JOIN locations f ON t.from_location_id = f.id
+            JOIN locations d ON t.to_location_id = d.id
+            ORDER BY t.transfer_date DESC, t.id DESC
+            LIMIT %s
+        """, (limit,))
+
+    def _add_location_stock(self, cursor, location_id, changes):
+        # changes: (supply_id, quantity delta) at one location, rows are created on first use
+        cursor.executemany(self.backend.upsert_add(
+            "location_stock", ["location_id", "supply_id", "quantity"], ["%s", "%s", "%s"], ["location_id", "supply_id"]
+        ), [(location_id, supply_id, quantity) for supply_id, quantity in changes])
+
+    # Classroom requests. Classrooms list what they need ahead of time, allocate_requests() then
+    # shares a location's stock across every open request and withdraws all of it in one
+    # transaction. A run is a single write version: each supply is withdrawn once, and
+    # request_allocations keeps what every request got under that version, which the requests
+    # it changed are stamped with. Runs take ALLOCATION_LOCK so two never count the same stock.
+
+    @timed
+    def add_classroom_requests(self, requests):
+        """Record validated classroom requests, (classroom, supply_name, quantity, priority)
+        tuples, in one transaction. Every supply must exist. Returns (success, message)."""
+        if not requests:
+            return True, "Nothing to import"
+        try:
+            with self.connection() as connection, closing(connection.cursor()) as cursor:
+                names = {request[1] for request in requests}
+                supply_ids = self._resolve_supply_ids(cursor, names, create=False)
+                unknown = sorted(names - set(supply_ids))
+                if unknown:
+                    connection.rollback()
+                    return False, f"Supply not found: {', '.join(unknown)}"
+                version = self._bump_version(cursor, "supplies")
+                cursor.executemany("""
+                    INSERT INTO classroom_requests (classroom, supply_id, quantity, priority, row_version)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, [(classroom, supply_ids[supply_name], quantity, priority, version)
+                      for classroom, supply_name, quantity, priority in requests])
+                connection.commit()
+            self.cache.apply_many(version, [])
+            return True, f"Recorded {len(requests)} requests"
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False, str(e)
+
+    @timed
+    def get_classroom_requests(self, open_only=True, limit=100):
+        """(id, classroom, supply_name, quantity, allocated, priority, status, request_date), oldest first"""
+        where = "WHERE r.status = 'open'" if open_only else ""
+        return self._fetch_summary(f"""
+            SELECT r.id, r.classroom, s.supply_name, r.quantity, r.allocated, r.priority, r.status, r.request_date
+            FROM classroom_requests r
+            JOIN supplies s ON r.supply_id = s.id
+            {where}
+            ORDER BY r.id
+            LIMIT %s
+        """, (limit,))
+
+    @timed
+    def allocate_requests(self, method="max-min", location=None, commit=True):
+        """Share the stock at location (default: the client's own) across every open classroom
+        request with one of the allocation METHODS, and withdraw it in one transaction.
+
+        Returns (success, message, allocations), allocations being (request_id, classroom,
+        supply_name, outstanding, granted) for every open request. With commit off nothing is
+        written and the allocations show what a run would hand out.
+        """
+        from .allocation import METHODS, allocate
+        if method not in METHODS:
+            return False, f"Unknown allocation method: {method}", []
+        try:
+            location_id = self.get_location_id(location)
+            if not location_id:
+                return False, f"Location not found: {location or self.location}", []
+            with self.connection() as connection, closing(connection.cursor()) as cursor:
+                for _ in range(ALLOCATION_ATTEMPTS):
+                    if not self.backend.lock(cursor, ALLOCATION_LOCK, ALLOCATION_LOCK_TIMEOUT):
+                        return False, f"Another client has been allocating for over {ALLOCATION_LOCK_TIMEOUT}s", []
+                    try:
+                        result = self._allocate_once(connection, cursor, allocate, method, location_id, commit)
+                    finally:
+                        if connection.in_transaction:
+                            connection.rollback()
+                        self.backend.unlock(cursor, ALLOCATION_LOCK)
+                    if result is not None:
+                        break
+                else:
+                    return False, "Stock kept changing while allocating, try again", []
+            allocations, version, changes, moved, filled = result
+            if not allocations:
+                return True, "No open requests", allocations
+            granted = sum(allocation[4] for allocation in allocations)
+            served = sum(1 for allocation in allocations if allocation[4])
+            if not commit:
+                return True, f"Would allocate {granted} units to {served} of {len(allocations)} requests", allocations
+            if version is not None:
+                self.cache.apply_many(version, changes)
+                self._count_movements(moved)
+            return True, f"Allocated {granted} units to {served} of {len(allocations)} requests, {filled} filled", allocations
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False, str(e), []
+
+    def _allocate_once(self, connection, cursor, allocate, method, location_id, commit):
+        # One attempt under the allocation lock. Returns (allocations, version, cache changes,
+        # movements written, requests filled), or None when a withdrawal took stock this
+        # allocation counted on. The caller rolls back whatever wasn't committed.
+        cursor.execute("""
+            SELECT r.id, r.classroom, r.supply_id, s.supply_name, r.quantity - r.allocated, r.priority
+            FROM classroom_requests r
+            JOIN supplies s ON r.supply_id = s.id
+            WHERE r.status = 'open'
+            ORDER BY r.id
+        """)
+        requests = cursor.fetchall()
+        cursor.execute("SELECT supply_id, quantity FROM location_stock WHERE location_id = %s", (location_id,))
+        stock = dict(cursor.fetchall())
+        granted = allocate([request[2] for request in requests], [request[4] for request in requests],
+                           [request[5] for request in requests], stock, method).tolist()
+        allocations = []
+        totals = {}
+        names = {}
+        for (request_id, classroom, supply_id, supply_name, outstanding, _), quantity in zip(requests, granted):
+            allocations.append((request_id, classroom, supply_name, outstanding, quantity))
+            if quantity:
+                totals[supply_id] = totals.get(supply_id, 0) + quantity
+                names[supply_id] = supply_name
+        if not commit or not totals:
+            return allocations, None, [], 0, 0
+
+        # Supplies rows first and then their location_stock rows, each in id order
+        withdrawn = sorted(totals.items())
+        cursor.executemany("UPDATE supplies SET quantity = quantity - %s WHERE id = %s",
+                           [(quantity, supply_id) for supply_id, quantity in withdrawn])
+        for supply_id, quantity in withdrawn:
+            left = self.backend.update_returning(cursor, "location_stock", "quantity", "quantity - %s",
+                                                 "location_id = %s AND supply_id = %s AND quantity >= %s",
+                                                 (quantity, location_id, supply_id, quantity))
+            if left is None:
+                return None
+
+        version = self._bump_version(cursor, "supplies")
+        cursor.executemany("""
+            INSERT INTO withdrawals (supply_id, quantity, row_version, location_id)
+            VALUES (%s, %s, %s, %s)
+        """, [(supply_id, quantity, version, location_id) for supply_id, quantity in withdrawn])
+        cursor.executemany("INSERT INTO request_allocations (row_version, request_id, quantity) VALUES (%s, %s, %s)",
+                           [(version, allocation[0], allocation[4]) for allocation in allocations if allocation[4]])
+        # The requests are brought up to date from request_allocations in two statements,
+        # however many of them there are
+        cursor.execute("""
+            UPDATE classroom_requests
+            SET allocated = allocated + (SELECT a.quantity FROM request_allocations a
+                                         WHERE a.row_version = %s AND a.request_id = classroom_requests.id),
+                row_version = %s
+            WHERE id IN (SELECT request_id FROM request_allocations WHERE row_version = %s)
+        """, (version, version, version))
+        cursor.execute("UPDATE classroom_requests SET status = 'filled' WHERE row_version = %s AND allocated >= quantity",
+                       (version,))
+        filled = cursor.rowcount
+        self._stamp_supplies(cursor, version, list(totals))
+        self._add_withdrawal_totals(cursor, withdrawn)
+        moved = self._record_movements(cursor, "withdrawal", [(supply_id, -quantity) for supply_id, quantity in withdrawn])
+        connection.commit()
+        return allocations, version, [(supply_id, names[supply_id], -quantity) for supply_id, quantity in withdrawn], moved, filled
+
+    # Summary tables. They are kept current inside the same transaction as every donation and
+    # withdrawal, so reports read a few hundred pre-aggregated rows instead of scanning the
+    # record tables. Updates come after the supplies version bump: its row lock orders them
+    # against rebuild_summaries, which takes the same lock first.
+
+    def _add_donation_totals(self, cursor, donations):
+        # donations: (supply_id, donor_name, contact_info, city, province, quantity) for one commit
+        by_supply = {}
+        by_donor = {}
+        by_location = {}
+        for supply_id, donor_name, contact_info, city, province, quantity in donations:
+            for totals, key in ((by_supply, supply_id), (by_donor, (donor_name, contact_info)),
+                                (by_location, (province, city))):
+                total = totals.setdefault(key, [0, 0])
+                total[0] += quantity
+                total[1] += 1
+        today = "CURRENT_DATE"
+        this_month = self.backend.month_start(today)
+        cursor.executemany(self.backend.upsert_add(
+            "supply_daily_totals", ["day", "supply_id", "donated", "donation_count"],
+            [today, "%s", "%s", "%s"], ["day", "supply_id"]
+        ), [(supply_id, quantity, count) for supply_id, (quantity, count) in by_supply.items()])
+        cursor.executemany(self.backend.upsert_add(
+            "donor_monthly_totals", ["month", "donor_name", "contact_info", "quantity", "donation_count"],
+            [this_month, "%s", "%s", "%s", "%s"], ["month", "donor_name", "contact_info"]
+        ), [key + (quantity, count) for key, (quantity, count) in by_donor.items()])
+        cursor.executemany(self.backend.upsert_add(
+            "location_monthly_totals", ["month", "province", "city", "quantity", "donation_count"],
+            [this_month, "%s", "%s", "%s", "%s"], ["month", "province", "city"]
+        ), [key + (quantity, count) for key, (quantity, count) in by_location.items()])
+
+    def _add_withdrawal_totals(self, cursor, withdrawals):
+        # withdrawals: (supply_id, quantity) for one commit
+        cursor.executemany(self.backend.upsert_add(
+            "supply_daily_totals", ["day", "supply_id", "withdrawn", "withdrawal_count"],
+            ["CURRENT_DATE", "%s", "%s", "1"], ["day", "supply_id"]
+        ), withdrawals)
+
+    def _ensure_summaries(self):
+        # Databases that had records before the summary tables existed get them filled once
+        with self.connection() as connection, closing(connection.cursor()) as cursor:
+            built = self._get_version(cursor, "summaries")
+        if not built:
+            self.rebuild_summaries()
+
+    @timed
+    def rebuild_summaries(self):
+        """Recompute every summary table from the donation and withdrawal records.
+
+        Returns (success, message). Writers wait for the rebuild to commit.
+        """
+        try:
+            start = time.perf_counter()
+            with self.connection() as connection, closing(connection.cursor()) as cursor:
+                self._bump_version(cursor, "supplies")
+                for table in ("supply_daily_totals", "donor_monthly_totals", "location_monthly_totals"):
+                    cursor.execute(f"DELETE FROM {table}")
+
+                cursor.execute("""
+                    SELECT DATE(donation_date), supply_id, SUM(quantity), COUNT(*)
+                    FROM donations
+                    GROUP BY DATE(donation_date), supply_id
+                """)
+                cursor.executemany(self.backend.upsert_add(
+                    "supply_daily_totals", ["day", "supply_id", "donated", "donation_count"],
+                    ["%s", "%s", "%s", "%s"], ["day", "supply_id"]
+                ), cursor.fetchall())
+                cursor.execute("""
+                    SELECT DATE(withdrawal_date), supply_id, SUM(quantity), COUNT(*)
+                    FROM withdrawals
+                    GROUP BY DATE(withdrawal_date), supply_id
+                """)
+                cursor.executemany(self.backend.upsert_add(
+                    "supply_daily_totals", ["day", "supply_id", "withdrawn", "withdrawal_count"],
+                    ["%s", "%s", "%s", "%s"], ["day", "supply_id"]
+                ), cursor.fetchall())
+
+                month = self.backend.month_start("donation_date")
+                cursor.execute(f"""
+                    SELECT {month}, donor_name, contact_info, SUM(quantity), COUNT(*)
+                    FROM donations
+                    GROUP BY 1, 2, 3
+                """)
+                cursor.executemany("""
+                    INSERT INTO donor_monthly_totals (month, donor_name, contact_info, quantity, donation_count)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, cursor.fetchall())
+
+                cursor.execute(f"""
+                    SELECT {month}, province, city, SUM(quantity), COUNT(*)
+                    FROM donations
+                    GROUP BY 1, 2, 3
+                """)
+                cursor.executemany("""
+                    INSERT INTO location_monthly_totals (month, province, city, quantity, donation_count)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, cursor.fetchall())
+
+                self._bump_version(cursor, "summaries")
+                connection.commit()
+            return True, f"Summaries rebuilt in {time.perf_counter() - start:.2f}s"
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False, str(e)
+
+    @timed
+    def get_supply_totals(self, start=None, end=None, period="month"):
+        """(period start, supply_name, donated, withdrawn) per supply per day or month, newest first"""
+        bucket = "t.day" if period == "day" else self.backend.month_start("t.day")
+        where, params = _date_range("t.day", start, end)
+        rows = self._fetch_summary(f"""
+            SELECT {bucket} AS period, s.supply_name, SUM(t.donated), SUM(t.withdrawn)
+            FROM supply_daily_totals t
+            JOIN supplies s ON t.supply_id = s.id
+            {where}
+            GROUP BY period, s.supply_name
+            ORDER BY period DESC, s.supply_name
+        """, params)
+        return [(_as_date(day), supply_name, int(donated), int(withdrawn)) for day, supply_name, donated, withdrawn in rows]
+
+    @timed
+    def get_demand_history(self, start=None):
+        """Input for forecasting, read together: ([(supply_id, supply_name, on hand)],
+        [(day, supply_id, donated, withdrawn)] per supply per day from start on, oldest first)"""
+        where, params = _date_range("day", start, None)
+
+        def read(cursor):
+            cursor.execute("SELECT id, supply_name, quantity FROM supplies ORDER BY supply_name")
+            supplies = cursor.fetchall()
+            cursor.execute(f"""
+                SELECT day, supply_id, donated, withdrawn
+                FROM supply_daily_totals
+                {where}
+                ORDER BY day
+            """, params)
+            return supplies, cursor.fetchall()
+
+        try:
+            return self._read(read, prepared=False)
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return [], []
+
+    @timed
+    def get_top_donors(self, start=None, end=None, limit=10):
+        """(donor_name, contact_info, quantity, donations) for the biggest donors, counted by whole months"""
+        where, params = _date_range("month", _month_of(start), end)
+        rows = self._fetch_summary(f"""
+            SELECT donor_name, contact_info, SUM(quantity) AS total, SUM(donation_count)
+            FROM donor_monthly_totals
+            {where}
+            GROUP BY donor_name, contact_info
+            ORDER BY total DESC, donor_name
+            LIMIT %s
+        """, params + [limit])
+        return [(donor_name, contact_info, int(quantity), int(count)) for donor_name, contact_info, quantity, count in rows]
+
+    @timed
+    def get_location_totals(self, start=None, end=None, by="province"):
+        """(province, quantity, donations) or with by="city" (province, city, quantity, donations), counted by whole months"""
+        columns = "province, city" if by == "city" else "province"
+        where, params = _date_range("month", _month_of(start), end)
+        rows = self._fetch_summary(f"""
+            SELECT {columns}, SUM(quantity) AS total, SUM(donation_count)
+            FROM location_monthly_totals
+            {where}
+            GROUP BY {columns}
+            ORDER BY total DESC, {columns}
+        """, params)
+        return [tuple(row[:-2]) + (int(row[-2]), int(row[-1])) for row in rows]
+
+    def _fetch_summary(self, query, params):
+        try:
+            return self._read(_fetch(query, params))
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return []
+
+    # Stock ledger. Every change to a supply's quantity is also appended to stock_movements in
+    # the same transaction, after the supplies version bump: writers hold its row lock while
+    # they append, so movement ids follow commit order. Checkpoints store every supply's balance
+    # up to a movement id, point-in-time lookups start from the nearest one and only sum the
+    # movements after it.
+
+    def _record_movements(self, cursor, kind, movements):
+        # movements: (supply_id, signed quantity) for one commit, returns how many were written
+        rows = [(supply_id, quantity, kind) for supply_id, quantity in movements if quantity]
+        cursor.executemany("INSERT INTO stock_movements (supply_id, quantity, kind) VALUES (%s, %s, %s)", rows)
+        return len(rows)
+
+    def _count_movements(self, count):
+        # Checkpoint after every STOCK_CHECKPOINT_INTERVAL movements this process has written
+        with self.ledger_lock:
+            self.unchecked_movements += count
+            due = self.unchecked_movements >= STOCK_CHECKPOINT_INTERVAL
+            if due:
+                self.unchecked_movements = 0
+        if due:
+            self.checkpoint_stock()
+
+    def _last_checkpoint(self, cursor):
+        cursor.execute("SELECT MAX(movement_id) FROM stock_checkpoints")
+        result = cursor.fetchone()
+        return result[0] or 0
+
+    @timed
+    def checkpoint_stock(self):
+        """Snapshot every supply's balance up to the newest stock movement.
+
+        Only the movements since the previous checkpoint are read. Returns (success, message).
+        """
+        try:
+            with self.connection() as connection, closing(connection.cursor()) as cursor:
+                # Waits for writers still appending movements, none can start until the commit
+                self._bump_version(cursor, "supplies")
+                previous = self._last_checkpoint(cursor)
+                cursor.execute("""
+                    SELECT supply_id, SUM(quantity), MAX(id)
+                    FROM stock_movements
+                    WHERE id > %s
+                    GROUP BY supply_id
+                """, (previous,))
+                changes = cursor.fetchall()
+                if not changes:
+                    connection.rollback()
+                    return True, "No stock movements since the last checkpoint"
+                movement_id = max(row[2] for row in changes)
+                # Newest movement time covered, a lookup may start here for any moment after it
+                cursor.execute("""
+                    SELECT MAX(moved_at) FROM (
+                        SELECT MAX(moved_at) AS moved_at FROM stock_movements WHERE id > %s
+                        UNION ALL
+                        SELECT MAX(moved_until) FROM stock_checkpoints WHERE movement_id = %s
+                    ) t
+                """, (previous, previous))
+                moved_until = cursor.fetchone()[0]
+                cursor.execute("SELECT supply_id, balance FROM stock_checkpoints WHERE movement_id = %s", (previous,))
+                balances = dict(cursor.fetchall())
+                for supply_id, quantity, _ in changes:
+                    balances[supply_id] = balances.get(supply_id, 0) + quantity
+                self._write_checkpoint(cursor, movement_id, balances, moved_until)
+                connection.commit()
+            return True, f"Checkpointed {len(balances)} supplies at movement {movement_id}"
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False, str(e)
+
+    def _write_checkpoint(self, cursor, movement_id, balances, moved_until):
+        cursor.executemany("""
+            INSERT INTO stock_checkpoints (movement_id, supply_id, balance, moved_until)
+            VALUES (%s, %s, %s, %s)
+        """, [(movement_id, supply_id, balance, moved_until) for supply_id, balance in balances.items()])
+
+    @timed
+    def get_stock_at(self, moment):
+        """(supply_name, quantity on hand) for every supply just before moment, a datetime.
+
+        One index seek finds the last checkpoint taken before moment, then only the movements
+        between it and the next checkpoint are summed.
+        """
+        try:
+            with self.connection() as connection, closing(self._cursor(connection)) as cursor:
+                cursor.execute("""
+                    SELECT movement_id FROM stock_checkpoints
+                    WHERE moved_until < %s
+                    ORDER BY moved_until DESC, movement_id DESC
+                    LIMIT 1
+                """, (moment,))
+                result = cursor.fetchone()
+                start = result[0] if result else 0
+                cursor.execute("""
+                    SELECT movement_id FROM stock_checkpoints
+                    WHERE moved_until >= %s
+                    ORDER BY moved_until, movement_id
+                    LIMIT 1
+                """, (moment,))
+                result = cursor.fetchone()
+                # Movements are appended in time order, nothing after the next checkpoint is older than moment
+                end_condition, end_params = ("AND id <= %s", (result[0],)) if result else ("", ())
+                cursor.execute(f"""
+                    SELECT s.supply_name, COALESCE(c.balance, 0) + COALESCE(m.quantity, 0)
+                    FROM supplies s
+                    LEFT JOIN stock_checkpoints c ON c.supply_id = s.id AND c.movement_id = %s
+                    LEFT JOIN (
+                        SELECT supply_id, SUM(quantity) AS quantity
+                        FROM stock_movements
+                        WHERE id > %s {end_condition} AND moved_at < %s
+                        GROUP BY supply_id
+                    ) m ON m.supply_id = s.id
+                    ORDER BY s.supply_name
+                """, (start, start) + end_params + (moment,))
+                return cursor.fetchall()
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return []
+
+    @timed
+    def reconcile_stock(self, full=False):
+        """Compare each supply's quantity with its ledger balance in one pass.
+
+        The ledger balance is the last checkpoint plus the movements since, or with full=True
+        the sum of the whole ledger. Returns (success, message, mismatches) where mismatches
+        are (supply_name, quantity, ledger_balance) rows.
+        """
+        start = "0" if full else "COALESCE((SELECT MAX(movement_id) FROM stock_checkpoints), 0)"
+        try:
+            with self.connection() as connection, closing(connection.cursor()) as cursor:
+                # A single statement reads supplies and the ledger from the same snapshot
+                cursor.execute(f"""
+                    SELECT s.supply_name, s.quantity, COALESCE(c.balance, 0) + COALESCE(m.quantity, 0)
+                    FROM supplies s
+                    LEFT JOIN stock_checkpoints c ON c.supply_id = s.id AND c.movement_id = {start}
+                    LEFT JOIN (
+                        SELECT supply_id, SUM(quantity) AS quantity
+                        FROM stock_movements
+                        WHERE id > {start}
+                        GROUP BY supply_id
+                    ) m ON m.supply_id = s.id
+                    ORDER BY s.supply_name
+                """)
+                rows = cursor.fetchall()
+            mismatches = [row for row in rows if row[1] != row[2]]
+            if mismatches:
+                return True, f"{len(mismatches)} of {len(rows)} supplies disagree with the stock ledger", mismatches
+            return True, f"All {len(rows)} supplies match the stock ledger", []
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False, str(e), []
+
+    def _ensure_ledger(self):
+        # Databases that had records before the stock ledger existed get it built once
+        with self.connection() as connection, closing(connection.cursor()) as cursor:
+            built = self._get_version(cursor, "ledger")
+        if not built:
+            self.rebuild_ledger()
+
+    @timed
+    def rebuild_ledger(self):
+        """Replace the stock ledger with one rebuilt from the donation and withdrawal records.
+
+        Whatever part of each supply's quantity the records don't explain becomes an opening
+        balance before the first record. Manual adjustments made before the rebuild are folded
+        into it. Returns (success, message). Writers wait for the rebuild to commit.
+        """
+        try:
+            start = time.perf_counter()
+            with self.connection() as connection, closing(connection.cursor()) as cursor:
+                self._bump_version(cursor, "supplies")
+                cursor.execute("DELETE FROM stock_checkpoints")
+                cursor.execute("DELETE FROM stock_movements")
+
+                cursor.execute("""
+                    SELECT s.id, s.quantity - COALESCE(d.quantity, 0) + COALESCE(w.quantity, 0)
+                    FROM supplies s
+                    LEFT JOIN (SELECT supply_id, SUM(quantity) AS quantity FROM donations GROUP BY supply_id) d
+                        ON d.supply_id = s.id
+                    LEFT JOIN (SELECT supply_id, SUM(quantity) AS quantity FROM withdrawals GROUP BY supply_id) w
+                        ON w.supply_id = s.id
+                """)
+                openings = cursor.fetchall()
+                cursor.execute("""
+                    SELECT MIN(first) FROM (
+                        SELECT MIN(donation_date) AS first FROM donations
+                        UNION ALL
+                        SELECT MIN(withdrawal_date) FROM withdrawals
+                    ) t
+                """)
+                first = cursor.fetchone()[0]
+                opened_at = first if first else datetime.datetime.now().replace(microsecond=0)
+                rows = [(supply_id, quantity, "opening", opened_at) for supply_id, quantity in openings if quantity]
+
+                # Both record tables in date order, merged so movement ids follow moved_at
+                history = heapq.merge(
+                    self._ledger_history(cursor, "donations", "donation_date", "donation", 1),
+                    self._ledger_history(cursor, "withdrawals", "withdrawal_date", "withdrawal", -1),
+                )
+                insert = """
+                    INSERT INTO stock_movements (supply_id, quantity, kind, moved_at)
+                    VALUES (%s, %s, %s, %s)
+                """
+                count = 0
+                balances = {}
+                for moved_at, _, supply_id, quantity, kind in history:
+                    rows.append((supply_id, quantity, kind, moved_at))
+                    if len(rows) < LEDGER_REBUILD_BATCH:
+                        continue
+                    cursor.executemany(insert, rows)
+                    count += len(rows)
+                    for supply_id, quantity, _, _ in rows:
+                        balances[supply_id] = balances.get(supply_id, 0) + quantity
+                    rows = []
+                    # Checkpoint the history as it goes in, so lookups into the past stay short too
+                    if count % STOCK_CHECKPOINT_INTERVAL < LEDGER_REBUILD_BATCH:
+                        cursor.execute("SELECT MAX(id) FROM stock_movements")
+                        self._write_checkpoint(cursor, cursor.fetchone()[0], balances, moved_at)
+                cursor.executemany(insert, rows)
+                count += len(rows)
+
+                self._bump_version(cursor, "ledger")
+                connection.commit()
+            with self.ledger_lock:
+                self.unchecked_movements = 0
+            self.checkpoint_stock()
+            return True, f"Stock ledger rebuilt with {count} movements in {time.perf_counter() - start:.2f}s"
+        except self.Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return False, str(e)
+
+    def _ledger_history(self, cursor, table, date_column, kind, sign):
+        # (date, id, supply_id, signed quantity, kind) in date order, read a page at a time so the
+        # caller can insert on the same cursor between pages
+        where, params = "", ()
+        while True:
+            cursor.execute(f"""
+                SELECT {date_column}, id, supply_id, quantity
+                FROM {table}
+                {where}
+                ORDER BY {date_column}, id
+                LIMIT %s
+            """, params + (LEDGER_REBUILD_BATCH,))
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            for moved_at, record_id, supply_id, quantity in rows:
+                yield moved_at, record_id, supply_id, sign * quantity, kind
+            where = f"WHERE {date_column} > %s OR ({date_column} = %s AND id > %s)"
+            params = (rows[-1][0], rows[-1][0], rows[-1][1])
+
+    # Exports. Rows come straight off a streaming cursor, so memory use doesn't grow with the
+    # table. The pooled connection is held until the generator is exhausted or closed.
+
+    def stream_donations(self, filters=None, batch_size=STREAM_BATCH_SIZE):
+        """Yield (id, donation_date, donor_name, contact_info, barangay, city, province, supply_name, quantity)
+        in id order, filtered like search_donations"""
+        conditions, params = _filter_conditions(filters, "d", "donation_date")
+        query = """
+            SELECT d.id, d.donation_date, d.donor_name, d.contact_info, d.barangay, d.city, d.province,
+                s.supply_name, d.quantity
+            FROM donations d
+            JOIN supplies s ON d.supply_id = s.id
+        """
+        return self._stream(query, conditions, params, "d.id", batch_size)
+
+    def stream_withdrawals(self, filters=None, batch_size=STREAM_BATCH_SIZE):
+        """Yield (id, withdrawal_date, supply_name, quantity) in id order.
+
+        filters may hold supply, date_from, date_to, min_quantity and max_quantity.
+        """
+        conditions, params = _filter_conditions(filters, "w", "withdrawal_date")
+        query = """
+            SELECT w.id, w.withdrawal_date, s.supply_name, w.quantity
+            FROM withdrawals w
+            JOIN supplies s ON w.supply_id = s.id
+        """
+        return self._stream(query, conditions, params, "w.id", batch_size)
+
+    def _stream(self, query, conditions, params, order_by, batch_size):
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {order_by}"
+        connection = self.pool.acquire()
+        finished = False
+        try:
+            cursor = self.backend.stream_cursor(self._instrument(connection))
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            cursor.close()
+            finished = True
+        finally:
+            # A half-read result can't be handed to the next borrower, drop the connection instead
+            self.pool.release(connection, discard=not finished)
+
+def _fetch(query, params=()):
+    # Read for DatabaseConnection._read that runs one query and returns all of its rows
+    def read(cursor):
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    return read
+
+def _keyset_query(query, sort_key, after, limit, backward, inclusive=False, descending=False, conditions=(), params=()):
+    # Seek past the (sort column, id) key of the last row seen instead of using OFFSET,
+    # so every page costs the same no matter how deep into the table it is
+    column, id_column = sort_key
+    ascending = descending == backward
+    op = ">" if ascending else "<"
+    id_op = op + "=" if inclusive else op
+    direction = "ASC" if ascending else "DESC"
+    conditions = list(conditions)
+    params = list(params)
+    if after is not None:
+        conditions.append(f"{column} {op}= %s AND ({column} {op} %s OR {id_column} {id_op} %s)")
+        params.extend([after[0], after[0], after[1]])
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {column} {direction}, {id_column} {direction} LIMIT %s"
+    params.append(limit)
+    return query, params
+
+def _date_range(column, start, end):
+    # WHERE clause for an inclusive date range, either end may be open
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append(f"{column} >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append(f"{column} <= %s")
+        params.append(end)
+    return ("WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+def _filter_conditions(filters, alias, date_column):
+    # WHERE conditions and parameters for the filters search_donations and the exports accept
+    conditions = []
+    params = []
+    for key, value in (filters or {}).items():
+        if value is None or value == "":
+            continue
+        if key in PREFIX_FILTERS and alias == "d":
+            conditions.append(f"{PREFIX_FILTERS[key]} LIKE %s ESCAPE '!'")
+            params.append(_prefix_pattern(value))
+        elif key == "supply":
+            conditions.append("s.supply_name = %s")
+            params.append(value)
+        elif key == "date_from":
+            conditions.append(f"{alias}.{date_column} >= %s")
+            params.append(value)
+        elif key == "date_to":
+            conditions.append(f"{alias}.{date_column} < %s")
+            params.append(value + datetime.timedelta(days=1))
+        elif key == "min_quantity":
+            conditions.append(f"{alias}.quantity >= %s")
+            params.append(value)
+        elif key == "max_quantity":
+            conditions.append(f"{alias}.quantity <= %s")
+            params.append(value)
+        else:
+            raise ValueError(f"Unknown filter: {key}")
+    return conditions, params
+
+def _month_of(day):
+    return day.replace(day=1) if day is not None else None
+
+def _as_date(value):
+    # SQLite hands computed dates back as text
+    return datetime.date.fromisoformat(value) if isinstance(value, str) else value
+
+def _parse_address(address):
+    """(barangay, city, province) from a "barangay, city, province" or "city, province" address"""
+    parts = [part.strip() for part in address.split(",")]
+    if len(parts) < 2:
+        return "", "", parts[0]
+    return ", ".join(parts[:-2]), parts[-2], parts[-1]
+
+def _prefix_pattern(text):
+    # LIKE pattern matching values that start with text, wildcards in text match literally
+    return text.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%"
@@ -0,0 +1,74 @@
+# Export of donation and withdrawal records to CSV or JSON Lines, optionally gzip-compressed.
+#
+# Rows flow from a streaming database cursor through a generator into the file one at a time,
+# so a multi-million-row history is exported in constant memory.
+import csv
+import datetime
+import gzip
+import json
+
+# Rows between progress callbacks
+PROGRESS_EVERY = 10000
+
+DONATION_COLUMNS = ["id", "donation_date", "donor_name", "contact_info", "barangay", "city", "province",
+                    "supply_name", "quantity"]
+WITHDRAWAL_COLUMNS = ["id", "withdrawal_date", "supply_name", "quantity"]
+
+def export_format(path):
+    """("csv" or "jsonl", compressed) from a file name such as donations.csv or donations.jsonl.gz"""
+    name = path.lower()
+    compressed = name.endswith(".gz")
+    if compressed:
+        name = name[:-3]
+    return ("jsonl" if name.endswith((".jsonl", ".json")) else "csv"), compressed
+
+def export_donations(db, path, filters=None, progress=None):
+    """Write the donations matching filters (as for search_donations) to path, returns the row count"""
+    return export_rows(path, DONATION_COLUMNS, db.stream_donations(filters), progress)
+
+def export_withdrawals(db, path, filters=None, progress=None):
+    """Write the withdrawals matching filters (supply, date_from, date_to) to path, returns the row count"""
+    return export_rows(path, WITHDRAWAL_COLUMNS, db.stream_withdrawals(filters), progress)
+
+def export_rows(path, columns, rows, progress=None):
+    """Write rows to path in the format its name asks for, calling progress(count) along the way"""
+    file_format, compressed = export_format(path)
+    opener = gzip.open if compressed else open
+    write = _write_csv if file_format == "csv" else _write_jsonl
+    try:
+        with opener(path, "wt", newline="", encoding="utf-8") as file:
+            count = write(file, columns, _report_progress(rows, progress))
+    finally:
+        # Stops the database stream early if writing failed
+        rows.close()
+    if progress:
+        progress(count)
+    return count
+
+def _report_progress(rows, progress):
+    for count, row in enumerate(rows, 1):
+        yield row
+        if progress and count % PROGRESS_EVERY == 0:
+            progress(count)
+
+def _write_csv(file, columns, rows):
+    writer = csv.writer(file)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+def _write_jsonl(file, columns, rows):
+    count = 0
+    for row in rows:
+        file.write(json.dumps(dict(zip(columns, row)), default=_json_value) + "\n")
+        count += 1
+    return count
+
+def _json_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    # DECIMAL sums and anything else the driver hands back
+    return str(value)
@@ -0,0 +1,143 @@
+# Demand forecasting and reorder alerts from the per-day totals in supply_daily_totals.
+#
+# The history is loaded once into supplies x days matrices of withdrawals and donations, so the
+# consumption rates, moving averages, seasonal factors and days of cover of every supply come
+# out of a few whole-array NumPy operations rather than a loop per supply and day.
+import datetime
+
+import numpy as np
+
+# Days the consumption rate is averaged over, and the shorter moving average shown beside it
+RATE_WINDOW = 28
+SHORT_WINDOW = 7
+# Days a restock (a donation drive or a purchase) takes to arrive. Stock must cover at least that long.
+LEAD_DAYS = 14
+# Days of demand beyond the lead time a suggested order covers
+ORDER_COVER_DAYS = 30
+# Standard deviations of daily demand kept as safety stock, 1.65 covers about 95% of lead times
+SAFETY_FACTOR = 1.65
+# School supplies follow the school year: the rate is scaled by how the coming lead time compared
+# with the weeks before it in earlier years, within these bounds
+SEASON_LIMITS = (0.5, 3.0)
+YEAR_DAYS = 365
+
+OK, REORDER, OUT_OF_STOCK = "OK", "Reorder", "Out of stock"
+
+class Forecast:
+    # Per-supply figures, each an array in the order of names. Rates are units per day.
+    def __init__(self, names, on_hand, rate, short_average, donation_rate, season, forecast_rate,
+                 days_of_cover, reorder_point, order_quantity, status):
+        self.names = names
+        self.on_hand = on_hand
+        self.rate = rate                        # Withdrawn per day over the last RATE_WINDOW days
+        self.short_average = short_average      # Withdrawn per day over the last SHORT_WINDOW days
+        self.donation_rate = donation_rate      # Donated per day over the last RATE_WINDOW days
+        self.season = season
+        self.forecast_rate = forecast_rate      # Expected withdrawals per day over the lead time
+        self.days_of_cover = days_of_cover      # inf for supplies nobody withdraws
+        self.reorder_point = reorder_point
+        self.order_quantity = order_quantity
+        self.status = status
+
+    def rows(self, alerts_only=False):
+        """(supply_name, on hand, rate, short average, forecast rate, days of cover, reorder point,
+        order quantity, status), fewest days of cover first. Days of cover is None without demand."""
+        order = np.argsort(self.days_of_cover, kind="stable")
+        rows = []
+        for i in order:
+            if alerts_only and self.status[i] == OK:
+                continue
+            cover = self.days_of_cover[i]
+            rows.append((
+                self.names[i], int(self.on_hand[i]), round(float(self.rate[i]), 2),
+                round(float(self.short_average[i]), 2), round(float(self.forecast_rate[i]), 2),
+                round(float(cover), 1) if np.isfinite(cover) else None,
+                int(self.reorder_point[i]), int(self.order_quantity[i]), str(self.status[i]),
+            ))
+        return rows
+
+    def alerts(self):
+        """rows() of the supplies that are out of stock or at their reorder point"""
+        return self.rows(alerts_only=True)
+
+def forecast_demand(db, today=None, lead_days=LEAD_DAYS, history_start=None):
+    """Forecast every supply from its daily totals, using the history from history_start (all of it by default)"""
+    _check_lead_days(lead_days)
+    supplies, movements = db.get_demand_history(history_start)
+    return build_forecast(supplies, movements, today or datetime.date.today(), lead_days)
+
+def build_forecast(supplies, movements, today, lead_days=LEAD_DAYS):
+    """Forecast from get_demand_history() rows. The day before today is the last full day of history."""
+    _check_lead_days(lead_days)
+    names = [supply_name for _, supply_name, _ in supplies]
+    ids = np.array([supply_id for supply_id, _, _ in supplies], dtype=np.int64)
+    on_hand = np.array([quantity for _, _, quantity in supplies], dtype=np.int64)
+    end = today.toordinal()
+
+    # Days as ordinals, one column at a time straight from the rows. Without supplies there is
+    # nothing to place the movements in.
+    movements = movements if supplies else []
+    count = len(movements)
+    days = np.fromiter((_ordinal(day) for day, _, _, _ in movements), np.int64, count)
+    supply_ids = np.fromiter((supply_id for _, supply_id, _, _ in movements), np.int64, count)
+    donated = np.fromiter((quantity for _, _, quantity, _ in movements), np.float64, count)
+    withdrawn = np.fromiter((quantity for _, _, _, quantity in movements), np.float64, count)
+    start = min(int(days.min()), end - RATE_WINDOW) if count else end - RATE_WINDOW
+    width = end - start
+
+    # Row of each movement's supply, dropping today's partial totals and supplies no longer listed
+    order = np.argsort(ids)
+    rows = order[np.searchsorted(ids, supply_ids, sorter=order).clip(max=len(ids) - 1)]
+    keep = (days < end) & (ids[rows] == supply_ids)
+    rows = rows[keep]
+    columns = days[keep] - start
+    taken = np.zeros((len(ids), width))
+    given = np.zeros((len(ids), width))
+    # (day, supply_id) is the key of supply_daily_totals, so every cell is written once
+    taken[rows, columns] = withdrawn[keep]
+    given[rows, columns] = donated[keep]
+
+    # Running totals: the sum over any window of days is the difference of two columns
+    taken_total = np.zeros((len(ids), width + 1))
+    np.cumsum(taken, axis=1, out=taken_total[:, 1:])
+    given_total = np.zeros((len(ids), width + 1))
+    np.cumsum(given, axis=1, out=given_total[:, 1:])
+    rate = (taken_total[:, width] - taken_total[:, width - RATE_WINDOW]) / RATE_WINDOW
+    short_average = (taken_total[:, width] - taken_total[:, width - SHORT_WINDOW]) / SHORT_WINDOW
+    donation_rate = (given_total[:, width] - given_total[:, width - RATE_WINDOW]) / RATE_WINDOW
+    deviation = taken[:, width - RATE_WINDOW:].std(axis=1)
+
+    # The same point in every earlier year with a full rate window before it
+    years = (width - RATE_WINDOW) // YEAR_DAYS
+    season = np.ones(len(ids))
+    forecast_rate = rate
+    if years:
+        then = width - YEAR_DAYS * np.arange(1, years + 1)
+        ahead = (taken_total[:, then + lead_days] - taken_total[:, then]).sum(axis=1) / (lead_days * years)
+        before = (taken_total[:, then] - taken_total[:, then - RATE_WINDOW]).sum(axis=1) / (RATE_WINDOW * years)
+        np.divide(ahead, before, out=season, where=before > 0)
+        season = season.clip(*SEASON_LIMITS)
+        # Supplies only ever asked for in the coming weeks have no ratio, last years' rate stands in
+        forecast_rate = np.where(before > 0, rate * season, np.maximum(rate, ahead))
+
+    safety_stock = SAFETY_FACTOR * deviation * np.sqrt(lead_days)
+    reorder_point = np.ceil(forecast_rate * lead_days + safety_stock)
+    days_of_cover = np.full(len(ids), np.inf)
+    np.divide(on_hand.clip(min=0), forecast_rate, out=days_of_cover, where=forecast_rate > 0)
+    demanded = forecast_rate > 0
+    status = np.select([demanded & (on_hand <= 0), demanded & (on_hand <= reorder_point)],
+                       [OUT_OF_STOCK, REORDER], OK)
+    target = np.ceil(forecast_rate * (lead_days + ORDER_COVER_DAYS) + safety_stock)
+    order_quantity = np.where(status != OK, np.maximum(target - on_hand, 0), 0)
+    return Forecast(names, on_hand, rate, short_average, donation_rate, season, forecast_rate,
+                    days_of_cover, reorder_point, order_quantity, status)
+
+def _check_lead_days(lead_days):
+    # The seasonal factor looks lead_days ahead of the same day a year earlier, which has to be
+    # in the history, and the safety stock takes its square root
+    if not 1 <= lead_days <= YEAR_DAYS:
+        raise ValueError(f"Lead time must be between 1 and {YEAR_DAYS} days, got {lead_days}")
+
+def _ordinal(day):
+    # SQLite may hand dates back as text
+    return (datetime.date.fromisoformat(day) if isinstance(day, str) else day).toordinal()
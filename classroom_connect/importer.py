@@ -0,0 +1,189 @@
+# Streaming bulk import of donation and classroom request files
+import csv
+import json
+import time
+
+from .validation import DONATION_FIELDS, REQUEST_FIELDS, validate_donations, validate_requests
+
+IMPORT_BATCH_SIZE = 2000
+
+def _normalize_column(name):
+    # "Donor Name", "donor_name" and "DONOR NAME" all map to donor_name
+    return name.strip().lower().replace(" ", "_")
+
+def _iter_csv(file):
+    # (line, record), the header being line 1. A quoted value with line breaks spreads a row over
+    # several lines, it is reported at the first of them.
+    reader = csv.DictReader(file)
+    for row in reader:
+        # line_num is the last line read, blank lines before the row included
+        yield reader.line_num - _line_count(row) + 1, {_normalize_column(key): value for key, value in row.items() if key is not None}
+
+def _line_count(row):
+    # Physical lines a parsed row took up
+    return 1 + sum(value.count("\n") for value in row.values() if isinstance(value, str))
+
+class BadRecord:
+    # Stands in for a record that couldn't be read, it is rejected with message as its reason
+    def __init__(self, message):
+        self.message = message
+
+    def get(self, field, default=None):
+        return default
+
+def _iter_json(file, chunk_size=65536):
+    # Streams either a JSON array of objects or JSON Lines without loading the whole file, as
+    # (line, record) with the line each record starts on. A record that isn't valid JSON, or
+    # isn't an object, comes out as a BadRecord and reading carries on after it.
+    decoder = json.JSONDecoder()
+    buffer = ""
+    line = 1
+    started = False
+    array = False
+    eof = False
+    while True:
+        stripped = buffer.lstrip(" \t\r\n,")
+        if not started and stripped.startswith("["):
+            stripped = stripped[1:].lstrip(" \t\r\n,")
+            started = array = True
+        line += buffer.count("\n", 0, len(buffer) - len(stripped))
+        if array and stripped.startswith("]"):
+            return
+        buffer = stripped
+        if buffer:
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as e:
+                # A record cut off at the end of the buffer only needs the next chunk. One with an
+                # error before a line break, or at the end of the file, is malformed.
+                skip = _resync(buffer, e.pos, array)
+                if skip is None and not eof:
+                    record = end = None
+                else:
+                    record, end = BadRecord(f"Invalid JSON: {e.msg}"), skip or len(buffer)
+            if end is not None:
+                start = line
+                line += buffer.count("\n", 0, end)
+                buffer = buffer[end:]
+                started = True
+                if isinstance(record, dict):
+                    record = {_normalize_column(key): value for key, value in record.items()}
+                elif not isinstance(record, BadRecord):
+                    record = BadRecord(f"Expected a JSON object, got {type(record).__name__}")
+                yield start, record
+                continue
+        if eof:
+            return
+        chunk = file.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+def _resync(buffer, position, array):
+    # Where reading picks up after a malformed record, or None when its line isn't complete yet.
+    # JSON Lines go on at the next line, an array at the next line that opens an object or ends it.
+    end = buffer.find("\n", position)
+    while end != -1:
+        if not array or buffer[end + 1:].lstrip(" \t\r,")[:1] in ("{", "]"):
+            return end + 1
+        end = buffer.find("\n", end + 1)
+    return None
+
+def read_records(path):
+    """Yield (line number, record) one record at a time from a .csv, .json or .jsonl file.
+
+    A JSON record that can't be read comes out as a BadRecord, with the reason in its message.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        if path.lower().endswith(".csv"):
+            yield from _iter_csv(file)
+        else:
+            yield from _iter_json(file)
+
+def import_donations(db, path, batch_size=IMPORT_BATCH_SIZE, error_report=None, progress=None, location=None):
+    """Bulk-load donations from a file, returns a summary dict.
+
+    Rows are validated and written batch by batch, through validate_donations and
+    add_donations_batch, into the stock of location (default: the client's own). Rejected
+    rows go to error_report (default: <file>.errors.csv) with their line number and every
+    reason they were rejected for.
+    """
+    return _import_file(path, DONATION_FIELDS, validate_donations,
+                        lambda donations: db.add_donations_batch(donations, location=location),
+                        batch_size, error_report, progress)
+
+def import_requests(db, path, batch_size=IMPORT_BATCH_SIZE, error_report=None, progress=None):
+    """Bulk-load classroom requests from a file through validate_requests and add_classroom_requests,
+    returns a summary dict like import_donations"""
+    def validate(records):
+        # Requests can only be for supplies that exist, rows for any other are rejected on their own
+        # instead of rolling their whole batch back. Each name is looked up once, then cached.
+        requests, errors = validate_requests(records)
+        supply_ids = {name: db.get_supply_id(name) for name in {request[1] for _, request in requests}}
+        unknown = [(i, "supply_name", f"Supply not found: {request[1]}") for i, request in requests
+                   if not supply_ids[request[1]]]
+        if not unknown:
+            return requests, errors
+        rejected = {i for i, _, _ in unknown}
+        return [(i, request) for i, request in requests if i not in rejected], errors + unknown
+
+    return _import_file(path, REQUEST_FIELDS, validate, db.add_classroom_requests, batch_size, error_report, progress)
+
+def _import_file(path, fields, validate, save, batch_size, error_report, progress):
+    # validate(records) returns (rows, errors) and save(rows) writes one batch in one
+    # transaction, returning (success, message)
+    if error_report is None:
+        error_report = path + ".errors.csv"
+    summary = {"rows": 0, "imported": 0, "failed": 0, "error_report": None}
+    start = time.perf_counter()
+    report_file = None
+    report_writer = None
+
+    def reject(row_number, record, reason):
+        # record may be a BadRecord, which has no fields
+        nonlocal report_file, report_writer
+        if report_writer is None:
+            report_file = open(error_report, "w", newline="", encoding="utf-8")
+            report_writer = csv.writer(report_file)
+            report_writer.writerow(["line", "error"] + [field for field, _ in fields])
+            summary["error_report"] = error_report
+        report_writer.writerow([row_number, reason] + [record.get(field, "") for field, _ in fields])
+        summary["failed"] += 1
+
+    def flush(rows):
+        # rows: (line number, record) read from the file, the unreadable ones are rejected here
+        for row_number, record in rows:
+            if isinstance(record, BadRecord):
+                reject(row_number, record, record.message)
+        rows = [row for row in rows if not isinstance(row[1], BadRecord)]
+        valid, errors = validate([record for _, record in rows])
+        reasons = {}
+        for i, _, message in errors:
+            reasons.setdefault(i, []).append(message)
+        for i, messages in reasons.items():
+            reject(rows[i][0], rows[i][1], "; ".join(messages))
+        if valid:
+            success, message = save([row for _, row in valid])
+            if success:
+                summary["imported"] += len(valid)
+            else:
+                for i, _ in valid:
+                    reject(rows[i][0], rows[i][1], f"Batch rolled back: {message}")
+        if progress:
+            progress(summary)
+
+    try:
+        rows = []
+        for row_number, record in read_records(path):
+            summary["rows"] += 1
+            rows.append((row_number, record))
+            if len(rows) >= batch_size:
+                flush(rows)
+                rows = []
+        if rows:
+            flush(rows)
+    finally:
+        if report_file:
+            report_file.close()
+    summary["seconds"] = time.perf_counter() - start
+    return summary
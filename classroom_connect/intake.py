@@ -0,0 +1,202 @@
+# Write-behind intake queue for donation drives.
+#
+# submit() appends the donation to a journal file and fsyncs it, which is all a volunteer waits
+# for. A writer thread commits whatever has queued up as one add_donations_batch transaction,
+# together with the sequence number of the last entry it contains. After a crash the journal
+# is replayed from that checkpoint, so every acknowledged donation is committed exactly once.
+#
+# A batch the database rejects is split in half until the entry at fault is on its own. An entry
+# that keeps failing while the database is reachable is moved to the rejected file (the journal
+# path + ".rejected") so the entries behind it aren't held up. While the database can't be
+# reached nothing is given up on, the writer just waits and tries again.
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+# Most entries committed in one transaction
+INTAKE_BATCH_SIZE = 500
+# Journal size after which it is truncated once everything in it is committed and durable
+COMPACT_BYTES = 1024 * 1024
+# Seconds to wait before retrying a batch the database rejected, doubling up to the maximum
+RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 30
+# Times a single entry is tried with the database reachable before it is moved to the rejected file
+MAX_ENTRY_ATTEMPTS = 3
+
+class IntakeQueue:
+    # Journal format: a header line {"queue": id}, then one {"seq": n, "donation": [...]} line per entry
+    def __init__(self, db, path, batch_size=INTAKE_BATCH_SIZE, linger=0.0):
+        self.db = db
+        self.path = path
+        self.batch_size = batch_size
+        self.linger = linger        # Seconds the writer waits for more entries before committing
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.pending = []           # (seq, donation) journaled but not yet committed
+        self.committed_seq = 0
+        self.failures = 0
+        self.refusals = 0               # Times in a row the entry in hand was refused
+        self.batch_limit = batch_size   # Shrinks while a rejected batch is split, grows back after
+        self.rejected = 0               # Entries moved to the rejected file by this process
+        self.rejected_path = path + ".rejected"
+        self.closing = False
+        self.stopped = threading.Event()    # Cuts the writer's waits short on close
+
+        self.queue_id, entries = self._read_journal()
+        self.committed_seq = db.get_intake_checkpoint(self.queue_id)
+        self.pending = [(seq, donation) for seq, donation in entries if seq > self.committed_seq]
+        self.next_seq = max([self.committed_seq] + [seq for seq, _ in entries]) + 1
+        if self.pending:
+            print(f"Recovering {len(self.pending)} queued donations from {path}", file=sys.stderr)
+        self.file = open(path, "a", encoding="utf-8")
+        self.writer = threading.Thread(target=self._run, name="intake-writer", daemon=True)
+        self.writer.start()
+
+    def _read_journal(self):
+        if not os.path.exists(self.path):
+            queue_id = uuid.uuid4().hex
+            with open(self.path, "w", encoding="utf-8") as file:
+                file.write(json.dumps({"queue": queue_id}) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            return queue_id, []
+        entries = []
+        with open(self.path, "r+b") as file:
+            queue_id = json.loads(file.readline())["queue"]
+            good_end = file.tell()
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash was never acknowledged. Cut it off so new
+                    # entries don't get appended behind it.
+                    file.truncate(good_end)
+                    os.fsync(file.fileno())
+                    break
+                entries.append((entry["seq"], tuple(entry["donation"])))
+                good_end += len(line)
+        return queue_id, entries
+
+    def submit(self, donor_name, contact_info, barangay, city, province, supply_name, quantity):
+        """Durably queue one validated donation, returns its sequence number"""
+        donation = (donor_name, contact_info, barangay, city, province, supply_name, quantity)
+        with self.lock:
+            if self.closing:
+                raise RuntimeError("Intake queue is closed")
+            seq = self.next_seq
+            self.file.write(json.dumps({"seq": seq, "donation": donation}) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.next_seq += 1
+            self.pending.append((seq, donation))
+            self.changed.notify_all()
+        return seq
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not self.pending and not self.closing:
+                    self.changed.wait()
+                # Once closing, whatever is still pending stays in the journal for the next start
+                if not self.pending or self.closing:
+                    return
+            if self.linger:
+                self.stopped.wait(self.linger)
+            with self.lock:
+                batch = self.pending[:self.batch_limit]
+            last_seq = batch[-1][0]
+            success, message = self.db.add_donations_batch([donation for _, donation in batch],
+                                                           checkpoint=(self.queue_id, last_seq))
+            if success:
+                self._committed(len(batch), last_seq)
+                self.batch_limit = min(self.batch_size, self.batch_limit * 2)
+                continue
+            reachable = self.db.get_change_version() is not None
+            if reachable and len(batch) > 1:
+                # Something in the batch was refused, try each half on its own
+                self.batch_limit = max(len(batch) // 2, 1)
+                print(f"Intake batch failed, splitting it: {message}", file=sys.stderr)
+                continue
+            self.failures += 1
+            # Only refusals from a reachable database count against the entry
+            self.refusals = self.refusals + 1 if reachable else 0
+            if self.refusals >= MAX_ENTRY_ATTEMPTS and self._reject(batch[0], message):
+                continue
+            print(f"Intake batch failed, retrying: {message}", file=sys.stderr)
+            self.stopped.wait(min(RETRY_DELAY * 2 ** (self.failures - 1), MAX_RETRY_DELAY))
+
+    def _committed(self, count, last_seq):
+        with self.lock:
+            del self.pending[:count]
+            self.committed_seq = last_seq
+            self.failures = 0
+            self.refusals = 0
+            compact = not self.pending and self.file.tell() >= COMPACT_BYTES
+            self.changed.notify_all()
+        if compact:
+            self._compact(last_seq)
+
+    def _reject(self, entry, message):
+        # The entry is written to the rejected file before the checkpoint moves past it, so a
+        # crash in between can only reject it twice, never lose it
+        seq, donation = entry
+        with open(self.rejected_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps({"seq": seq, "donation": donation, "error": message}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        if not self.db.save_intake_checkpoint(self.queue_id, seq):
+            return False
+        print(f"Intake entry {seq} rejected, moved to {self.rejected_path}: {message}", file=sys.stderr)
+        self.rejected += 1
+        self._committed(1, seq)
+        return True
+
+    def _compact(self, seq):
+        # Everything up to seq is committed and nothing is pending. A commit isn't always on disk
+        # yet (SQLite under synchronous=NORMAL), so the journal is only cut once the database has
+        # made it durable. If that can't be done now, or more entries came in meanwhile, a later
+        # commit tries again.
+        if not self.db.sync_commits():
+            return
+        with self.lock:
+            if self.pending or self.committed_seq != seq or self.file.closed:
+                return
+            header = json.dumps({"queue": self.queue_id}) + "\n"
+            self.file.truncate(len(header.encode("utf-8")))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def backlog(self):
+        """Entries acknowledged but not committed yet"""
+        with self.lock:
+            return len(self.pending)
+
+    def flush(self, timeout=None):
+        """Wait until every submitted entry is committed, returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            while self.pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.changed.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Flush, stop the writer and close the journal. Returns False if entries are still
+        uncommitted after timeout, they stay in the journal and are replayed on the next start."""
+        self.flush(timeout)
+        with self.lock:
+            self.closing = True
+            self.changed.notify_all()
+        # The writer finishes the batch in hand, if any, and stops instead of retrying
+        self.stopped.set()
+        self.writer.join()
+        self.file.close()
+        left = self.backlog()
+        if left:
+            print(f"{left} queued donations left in {self.path}, they are saved on the next start", file=sys.stderr)
+        return not left
@@ -0,0 +1,392 @@
+# Query timing for the data layer: latency histograms per DatabaseConnection method and per SQL
+# statement, row and error counters, a slow-query log and Prometheus / JSON export.
+#
+# Connections handed out by DatabaseConnection are wrapped so every execute, executemany and
+# commit is timed, and the public methods are decorated with @timed. An observation costs two
+# perf_counter calls and one short lock, cheap enough to leave on in production. Slow statements
+# are written to the log and EXPLAINed on a background thread with its own connection, never
+# on the caller's.
+import bisect
+import collections
+import datetime
+import functools
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from contextlib import closing
+
+from .config import EXPLAIN_SLOW_QUERIES, SLOW_QUERY_LOG, SLOW_QUERY_MS
+
+# Histogram bucket upper bounds in seconds, the last bucket takes everything above
+BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+# Slow statements kept in memory for the JSON snapshot
+SLOW_QUERIES_KEPT = 100
+# Longest parameter value written to the slow-query log
+PARAM_CHARS = 200
+# Statements EXPLAIN is run for, the rest have no useful plan
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+_WHITESPACE = re.compile(r"\s+")
+# A run of placeholders such as the IN (%s, %s, %s) lists built for each batch
+_PLACEHOLDERS = re.compile(r"%s(?:\s*,\s*%s)+")
+
+class _State(threading.local):
+    # Per thread: the method running and running totals its statements add to
+    method = None
+    rows = 0
+    errors = 0
+
+_local = _State()
+
+def statement_key(sql):
+    """SQL on one line with placeholder lists collapsed, so every call of a query shares a key"""
+    return _PLACEHOLDERS.sub("%s, ...", _WHITESPACE.sub(" ", sql).strip())
+
+class Histogram:
+    # Fixed buckets: recording is a bisect and two additions, quantiles are bucket upper bounds
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+class Series:
+    # Latency, row and error totals of one method or statement
+    def __init__(self):
+        self.latency = Histogram()
+        self.rows = 0
+        self.errors = 0
+
+    def snapshot(self):
+        latency = self.latency
+        return {
+            "count": latency.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "seconds": round(latency.sum, 6),
+            "max_ms": round(latency.max * 1000, 3),
+            "p50_ms": latency.quantile(0.5) * 1000,
+            "p95_ms": latency.quantile(0.95) * 1000,
+            "p99_ms": latency.quantile(0.99) * 1000,
+        }
+
+class Metrics:
+    # Registry shared by every connection of one DatabaseConnection
+    def __init__(self, backend, slow_query_ms=SLOW_QUERY_MS, slow_query_log=SLOW_QUERY_LOG,
+                 explain=EXPLAIN_SLOW_QUERIES):
+        self.backend = backend
+        self.slow_seconds = slow_query_ms / 1000
+        self.slow_log = slow_query_log
+        self.explain = explain
+        self.lock = threading.Lock()
+        self.methods = collections.defaultdict(Series)
+        self.statements = collections.defaultdict(Series)
+        self.slow_queries = collections.deque(maxlen=SLOW_QUERIES_KEPT)
+        self.slow_count = 0
+        self.started = time.time()
+        self._keys = {}
+        self._slow_queue = None
+        self._slow_thread = None
+        self._exporter = None
+        self._stop = threading.Event()
+
+    def key(self, sql):
+        key = self._keys.get(sql)
+        if key is None:
+            if len(self._keys) > 1000:
+                self._keys.clear()
+            key = self._keys[sql] = statement_key(sql)
+        return key
+
+    def record_method(self, name, elapsed, rows, failed):
+        with self.lock:
+            series = self.methods[name]
+            series.latency.observe(elapsed)
+            series.rows += rows
+            if failed:
+                series.errors += 1
+
+    def record(self, sql, key, params, elapsed, rows=0, error=None, many=False):
+        with self.lock:
+            series = self.statements[key]
+            series.latency.observe(elapsed)
+            series.rows += rows
+            if error is not None:
+                series.errors += 1
+        _local.rows += rows
+        if error is not None:
+            _local.errors += 1
+        if elapsed >= self.slow_seconds:
+            self._slow(sql, key, params, elapsed, error, many)
+
+    def add_rows(self, key, rows):
+        with self.lock:
+            self.statements[key].rows += rows
+        _local.rows += rows
+
+    def _slow(self, sql, key, params, elapsed, error, many):
+        entry = {
+            "time": datetime.datetime.now().isoformat(timespec="milliseconds"),
+            "method": _local.method,
+            "ms": round(elapsed * 1000, 3),
+            "statement": key,
+            "params": _loggable(params, many),
+        }
+        if error is not None:
+            entry["error"] = str(error)
+        with self.lock:
+            self.slow_count += 1
+            self.slow_queries.append(entry)
+            if self._slow_queue is None and (self.slow_log or self.explain):
+                self._slow_queue = queue.Queue()
+                self._slow_thread = threading.Thread(target=self._run_slow_log, name="slow-query-log", daemon=True)
+                self._slow_thread.start()
+        if self._slow_queue is not None:
+            explain = self.explain and not many and error is None and key.upper().startswith(EXPLAINABLE)
+            self._slow_queue.put((entry, sql if explain else None, params))
+
+    def _run_slow_log(self):
+        # EXPLAIN and file writes happen here, the statement's own connection is busy or gone
+        connection = None
+        while True:
+            entry, sql, params = self._slow_queue.get()
+            if entry is None:
+                break
+            if sql is not None:
+                try:
+                    if connection is None:
+                        connection = self.backend.connect()
+                    entry["plan"] = self._explain(connection, sql, params)
+                except Exception as e:
+                    # Whatever goes wrong, the log keeps running
+                    entry["plan_error"] = str(e)
+            if self.slow_log:
+                try:
+                    with open(self.slow_log, "a", encoding="utf-8") as file:
+                        file.write(json.dumps(entry, default=str) + "\n")
+                except OSError as e:
+                    print(f"Error writing slow query log: {e}", file=sys.stderr)
+        if connection is not None:
+            connection.close()
+
+    def _explain(self, connection, sql, params):
+        with closing(connection.cursor()) as cursor:
+            plan = self.backend.explain(cursor, sql, params)
+        connection.rollback()
+        return plan
+
+    def wrap(self, connection):
+        return InstrumentedConnection(connection, self)
+
+    def snapshot(self):
+        """Everything recorded so far as plain data, the JSON export"""
+        with self.lock:
+            return {
+                "backend": self.backend.name,
+                "since": datetime.datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "methods": {name: series.snapshot() for name, series in sorted(self.methods.items())},
+                "statements": {key: series.snapshot() for key, series in sorted(self.statements.items())},
+                "slow_queries": self.slow_count,
+                "slowest": [dict(entry) for entry in self.slow_queries],
+            }
+
+    def prometheus(self):
+        """Everything recorded so far in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for kind, label, registry in (("method", "method", self.methods), ("statement", "statement", self.statements)):
+                name = f"classroom_db_{kind}"
+                lines.append(f"# HELP {name}_seconds Latency of each DatabaseConnection {kind}")
+                lines.append(f"# TYPE {name}_seconds histogram")
+                for key, series in sorted(registry.items()):
+                    labels = f'{label}="{_escape(key)}"'
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + ["+Inf"], series.latency.counts):
+                        cumulative += count
+                        lines.append(f'{name}_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f"{name}_seconds_sum{{{labels}}} {series.latency.sum:.6f}")
+                    lines.append(f"{name}_seconds_count{{{labels}}} {series.latency.count}")
+                for counter, attribute in (("rows", "rows"), ("errors", "errors")):
+                    lines.append(f"# TYPE {name}_{counter}_total counter")
+                    for key, series in sorted(registry.items()):
+                        lines.append(f'{name}_{counter}_total{{{label}="{_escape(key)}"}} {getattr(series, attribute)}')
+            lines.append("# TYPE classroom_db_slow_queries_total counter")
+            lines.append(f"classroom_db_slow_queries_total {self.slow_count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write a JSON snapshot (path ending in .json) or Prometheus text file, replacing it atomically"""
+        text = json.dumps(self.snapshot(), indent=2, default=str) if path.endswith(".json") else self.prometheus()
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(temporary, path)
+
+    def start_export(self, path, interval):
+        """Rewrite path every interval seconds until close(), for a node_exporter textfile collector"""
+        def run():
+            while not self._stop.wait(interval):
+                self._write_quietly(path)
+        self._exporter = (path, threading.Thread(target=run, name="metrics-export", daemon=True))
+        self._exporter[1].start()
+
+    def _write_quietly(self, path):
+        try:
+            self.write(path)
+        except OSError as e:
+            print(f"Error writing metrics to {path}: {e}", file=sys.stderr)
+
+    def close(self):
+        self._stop.set()
+        if self._exporter:
+            path, thread = self._exporter
+            thread.join()
+            self._write_quietly(path)
+            self._exporter = None
+        if self._slow_queue is not None:
+            # Let the entries already queued reach the log file
+            self._slow_queue.put((None, None, None))
+            self._slow_thread.join(timeout=5)
+
+class InstrumentedConnection:
+    # Proxy for a pooled connection: cursors are instrumented, commits timed, the rest passed through
+    def __init__(self, connection, metrics):
+        self.connection = connection
+        self.metrics = metrics
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self.connection.cursor(*args, **kwargs), self.metrics)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            self.connection.commit()
+        except Exception as e:
+            self.metrics.record("COMMIT", "COMMIT", None, time.perf_counter() - start, error=e)
+            raise
+        self.metrics.record("COMMIT", "COMMIT", None, time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+class InstrumentedCursor:
+    # Times execute and executemany, and counts the rows fetched or changed by each statement
+    def __init__(self, cursor, metrics):
+        self.cursor = cursor
+        self.metrics = metrics
+        self.key = None
+
+    def execute(self, sql, params=None):
+        return self._run(self.cursor.execute, sql, params, False)
+
+    def executemany(self, sql, seq_of_params):
+        return self._run(self.cursor.executemany, sql, seq_of_params, True)
+
+    def _run(self, call, sql, params, many):
+        metrics = self.metrics
+        key = self.key = metrics.key(sql)
+        start = time.perf_counter()
+        try:
+            result = call(sql) if params is None else call(sql, params)
+        except Exception as e:
+            metrics.record(sql, key, params, time.perf_counter() - start, error=e, many=many)
+            raise
+        elapsed = time.perf_counter() - start
+        # Queries count the rows fetched, everything else the rows it changed
+        rows = 0 if key.startswith(("SELECT", "WITH")) else max(self.cursor.rowcount, 0)
+        metrics.record(sql, key, params, elapsed, rows, many=many)
+        return result
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        if row is not None:
+            self.metrics.add_rows(self.key, 1)
+        return row
+
+    def fetchmany(self, *args):
+        rows = self.cursor.fetchmany(*args)
+        if rows:
+            self.metrics.add_rows(self.key, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        if rows:
+            self.metrics.add_rows(self.key, len(rows))
+        return rows
+
+    def __iter__(self):
+        for row in self.cursor:
+            self.metrics.add_rows(self.key, 1)
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+def timed(method):
+    """Record the latency, rows and errors of a DatabaseConnection method"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = self.metrics
+        if metrics is None:
+            return method(self, *args, **kwargs)
+        state = _local
+        outer, rows, errors = state.method, state.rows, state.errors
+        state.method = name
+        failed = True
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            state.method = outer
+            # Most methods print and swallow database errors, the statement wrapper still saw them
+            metrics.record_method(name, elapsed, state.rows - rows, failed or state.errors > errors)
+    return wrapper
+
+def _loggable(params, many):
+    if params is None:
+        return None
+    if many:
+        # Only lists are looked into, a generator has been used up by the statement
+        if not isinstance(params, (list, tuple)):
+            return {"rows": None, "first": None}
+        return {"rows": len(params), "first": _loggable(params[0], False) if params else None}
+    if isinstance(params, dict):
+        return {name: _short(value) for name, value in params.items()}
+    return [_short(value) for value in params]
+
+def _short(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = str(value)
+    return text if len(text) <= PARAM_CHARS else text[:PARAM_CHARS] + "..."
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,19 @@
+# Reporting periods shared by the admin report page and the command line
+import datetime
+
+PERIODS = ["This Month", "This Quarter", "This Year", "Last 12 Months", "All Time"]
+
+def period_range(name, today=None):
+    """(start, end) dates for one of PERIODS, both None for "All Time" """
+    today = today or datetime.date.today()
+    if name == "This Month":
+        return today.replace(day=1), today
+    if name == "This Quarter":
+        return today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1), today
+    if name == "This Year":
+        return today.replace(month=1, day=1), today
+    if name == "Last 12 Months":
+        if today.month == 12:
+            return today.replace(month=1, day=1), today
+        return today.replace(year=today.year - 1, month=today.month + 1, day=1), today
+    return None, None
@@ -0,0 +1,162 @@
+# Donation and classroom request input rules shared by the GUI form, the CLI and bulk imports.
+#
+# validate_donations checks a whole batch one field at a time: each rule is a single pass over
+# that field's values for every record, with the patterns compiled once here, so a batch of
+# thousands costs a handful of list comprehensions instead of a chain of calls per record.
+import re
+
+# Donation fields in form order with the names used in messages
+DONATION_FIELDS = [
+    ("donor_name", "Donor Name"),
+    ("contact_info", "Contact Info"),
+    ("barangay", "Barangay"),
+    ("city", "City"),
+    ("province", "Province"),
+    ("supply_name", "Supply Name"),
+    ("quantity", "Quantity"),
+]
+# Classroom request fields, priority is optional and defaults to 0
+REQUEST_FIELDS = [
+    ("classroom", "Classroom"),
+    ("supply_name", "Supply Name"),
+    ("quantity", "Quantity"),
+    ("priority", "Priority"),
+]
+# An email address or a Philippine mobile number, matched against the whole value
+CONTACT = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}|(?:09|\+63)[0-9]{9}'
+CONTACT_PATTERN = re.compile(CONTACT)
+# A run of newline-terminated contacts, for checking a whole column in one match
+CONTACT_LIST_PATTERN = re.compile(rf'(?:(?:{CONTACT})\n)*')
+QUANTITY_PATTERN = re.compile(r'[+-]?[0-9]+')
+MAX_QUANTITY = 2147483647
+# What the supply menu shows before an item is picked
+SUPPLY_PLACEHOLDER = "Select an item"
+
+CONTACT_ERROR = "Contact info must be a valid email address or Philippine phone number (09XXXXXXXXX or +63XXXXXXXXX)"
+
+def _column(records, field):
+    # Every record's value for field as trimmed text, missing values as ""
+    values = [record.get(field) for record in records]
+    try:
+        return list(map(str.strip, values))
+    except TypeError:
+        # Not all text, e.g. numbers from a JSON file or a field some records leave out
+        return ["" if value is None else str(value).strip() for value in values]
+
+def _empty(values, *blanks):
+    # Indexes of the values that are "" or one of blanks, the membership tests skip clean columns
+    blanks = ("",) + blanks
+    if not any(blank in values for blank in blanks):
+        return []
+    return [i for i, value in enumerate(values) if value in blanks]
+
+def _bad_contacts(values):
+    # Indexes of the values that aren't a contact. The column is joined and matched as one string,
+    # a single pass in the regex engine, which stops at each bad value for us to step over.
+    text = "\n".join(values) + "\n"
+    if text.count("\n") != len(values):
+        # A value with a line break of its own, or no values
+        return [i for i, value in enumerate(values) if not CONTACT_PATTERN.fullmatch(value)]
+    bad = []
+    pos = index = 0
+    while True:
+        end = CONTACT_LIST_PATTERN.match(text, pos).end()
+        index += text.count("\n", pos, end)
+        if end == len(text):
+            return bad
+        bad.append(index)
+        pos = text.index("\n", end) + 1
+        index += 1
+
+def _quantities(values):
+    # Whole numbers, None where a value isn't one
+    joined = "".join(values)
+    if joined.isdigit() and joined.isascii() and "" not in values:
+        return list(map(int, values))
+    return [int(value) if QUANTITY_PATTERN.fullmatch(value) else None for value in values]
+
+def _bad_quantities(values, quantities, missing):
+    # (index, field, message) for every quantity that isn't a whole number from 1 to MAX_QUANTITY
+    if None not in quantities and (not quantities or 0 < min(quantities) and max(quantities) <= MAX_QUANTITY):
+        return []
+    errors = []
+    for i, quantity in enumerate(quantities):
+        if quantity is None:
+            errors.append((i, "quantity", "Quantity must be a valid number" if values[i] else missing))
+        elif quantity <= 0:
+            errors.append((i, "quantity", "Quantity must be greater than 0"))
+        elif quantity > MAX_QUANTITY:
+            errors.append((i, "quantity", "Quantity cannot exceed 2,147,483,647"))
+    return errors
+
+def validate_donations(records):
+    """Check a batch of donations (dicts keyed by the DONATION_FIELDS names).
+
+    Returns (donations, errors). donations holds (index, donation) for every record that passed,
+    the donation being the trimmed (donor_name, contact_info, barangay, city, province,
+    supply_name, quantity) tuple add_donations_batch takes. errors holds (index, field, message)
+    for every field that failed, in record and then form order, so a record can appear more than once.
+    """
+    records = records if isinstance(records, list) else list(records)
+    columns = {field: _column(records, field) for field, _ in DONATION_FIELDS}
+    quantities = _quantities(columns["quantity"])
+    errors = []
+    for field, name in DONATION_FIELDS:
+        values = columns[field]
+        missing = f"Please fill in the {name} field"
+        if field == "barangay":
+            continue  # Optional
+        elif field == "contact_info":
+            errors.extend((i, field, CONTACT_ERROR) for i in _bad_contacts(values))
+        elif field == "supply_name":
+            errors.extend((i, field, missing) for i in _empty(values, SUPPLY_PLACEHOLDER))
+        elif field == "quantity":
+            errors.extend(_bad_quantities(values, quantities, missing))
+        else:
+            errors.extend((i, field, missing) for i in _empty(values))
+
+    donations = enumerate(zip(columns["donor_name"], columns["contact_info"], columns["barangay"], columns["city"],
+                              columns["province"], columns["supply_name"], quantities))
+    if not errors:
+        return list(donations), errors
+    # Stable, so each record's errors stay in form order
+    errors.sort(key=lambda error: error[0])
+    failed = {error[0] for error in errors}
+    return [(i, donation) for i, donation in donations if i not in failed], errors
+
+def validate_donation(record):
+    """Check one donation, returns the first error or None"""
+    _, errors = validate_donations([record])
+    return errors[0][2] if errors else None
+
+def validate_requests(records):
+    """Check a batch of classroom requests (dicts keyed by the REQUEST_FIELDS names).
+
+    Returns (requests, errors) like validate_donations, each request being the trimmed
+    (classroom, supply_name, quantity, priority) tuple add_classroom_requests takes.
+    """
+    records = records if isinstance(records, list) else list(records)
+    columns = {field: _column(records, field) for field, _ in REQUEST_FIELDS}
+    quantities = _quantities(columns["quantity"])
+    # A blank priority is the default one
+    priorities = _quantities([value or "0" for value in columns["priority"]])
+    errors = []
+    for field, name in REQUEST_FIELDS:
+        values = columns[field]
+        missing = f"Please fill in the {name} field"
+        if field == "supply_name":
+            errors.extend((i, field, missing) for i in _empty(values, SUPPLY_PLACEHOLDER))
+        elif field == "quantity":
+            errors.extend(_bad_quantities(values, quantities, missing))
+        elif field == "priority":
+            errors.extend((i, field, "Priority must be a whole number") for i, priority in enumerate(priorities)
+                          if priority is None or abs(priority) > MAX_QUANTITY)
+        else:
+            errors.extend((i, field, missing) for i in _empty(values))
+
+    requests = enumerate(zip(columns["classroom"], columns["supply_name"], quantities, priorities))
+    if not errors:
+        return list(requests), errors
+    errors.sort(key=lambda error: error[0])
+    failed = {error[0] for error in errors}
+    return [(i, request) for i, request in requests if i not in failed], errors
@@ -23,6 +23,24 @@ SET time_zone = "+00:00";
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `classroom_requests`
+--
+
+CREATE TABLE `classroom_requests` (
+  `id` int(11) NOT NULL,
+  `classroom` varchar(255) NOT NULL,
+  `supply_id` int(11) NOT NULL,
+  `quantity` int(11) NOT NULL,
+  `allocated` int(11) NOT NULL DEFAULT 0,
+  `priority` int(11) NOT NULL DEFAULT 0,
+  `status` varchar(16) NOT NULL DEFAULT 'open',
+  `request_date` timestamp NOT NULL DEFAULT current_timestamp(),
+  `row_version` bigint(20) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `donations`
 --
@@ -32,9 +50,135 @@ CREATE TABLE `donations` (
   `donor_name` varchar(255) NOT NULL,
   `contact_info` varchar(255) NOT NULL,
   `address` text NOT NULL,
+  `barangay` varchar(255) NOT NULL DEFAULT '',
+  `city` varchar(255) NOT NULL DEFAULT '',
+  `province` varchar(255) NOT NULL DEFAULT '',
   `supply_id` int(11) NOT NULL,
   `quantity` int(11) NOT NULL,
-  `donation_date` timestamp NOT NULL DEFAULT current_timestamp()
+  `donation_date` timestamp NOT NULL DEFAULT current_timestamp(),
+  `row_version` bigint(20) NOT NULL DEFAULT 0,
+  `location_id` int(11) NOT NULL DEFAULT 1
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `donor_monthly_totals`
+--
+
+CREATE TABLE `donor_monthly_totals` (
+  `month` date NOT NULL,
+  `donor_name` varchar(255) NOT NULL,
+  `contact_info` varchar(255) NOT NULL,
+  `quantity` bigint(20) NOT NULL DEFAULT 0,
+  `donation_count` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `intake_checkpoints`
+--
+
+CREATE TABLE `intake_checkpoints` (
+  `queue_id` varchar(64) NOT NULL,
+  `last_seq` bigint(20) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `location_monthly_totals`
+--
+
+CREATE TABLE `location_monthly_totals` (
+  `month` date NOT NULL,
+  `province` varchar(255) NOT NULL,
+  `city` varchar(255) NOT NULL,
+  `quantity` bigint(20) NOT NULL DEFAULT 0,
+  `donation_count` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `location_stock`
+--
+
+CREATE TABLE `location_stock` (
+  `location_id` int(11) NOT NULL,
+  `supply_id` int(11) NOT NULL,
+  `quantity` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `locations`
+--
+
+CREATE TABLE `locations` (
+  `id` int(11) NOT NULL,
+  `location_name` varchar(255) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+--
+-- Dumping data for table `locations`
+--
+
+INSERT INTO `locations` (`id`, `location_name`) VALUES
+(1, 'Main Stockroom');
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `request_allocations`
+--
+
+CREATE TABLE `request_allocations` (
+  `row_version` bigint(20) NOT NULL,
+  `request_id` int(11) NOT NULL,
+  `quantity` int(11) NOT NULL,
+  `allocation_date` timestamp NOT NULL DEFAULT current_timestamp()
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `schema_migrations`
+--
+
+CREATE TABLE `schema_migrations` (
+  `version` int(11) NOT NULL,
+  `name` varchar(255) NOT NULL,
+  `applied_at` timestamp NOT NULL DEFAULT current_timestamp()
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `stock_checkpoints`
+--
+
+CREATE TABLE `stock_checkpoints` (
+  `movement_id` bigint(20) NOT NULL,
+  `supply_id` int(11) NOT NULL,
+  `balance` bigint(20) NOT NULL,
+  `moved_until` timestamp NULL DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `stock_movements`
+--
+
+CREATE TABLE `stock_movements` (
+  `id` bigint(20) NOT NULL,
+  `supply_id` int(11) NOT NULL,
+  `quantity` int(11) NOT NULL,
+  `kind` varchar(16) NOT NULL,
+  `moved_at` timestamp NOT NULL DEFAULT current_timestamp()
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 -- --------------------------------------------------------
@@ -46,7 +190,8 @@ CREATE TABLE `donations` (
 CREATE TABLE `supplies` (
   `id` int(11) NOT NULL,
   `supply_name` varchar(255) NOT NULL,
-  `quantity` int(11) NOT NULL
+  `quantity` int(11) NOT NULL,
+  `row_version` bigint(20) NOT NULL DEFAULT 0
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 --
@@ -70,6 +215,57 @@ INSERT INTO `supplies` (`id`, `supply_name`, `quantity`) VALUES
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `supply_daily_totals`
+--
+
+CREATE TABLE `supply_daily_totals` (
+  `day` date NOT NULL,
+  `supply_id` int(11) NOT NULL,
+  `donated` bigint(20) NOT NULL DEFAULT 0,
+  `donation_count` int(11) NOT NULL DEFAULT 0,
+  `withdrawn` bigint(20) NOT NULL DEFAULT 0,
+  `withdrawal_count` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `table_versions`
+--
+
+CREATE TABLE `table_versions` (
+  `table_name` varchar(64) NOT NULL,
+  `version` bigint(20) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+--
+-- Dumping data for table `table_versions`
+--
+
+INSERT INTO `table_versions` (`table_name`, `version`) VALUES
+('supplies', 0),
+('summaries', 0),
+('ledger', 0);
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `transfers`
+--
+
+CREATE TABLE `transfers` (
+  `id` int(11) NOT NULL,
+  `supply_id` int(11) NOT NULL,
+  `from_location_id` int(11) NOT NULL,
+  `to_location_id` int(11) NOT NULL,
+  `quantity` int(11) NOT NULL,
+  `transfer_date` timestamp NOT NULL DEFAULT current_timestamp(),
+  `row_version` bigint(20) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `withdrawals`
 --
@@ -78,19 +274,93 @@ CREATE TABLE `withdrawals` (
   `id` int(11) NOT NULL,
   `supply_id` int(11) NOT NULL,
   `quantity` int(11) NOT NULL,
-  `withdrawal_date` timestamp NOT NULL DEFAULT current_timestamp()
+  `withdrawal_date` timestamp NOT NULL DEFAULT current_timestamp(),
+  `row_version` bigint(20) NOT NULL DEFAULT 0,
+  `location_id` int(11) NOT NULL DEFAULT 1
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 --
 -- Indexes for dumped tables
 --
 
+--
+-- Indexes for table `classroom_requests`
+--
+ALTER TABLE `classroom_requests`
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `status` (`status`,`supply_id`),
+  ADD KEY `row_version` (`row_version`),
+  ADD KEY `supply_id` (`supply_id`);
+
 --
 -- Indexes for table `donations`
 --
 ALTER TABLE `donations`
   ADD PRIMARY KEY (`id`),
-  ADD KEY `supply_id` (`supply_id`);
+  ADD KEY `supply_id` (`supply_id`,`quantity`),
+  ADD KEY `row_version` (`row_version`),
+  ADD KEY `donor_name` (`donor_name`,`id`),
+  ADD KEY `contact_info` (`contact_info`,`id`),
+  ADD KEY `city` (`city`,`id`),
+  ADD KEY `province` (`province`,`city`,`id`),
+  ADD KEY `donation_date` (`donation_date`,`id`);
+
+--
+-- Indexes for table `donor_monthly_totals`
+--
+ALTER TABLE `donor_monthly_totals`
+  ADD PRIMARY KEY (`month`,`donor_name`,`contact_info`);
+
+--
+-- Indexes for table `intake_checkpoints`
+--
+ALTER TABLE `intake_checkpoints`
+  ADD PRIMARY KEY (`queue_id`);
+
+--
+-- Indexes for table `location_monthly_totals`
+--
+ALTER TABLE `location_monthly_totals`
+  ADD PRIMARY KEY (`month`,`province`,`city`);
+
+--
+-- Indexes for table `location_stock`
+--
+ALTER TABLE `location_stock`
+  ADD PRIMARY KEY (`location_id`,`supply_id`);
+
+--
+-- Indexes for table `locations`
+--
+ALTER TABLE `locations`
+  ADD PRIMARY KEY (`id`),
+  ADD UNIQUE KEY `location_name` (`location_name`);
+
+--
+-- Indexes for table `request_allocations`
+--
+ALTER TABLE `request_allocations`
+  ADD PRIMARY KEY (`row_version`,`request_id`);
+
+--
+-- Indexes for table `schema_migrations`
+--
+ALTER TABLE `schema_migrations`
+  ADD PRIMARY KEY (`version`);
+
+--
+-- Indexes for table `stock_checkpoints`
+--
+ALTER TABLE `stock_checkpoints`
+  ADD PRIMARY KEY (`movement_id`,`supply_id`),
+  ADD KEY `moved_until` (`moved_until`,`movement_id`);
+
+--
+-- Indexes for table `stock_movements`
+--
+ALTER TABLE `stock_movements`
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `moved_at` (`moved_at`,`id`);
 
 --
 -- Indexes for table `supplies`
@@ -99,29 +369,77 @@ ALTER TABLE `supplies`
   ADD PRIMARY KEY (`id`),
   ADD UNIQUE KEY `supply_name` (`supply_name`);
 
+--
+-- Indexes for table `supply_daily_totals`
+--
+ALTER TABLE `supply_daily_totals`
+  ADD PRIMARY KEY (`day`,`supply_id`);
+
+--
+-- Indexes for table `table_versions`
+--
+ALTER TABLE `table_versions`
+  ADD PRIMARY KEY (`table_name`);
+
+--
+-- Indexes for table `transfers`
+--
+ALTER TABLE `transfers`
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `supply_id` (`supply_id`),
+  ADD KEY `from_location_id` (`from_location_id`),
+  ADD KEY `to_location_id` (`to_location_id`),
+  ADD KEY `transfer_date` (`transfer_date`,`id`);
+
 --
 -- Indexes for table `withdrawals`
 --
 ALTER TABLE `withdrawals`
   ADD PRIMARY KEY (`id`),
-  ADD KEY `supply_id` (`supply_id`);
+  ADD KEY `supply_id` (`supply_id`,`quantity`),
+  ADD KEY `row_version` (`row_version`),
+  ADD KEY `withdrawal_date` (`withdrawal_date`,`id`,`supply_id`,`quantity`);
 
 --
 -- AUTO_INCREMENT for dumped tables
 --
 
+--
+-- AUTO_INCREMENT for table `classroom_requests`
+--
+ALTER TABLE `classroom_requests`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
+
 --
 -- AUTO_INCREMENT for table `donations`
 --
 ALTER TABLE `donations`
   MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
 
+--
+-- AUTO_INCREMENT for table `locations`
+--
+ALTER TABLE `locations`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT, AUTO_INCREMENT=2;
+
+--
+-- AUTO_INCREMENT for table `stock_movements`
+--
+ALTER TABLE `stock_movements`
+  MODIFY `id` bigint(20) NOT NULL AUTO_INCREMENT;
+
 --
 -- AUTO_INCREMENT for table `supplies`
 --
 ALTER TABLE `supplies`
   MODIFY `id` int(11) NOT NULL AUTO_INCREMENT, AUTO_INCREMENT=14;
 
+--
+-- AUTO_INCREMENT for table `transfers`
+--
+ALTER TABLE `transfers`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
+
 --
 -- AUTO_INCREMENT for table `withdrawals`
 --
@@ -132,12 +450,26 @@ ALTER TABLE `withdrawals`
 -- Constraints for dumped tables
 --
 
+--
+-- Constraints for table `classroom_requests`
+--
+ALTER TABLE `classroom_requests`
+  ADD CONSTRAINT `classroom_requests_ibfk_1` FOREIGN KEY (`supply_id`) REFERENCES `supplies` (`id`);
+
 --
 -- Constraints for table `donations`
 --
 ALTER TABLE `donations`
   ADD CONSTRAINT `donations_ibfk_1` FOREIGN KEY (`supply_id`) REFERENCES `supplies` (`id`);
 
+--
+-- Constraints for table `transfers`
+--
+ALTER TABLE `transfers`
+  ADD CONSTRAINT `transfers_ibfk_1` FOREIGN KEY (`supply_id`) REFERENCES `supplies` (`id`),
+  ADD CONSTRAINT `transfers_ibfk_2` FOREIGN KEY (`from_location_id`) REFERENCES `locations` (`id`),
+  ADD CONSTRAINT `transfers_ibfk_3` FOREIGN KEY (`to_location_id`) REFERENCES `locations` (`id`);
+
 --
 -- Constraints for table `withdrawals`
 --
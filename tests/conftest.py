@@ -0,0 +1,23 @@
+# Shared fixtures. The tests run against the embedded SQLite backend, no server needed:
+#     python -m pytest -q
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classroom_connect.database import DatabaseConnection
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "classroom.sqlite3")
+
+
+@pytest.fixture
+def db(db_path):
+    # A fresh database with the current schema, every migration applied
+    db = DatabaseConnection(db_config={"path": db_path}, backend="sqlite", metrics=False, migrate=True)
+    yield db
+    db.close()
@@ -0,0 +1,49 @@
+# Each allocation method shares scarce stock its own way, never handing out more than is on hand
+# or more than a request asked for
+import numpy as np
+import pytest
+
+from classroom_connect.allocation import MAX_MIN, METHODS, PRIORITY, PROPORTIONAL, allocate
+
+
+def test_priority():
+    # Highest priority first, then the oldest request
+    grants = allocate([1, 1, 1, 1], [5, 4, 3, 2], [0, 1, 1, 0], {1: 9}, PRIORITY)
+    assert grants.tolist() == [2, 4, 3, 0]
+
+
+def test_proportional():
+    # 10 units for 12 asked: shares of 5, 2.5 and 2.5 rounded down, the unit left over to the
+    # higher priority of the two tied remainders
+    grants = allocate([1, 1, 1], [6, 3, 3], [0, 0, 1], {1: 10}, PROPORTIONAL)
+    assert grants.tolist() == [5, 2, 3]
+    # Enough for everyone
+    assert allocate([1, 1], [6, 3], [0, 0], {1: 20}, PROPORTIONAL).tolist() == [6, 3]
+
+
+def test_max_min():
+    # The 3 is filled, the 7 left split evenly with the odd unit to the older request
+    grants = allocate([1, 1, 1], [8, 3, 4], [0, 1, 0], {1: 10}, MAX_MIN)
+    assert grants.tolist() == [4, 3, 3]
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_invariants(method):
+    rng = np.random.default_rng(7)
+    supply_ids = rng.integers(1, 6, 500)
+    wanted = rng.integers(1, 50, 500)
+    priorities = rng.integers(0, 3, 500)
+    stock = {1: 0, 2: 100, 3: 5000, 4: -5}
+    grants = allocate(supply_ids, wanted, priorities, stock, method)
+    assert ((grants >= 0) & (grants <= wanted)).all()
+    for supply_id in range(1, 6):
+        mine = supply_ids == supply_id
+        available = max(stock.get(supply_id, 0), 0)
+        # Every unit is handed out while there is demand for it
+        assert grants[mine].sum() == min(available, wanted[mine].sum())
+
+
+def test_edge_cases():
+    assert allocate([], [], [], {}).tolist() == []
+    with pytest.raises(ValueError):
+        allocate([1], [1], [0], {1: 1}, "lottery")
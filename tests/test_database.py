@@ -0,0 +1,78 @@
+# Smoke tests of the data layer on SQLite: migrations, donations and withdrawals against the
+# stock ledger, keyset paging and classroom request allocation.
+from classroom_connect.database import MIGRATIONS
+
+
+def donate(db, donor, supply, quantity):
+    assert db.add_donation(donor, "09171234567", "Lahug", "Cebu City", "Cebu", supply, quantity)
+
+
+def test_migrate(db):
+    assert [applied_at is not None for _, _, applied_at in db.migration_status()] == [True] * len(MIGRATIONS)
+    assert db.migrate() == (True, "Database schema is up to date", [])
+
+
+def test_donate_withdraw_reconcile(db):
+    donate(db, "Ana Cruz", "Pencil", 10)
+    donate(db, "Ben Reyes", "Pencil", 5)
+    donate(db, "Ana Cruz", "Glue Stick", 4)
+    assert db.withdraw_supply("Pencil", 6) == (True, "Withdrawal successful", 9)
+    assert db.withdraw_supply("Pencil", 10) == (False, "Not enough supply available", None)
+    assert db.withdraw_supply("No Such Supply", 1) == (False, "Supply not found", None)
+    assert db.withdraw_supply("Pencil", 0) == (False, "Quantity must be greater than 0", None)
+    assert db.withdraw_supply("Pencil", -5) == (False, "Quantity must be greater than 0", None)
+
+    assert ("Pencil", 9, 15, 6) in db.get_stock_report()
+    assert ("Glue Stick", 4, 4, 0) in db.get_stock_report()
+    assert ("Pencil", 9) in db.get_location_stock()
+    for full in (False, True):
+        success, message, mismatches = db.reconcile_stock(full=full)
+        assert success, message
+        assert mismatches == []
+
+
+def test_keyset_paging(db):
+    donors = [f"Donor {n:02}" for n in range(25)]
+    for donor in reversed(donors):
+        donate(db, donor, "Crayons", 1)
+    for _ in range(12):
+        assert db.withdraw_supply("Crayons", 1)[0]
+
+    names, after = [], None
+    while True:
+        page = db.get_donations_page(after, limit=10)
+        if not page:
+            break
+        names += [row[1] for row in page]
+        after = (page[-1][1], page[-1][0])
+    assert names == donors
+
+    # Newest first, and a backward page from the second one gives the first back
+    first = db.get_withdrawals_page(limit=5)
+    second = db.get_withdrawals_page((first[-1][3], first[-1][0]), limit=5)
+    assert [row[0] for row in first + second] == sorted((row[0] for row in first + second), reverse=True)
+    assert db.get_withdrawals_page((second[0][3], second[0][0]), limit=5, backward=True) == first
+
+
+def test_allocate_requests(db):
+    donate(db, "Ana Cruz", "Notebook", 10)
+    assert db.add_classroom_requests([("Grade 1-A", "Notebook", 8, 0), ("Grade 2-B", "Notebook", 3, 1),
+                                      ("Grade 3-C", "Notebook", 4, 0)]) == (True, "Recorded 3 requests")
+    assert db.add_classroom_requests([("Grade 1-A", "Unknown", 1, 0)]) == (False, "Supply not found: Unknown")
+
+    # Max-min fills the 3 unit request and splits the 7 left evenly, the odd unit to the older request
+    success, message, planned = db.allocate_requests(commit=False)
+    assert success, message
+    assert [(classroom, granted) for _, classroom, _, _, granted in planned] == [
+        ("Grade 1-A", 4), ("Grade 2-B", 3), ("Grade 3-C", 3)]
+    assert ("Notebook", 10) in db.get_location_stock()
+
+    success, message, allocations = db.allocate_requests()
+    assert success, message
+    assert allocations == planned
+    assert ("Notebook", 0) in db.get_location_stock()
+    assert [(row[1], row[4], row[6]) for row in db.get_classroom_requests(open_only=False)] == [
+        ("Grade 1-A", 4, "open"), ("Grade 2-B", 3, "filled"), ("Grade 3-C", 3, "open")]
+    assert db.reconcile_stock(full=True)[2] == []
+    # Nothing left to hand out, the open requests are still owed the rest
+    assert [allocation[3:] for allocation in db.allocate_requests()[2]] == [(4, 0), (1, 0)]
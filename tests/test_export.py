@@ -0,0 +1,64 @@
+# Exports write the same records to CSV and JSON Lines, compressed or not, honouring the filters
+import csv
+import datetime
+import gzip
+import json
+
+import pytest
+
+from classroom_connect.export import DONATION_COLUMNS, WITHDRAWAL_COLUMNS, export_donations, export_format, export_withdrawals
+
+
+@pytest.fixture
+def records(db):
+    assert db.add_donation("Ana Cruz", "09171234567", "Lahug", "Cebu City", "Cebu", "Pencil", 10)
+    assert db.add_donation("Ben Reyes", "ben@example.com", "", "Davao City", "Davao del Sur", "Notebook", 4)
+    assert db.withdraw_supply("Pencil", 3)[0]
+    return db
+
+
+def read(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="", encoding="utf-8") as file:
+        if ".jsonl" in path:
+            return [json.loads(line) for line in file]
+        return list(csv.DictReader(file))
+
+
+def test_export_format():
+    assert export_format("donations.csv") == ("csv", False)
+    assert export_format("Donations.JSONL.GZ") == ("jsonl", True)
+    assert export_format("donations.json") == ("jsonl", False)
+    assert export_format("donations.csv.gz") == ("csv", True)
+
+
+@pytest.mark.parametrize("name", ["donations.csv", "donations.csv.gz", "donations.jsonl", "donations.jsonl.gz"])
+def test_export_donations(records, tmp_path, name):
+    path = str(tmp_path / name)
+    assert export_donations(records, path) == 2
+    rows = read(path)
+    assert [list(row) for row in rows] == [DONATION_COLUMNS] * 2
+    assert sorted((row["donor_name"], row["supply_name"], str(row["quantity"])) for row in rows) == [
+        ("Ana Cruz", "Pencil", "10"), ("Ben Reyes", "Notebook", "4")]
+    assert {row["province"] for row in rows} == {"Cebu", "Davao del Sur"}
+
+
+def test_export_filters(records, tmp_path):
+    path = str(tmp_path / "pencils.jsonl")
+    assert export_donations(records, path, {"supply": "Pencil"}) == 1
+    assert read(path)[0]["donor_name"] == "Ana Cruz"
+    assert export_donations(records, path, {"date_from": datetime.date(2000, 1, 1), "date_to": datetime.date(2000, 12, 31)}) == 0
+    assert read(path) == []
+
+    path = str(tmp_path / "withdrawals.csv")
+    assert export_withdrawals(records, path, {"supply": "Notebook"}) == 0
+    assert export_withdrawals(records, path) == 1
+    rows = read(path)
+    assert list(rows[0]) == WITHDRAWAL_COLUMNS
+    assert (rows[0]["supply_name"], rows[0]["quantity"]) == ("Pencil", "3")
+
+
+def test_progress(records, tmp_path):
+    counts = []
+    export_donations(records, str(tmp_path / "donations.csv"), progress=counts.append)
+    assert counts == [2]
@@ -0,0 +1,80 @@
+# Forecasts from daily totals: rates, days of cover, reorder alerts and the seasonal factor
+import datetime
+
+import pytest
+
+from classroom_connect import cli
+from classroom_connect.forecast import OK, OUT_OF_STOCK, REORDER, YEAR_DAYS, build_forecast, forecast_demand
+
+TODAY = datetime.date(2024, 6, 1)
+
+
+def daily(supply_id, days, withdrawn, donated=0, end=TODAY):
+    # One row per day for the days before end
+    return [(end - datetime.timedelta(days=day), supply_id, donated, withdrawn) for day in range(1, days + 1)]
+
+
+def by_name(forecast):
+    return {row[0]: row for row in forecast.rows()}
+
+
+def test_rates_and_alerts():
+    supplies = [(1, "Pencil", 10), (2, "Eraser", 0), (3, "Ruler", 500), (4, "Glue", 3)]
+    movements = daily(1, 60, 2) + daily(2, 60, 1) + daily(3, 60, 2)
+    rows = by_name(build_forecast(supplies, movements, TODAY))
+    assert rows["Pencil"][1:6] == (10, 2.0, 2.0, 2.0, 5.0)
+    assert rows["Pencil"][8] == REORDER and rows["Pencil"][7] > 0
+    assert rows["Eraser"][8] == OUT_OF_STOCK
+    assert rows["Ruler"][8] == OK and rows["Ruler"][7] == 0
+    # Nothing withdrawn, so no days of cover and no alert
+    assert rows["Glue"][2] == 0 and rows["Glue"][5] is None and rows["Glue"][8] == OK
+    # Fewest days of cover first, alerts only the supplies that need restocking
+    forecast = build_forecast(supplies, movements, TODAY)
+    assert [row[0] for row in forecast.rows()] == ["Eraser", "Pencil", "Ruler", "Glue"]
+    assert [row[0] for row in forecast.alerts()] == ["Eraser", "Pencil"]
+
+
+def test_ignored_movements():
+    supplies = [(1, "Pencil", 100)]
+    # Today's partial totals, and a supply no longer listed, don't count
+    movements = daily(1, 28, 1) + [(TODAY, 1, 0, 500), (TODAY - datetime.timedelta(days=1), 9, 0, 500)]
+    assert by_name(build_forecast(supplies, movements, TODAY))["Pencil"][2] == 1.0
+    assert build_forecast([], movements, TODAY).rows() == []
+    assert by_name(build_forecast(supplies, [], TODAY))["Pencil"][2] == 0
+
+
+def test_season():
+    supplies = [(1, "Notebook", 1000)]
+    # A year ago the two weeks after this date took five times the usual rate
+    year_ago = TODAY - datetime.timedelta(days=YEAR_DAYS)
+    movements = daily(1, YEAR_DAYS + 60, 1)
+    movements = [(day, supply_id, donated, 5 if year_ago <= day < year_ago + datetime.timedelta(days=14) else withdrawn)
+                 for day, supply_id, donated, withdrawn in movements]
+    forecast = build_forecast(supplies, movements, TODAY, lead_days=14)
+    assert forecast.season[0] == 3.0  # Clipped to the upper limit
+    assert forecast.forecast_rate[0] == pytest.approx(3.0)
+    assert build_forecast(supplies, movements, TODAY, lead_days=YEAR_DAYS).season[0] > 0
+
+
+@pytest.mark.parametrize("lead_days", [0, -5, YEAR_DAYS + 1])
+def test_lead_days_out_of_range(db, lead_days):
+    with pytest.raises(ValueError):
+        build_forecast([(1, "Pencil", 10)], daily(1, YEAR_DAYS + 60, 1), TODAY, lead_days=lead_days)
+    with pytest.raises(ValueError):
+        forecast_demand(db, lead_days=lead_days)
+
+
+def test_cli_lead_days(db, monkeypatch, capsys):
+    monkeypatch.setattr(cli, "_connect", lambda **options: db)
+    assert cli.main(["forecast", "--lead-days", "0"]) == 2
+    assert "--lead-days" in capsys.readouterr().err
+    assert cli.main(["forecast", "--lead-days", str(YEAR_DAYS)]) == 0
+    assert "Supply Name" in capsys.readouterr().out
+
+
+def test_forecast_demand(db):
+    assert db.add_donation("Ana Cruz", "09171234567", "Lahug", "Cebu City", "Cebu", "Pencil", 10)
+    assert db.withdraw_supply("Pencil", 4)[0]
+    rows = by_name(forecast_demand(db, today=datetime.date.today() + datetime.timedelta(days=2)))
+    assert rows["Pencil"][1] == 6
+    assert rows["Pencil"][2] == round(4 / 28, 2)
@@ -0,0 +1,64 @@
+# Bulk import: rows are written batch by batch, and every row that can't be imported goes to
+# the error report with the line of the file it is on.
+import csv
+import io
+import json
+
+from classroom_connect import cli
+from classroom_connect.importer import BadRecord, _iter_json, import_donations
+
+DONATION = {"donor_name": "Ana Cruz", "contact_info": "09171234567", "barangay": "Lahug", "city": "Cebu City",
+            "province": "Cebu", "supply_name": "Pencil", "quantity": 5}
+
+
+def read_report(path):
+    with open(path, newline="", encoding="utf-8") as file:
+        return [(row["line"], row["error"]) for row in csv.DictReader(file)]
+
+
+def pencils(db):
+    return dict(db.get_all_supplies()).get("Pencil", 0)
+
+
+def test_csv_report_lines(db, tmp_path):
+    path = tmp_path / "donations.csv"
+    path.write_text("Donor Name,Contact Info,Barangay,City,Province,Supply Name,Quantity\n"
+                    "Ana Cruz,09171234567,Lahug,Cebu City,Cebu,Pencil,5\n"
+                    "\"Ben\nReyes\",not a contact,Lahug,Cebu City,Cebu,Pencil,5\n"
+                    "Carla Diaz,09171234567,Lahug,Cebu City,Cebu,Pencil,-1\n", encoding="utf-8")
+    summary = import_donations(db, str(path), batch_size=2)
+    assert (summary["rows"], summary["imported"], summary["failed"]) == (3, 1, 2)
+    assert summary["error_report"] == str(path) + ".errors.csv"
+    assert [line for line, _ in read_report(summary["error_report"])] == ["3", "5"]
+    assert pencils(db) == 5
+
+
+def test_json_bad_records(db, tmp_path):
+    path = tmp_path / "donations.jsonl"
+    path.write_text("\n".join([json.dumps(DONATION), '{"donor_name": "Ben", "quantity": }', "[1, 2]", '"text"',
+                               json.dumps(DONATION)]) + "\n", encoding="utf-8")
+    summary = import_donations(db, str(path))
+    assert (summary["rows"], summary["imported"], summary["failed"]) == (5, 2, 3)
+    report = read_report(summary["error_report"])
+    assert [line for line, _ in report] == ["2", "3", "4"]
+    assert report[0][1].startswith("Invalid JSON")
+    assert report[1][1] == "Expected a JSON object, got list"
+    assert pencils(db) == 10
+
+
+def test_json_array_resumes_after_bad_element():
+    text = "[\n" + ",\n".join([json.dumps(DONATION, indent=2), '{\n  "donor_name": "Ben",\n  "quantity": 5,,\n}',
+                               json.dumps(DONATION, indent=2), "[1, 2]"]) + "\n]\n"
+    lines = text.split("\n")
+    assert (lines[10], lines[23]) == ("{", "[1, 2]")
+    # Small chunks, so records are cut off at the end of the buffer as well
+    for chunk_size in (7, 64, 65536):
+        records = list(_iter_json(io.StringIO(text), chunk_size=chunk_size))
+        assert [line for line, _ in records] == [2, 11, 15, 24]
+        assert [type(record) for _, record in records] == [dict, BadRecord, dict, BadRecord]
+
+
+def test_cli_missing_file(db, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(cli, "_connect", lambda **options: db)
+    assert cli.main(["import", str(tmp_path / "missing.csv")]) == 1
+    assert "Could not import" in capsys.readouterr().err
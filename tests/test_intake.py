@@ -0,0 +1,108 @@
+# The intake queue commits every acknowledged donation exactly once: in batches while running,
+# from the journal after a crash, or into the rejected file when the database refuses it.
+import json
+import os
+
+import pytest
+
+from classroom_connect import intake
+from classroom_connect.intake import IntakeQueue
+
+
+def donation(donor="Ana Cruz", quantity=1):
+    return (donor, "09171234567", "Lahug", "Cebu City", "Cebu", "Pencil", quantity)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "intake.journal")
+
+
+def pencils(db):
+    return dict(db.get_all_supplies()).get("Pencil", 0)
+
+
+def test_submit_and_close(db, journal):
+    queue = IntakeQueue(db, journal, batch_size=3)
+    seqs = [queue.submit(*donation(quantity=2)) for _ in range(10)]
+    assert seqs == list(range(1, 11))
+    assert queue.close(timeout=10)
+    assert pencils(db) == 20
+    assert db.get_intake_checkpoint(queue.queue_id) == 10
+    with pytest.raises(RuntimeError):
+        queue.submit(*donation())
+
+
+def test_replay_after_crash(db, journal):
+    # Entries 1 and 2 were committed before the crash, 3 and 4 only journaled, and the last
+    # line was cut short while it was being written
+    with open(journal, "w", encoding="utf-8") as file:
+        file.write(json.dumps({"queue": "crashed"}) + "\n")
+        for seq in range(1, 5):
+            file.write(json.dumps({"seq": seq, "donation": donation(quantity=seq)}) + "\n")
+        file.write('{"seq": 5, "dona')
+    assert db.save_intake_checkpoint("crashed", 2)
+
+    queue = IntakeQueue(db, journal)
+    assert queue.queue_id == "crashed"
+    assert queue.submit(*donation(quantity=5)) == 5
+    assert queue.close(timeout=10)
+    assert pencils(db) == 3 + 4 + 5
+    with open(journal, encoding="utf-8") as file:
+        assert [json.loads(line).get("seq") for line in file] == [None, 1, 2, 3, 4, 5]
+
+    # Everything is committed, opening it again replays nothing
+    queue = IntakeQueue(db, journal)
+    assert queue.backlog() == 0
+    assert queue.close()
+    assert pencils(db) == 12
+
+
+def test_refused_entry_rejected(db, journal, monkeypatch):
+    monkeypatch.setattr(intake, "RETRY_DELAY", 0.01)
+    queue = IntakeQueue(db, journal, linger=0.05)
+    for donor in ["Ana Cruz", "Ben Reyes", None, "Carla Diaz"]:
+        queue.submit(*donation(donor))
+    assert queue.close(timeout=10)
+    assert queue.rejected == 1
+    assert [row[0] for row in db.get_all_donations()] == ["Ana Cruz", "Ben Reyes", "Carla Diaz"]
+    with open(queue.rejected_path, encoding="utf-8") as file:
+        rejected = [json.loads(line) for line in file]
+    assert [(entry["seq"], entry["donation"][0]) for entry in rejected] == [(3, None)]
+    assert db.get_intake_checkpoint(queue.queue_id) == 4
+
+
+def test_unreachable_database(db, journal, monkeypatch):
+    monkeypatch.setattr(db, "add_donations_batch", lambda *args, **kwargs: (False, "Lost connection"))
+    monkeypatch.setattr(db, "get_change_version", lambda: None)
+    queue = IntakeQueue(db, journal)
+    for _ in range(3):
+        queue.submit(*donation())
+    # Nothing is given up on while the database is down, close leaves it in the journal
+    assert not queue.close(timeout=0.2)
+    assert not queue.writer.is_alive()
+    assert (queue.backlog(), queue.rejected) == (3, 0)
+
+    # Replayed from the journal once the database is back
+    monkeypatch.undo()
+    queue = IntakeQueue(db, journal)
+    assert queue.close(timeout=10)
+    assert pencils(db) == 3
+
+
+@pytest.mark.parametrize("durable", [True, False])
+def test_compact_once_durable(db, journal, monkeypatch, durable):
+    monkeypatch.setattr(intake, "COMPACT_BYTES", 1)
+    monkeypatch.setattr(db, "sync_commits", lambda: durable)
+    queue = IntakeQueue(db, journal)
+    header = os.path.getsize(journal)
+    queue.submit(*donation())
+    assert queue.flush(timeout=10)
+    assert queue.close()
+    # The journal is only cut once the database says the commit survives a power loss
+    assert (os.path.getsize(journal) == header) == durable
+
+
+def test_sync_commits(db):
+    assert db.add_donation(*donation()[:6], 1)
+    assert db.sync_commits()
@@ -0,0 +1,48 @@
+# Stock is kept per location: donations and withdrawals change their own stockroom, transfers
+# move stock between two without changing the total
+from classroom_connect.backends.base import DEFAULT_LOCATION
+
+
+def test_transfers(db):
+    assert db.add_location("Annex") == (True, "Location Annex added")
+    assert db.add_donation("Ana Cruz", "09171234567", "Lahug", "Cebu City", "Cebu", "Pencil", 10)
+
+    assert db.transfer_stock("Pencil", 4, DEFAULT_LOCATION, "Annex") == (True, "Transfer successful", 6)
+    assert ("Pencil", 6) in db.get_location_stock()
+    assert ("Pencil", 4) in db.get_location_stock("Annex")
+    assert ("Pencil", 10) in db.get_all_supplies()
+    assert [row[1:5] for row in db.get_transfers()] == [("Pencil", DEFAULT_LOCATION, "Annex", 4)]
+
+    # Withdrawals only take what is on hand at their own location
+    assert db.withdraw_supply("Pencil", 5, location="Annex") == (False, "Not enough supply available", None)
+    assert db.withdraw_supply("Pencil", 4, location="Annex") == (True, "Withdrawal successful", 0)
+    assert ("Pencil", 6) in db.get_all_supplies()
+    assert db.reconcile_stock(full=True)[2] == []
+
+
+def test_transfer_refusals(db):
+    assert db.add_location("Annex")[0]
+    assert db.add_donation("Ana Cruz", "09171234567", "Lahug", "Cebu City", "Cebu", "Pencil", 3)
+    for quantity in (0, -2):
+        assert db.transfer_stock("Pencil", quantity, DEFAULT_LOCATION, "Annex") == (
+            False, "Quantity must be greater than 0", None)
+    assert db.transfer_stock("Pencil", 4, DEFAULT_LOCATION, "Annex") == (False, "Not enough supply available", None)
+    assert db.transfer_stock("Pencil", 1, "Annex", "Annex") == (
+        False, "Stock can only be transferred to another location", None)
+    assert db.transfer_stock("Pencil", 1, DEFAULT_LOCATION, "Nowhere") == (False, "Location not found", None)
+    assert db.transfer_stock("Chalk", 1, DEFAULT_LOCATION, "Annex") == (False, "Supply not found", None)
+    # Nothing moved
+    assert ("Pencil", 3) in db.get_location_stock()
+    assert ("Pencil", 0) in db.get_location_stock("Annex")
+    assert db.get_transfers() == []
+
+
+def test_stock_by_location(db):
+    assert db.add_location("Annex")[0]
+    assert db.add_donation("Ana Cruz", "09171234567", "Lahug", "Cebu City", "Cebu", "Pencil", 5, location="Annex")
+    assert db.add_donation("Ben Reyes", "09181234567", "", "Cebu City", "Cebu", "Pencil", 2)
+    names, rows = db.get_stock_by_location()
+    assert names == ["Annex", DEFAULT_LOCATION]
+    assert ("Pencil", 7, 5, 2) in rows
+    assert db.add_location("Annex") == (False, "Location Annex already exists")
+    assert ("Annex", 5, 1) in db.get_locations()
@@ -0,0 +1,89 @@
+# Listing and report reads go to a replica when it can serve them, the primary otherwise. Under
+# SQLite the replica is a second database file, kept current here with the backup API.
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from classroom_connect.database import DatabaseConnection
+
+
+def copy(source, target):
+    with closing(sqlite3.connect(source)) as primary, closing(sqlite3.connect(target)) as replica:
+        primary.backup(replica)
+
+
+@pytest.fixture
+def replica_path(db, db_path, tmp_path):
+    # The primary, migrated by the db fixture, copied before any records are written
+    path = str(tmp_path / "replica.sqlite3")
+    copy(db_path, path)
+    return path
+
+
+def connect(db_path, replica_path, **options):
+    return DatabaseConnection(db_config={"path": db_path}, backend="sqlite", metrics=False, replica=replica_path,
+                              **options)
+
+
+def donate(db, quantity=1):
+    assert db.add_donation("Ana Cruz", "09171234567", "Lahug", "Cebu City", "Cebu", "Pencil", quantity)
+
+
+def test_reads_own_writes(db_path, replica_path):
+    db = connect(db_path, replica_path)
+    try:
+        assert db.get_all_donations() == []
+        assert db.replica_stats()["replica"] == 1
+
+        # The replica hasn't seen this session's write, the read goes to the primary
+        donate(db)
+        assert len(db.get_all_donations()) == 1
+        assert db.replica_stats()["behind"] == 1
+
+        copy(db_path, replica_path)
+        assert len(db.get_all_donations()) == 1
+        stats = db.replica_stats()
+        assert (stats["replica"], stats["behind"]) == (2, 1)
+    finally:
+        db.close()
+
+
+def test_other_sessions_read_replica(db, db_path, replica_path):
+    # Writes of another client don't hold this one's reads back, they show once replicated
+    reader = connect(db_path, replica_path)
+    try:
+        donate(db)
+        assert reader.get_all_donations() == []
+        copy(db_path, replica_path)
+        assert len(reader.get_all_donations()) == 1
+        assert reader.replica_stats()["replica"] == 2
+    finally:
+        reader.close()
+
+
+def test_unavailable_replica(db, db_path, tmp_path):
+    donate(db, 4)
+    # An empty file has none of the tables, the first read fails over to the primary
+    reader = connect(db_path, str(tmp_path / "empty.sqlite3"))
+    try:
+        assert len(reader.get_all_donations()) == 1
+        assert ("Pencil", 4, 4, 0) in reader.get_stock_report()
+        stats = reader.replica_stats()
+        assert stats["replica"] == 0
+        assert stats["unavailable"] == 2
+    finally:
+        reader.close()
+
+
+def test_busy_replica(db_path, replica_path):
+    db = connect(db_path, replica_path, pool_size=1)
+    try:
+        held = db.replica.pool.acquire()
+        try:
+            assert db.get_all_donations() == []
+        finally:
+            db.replica.pool.release(held)
+        assert db.replica_stats()["busy"] == 1
+    finally:
+        db.close()
@@ -0,0 +1,56 @@
+# The summary tables are kept up to date by every write and agree with a rebuild from the records
+import datetime
+
+from classroom_connect.reports import period_range
+
+
+def record(db):
+    assert db.add_donation("Ana Cruz", "09171234567", "Lahug", "Cebu City", "Cebu", "Pencil", 10)
+    assert db.add_donations_batch([
+        ("Ben Reyes", "ben@example.com", "", "Davao City", "Davao del Sur", "Pencil", 4),
+        ("Ana Cruz", "09171234567", "Mabolo", "Cebu City", "Cebu", "Notebook", 6),
+        ("Carla Diaz", "09181234567", "", "Mandaue City", "Cebu", "Notebook", 1),
+    ]) == (True, "Recorded 3 donations")
+    assert db.withdraw_supply("Pencil", 3)[0]
+
+
+def totals(db):
+    return (db.get_supply_totals(period="day"), db.get_supply_totals(), db.get_top_donors(),
+            db.get_location_totals(), db.get_location_totals(by="city"))
+
+
+def test_summaries_follow_writes(db):
+    record(db)
+    by_day, by_month, donors, provinces, cities = totals(db)
+    assert [row[1:] for row in by_day] == [("Notebook", 7, 0), ("Pencil", 14, 3)]
+    assert [row[1:] for row in by_month] == [row[1:] for row in by_day]
+    assert by_month[0][0] == by_day[0][0].replace(day=1)
+    assert donors == [("Ana Cruz", "09171234567", 16, 2), ("Ben Reyes", "ben@example.com", 4, 1),
+                      ("Carla Diaz", "09181234567", 1, 1)]
+    assert provinces == [("Cebu", 17, 3), ("Davao del Sur", 4, 1)]
+    assert cities == [("Cebu", "Cebu City", 16, 2), ("Davao del Sur", "Davao City", 4, 1), ("Cebu", "Mandaue City", 1, 1)]
+
+
+def test_rebuild_matches(db):
+    record(db)
+    before = totals(db)
+    success, message = db.rebuild_summaries()
+    assert success, message
+    assert totals(db) == before
+
+
+def test_date_range(db):
+    record(db)
+    day = db.get_supply_totals(period="day")[0][0]
+    assert db.get_supply_totals(day, day, period="day") == db.get_supply_totals(period="day")
+    assert db.get_supply_totals(day + datetime.timedelta(days=1)) == []
+    assert db.get_top_donors(limit=1) == [("Ana Cruz", "09171234567", 16, 2)]
+
+
+def test_period_range():
+    today = datetime.date(2024, 12, 15)
+    assert period_range("This Month", today) == (datetime.date(2024, 12, 1), today)
+    assert period_range("This Quarter", today) == (datetime.date(2024, 10, 1), today)
+    assert period_range("Last 12 Months", today) == (datetime.date(2024, 1, 1), today)
+    assert period_range("Last 12 Months", datetime.date(2024, 3, 31)) == (datetime.date(2023, 4, 1), datetime.date(2024, 3, 31))
+    assert period_range("All Time", today) == (None, None)
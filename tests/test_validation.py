@@ -0,0 +1,85 @@
+# The batch validation rules give the same answer for a record whichever path it comes through,
+# with every failed field reported in form order
+from classroom_connect.validation import CONTACT_ERROR, validate_donation, validate_donations, validate_requests
+
+GOOD = {"donor_name": " Ana Cruz ", "contact_info": "09171234567", "barangay": "", "city": "Cebu City",
+        "province": "Cebu", "supply_name": "Pencil", "quantity": "5"}
+
+
+def donation(**changes):
+    return dict(GOOD, **changes)
+
+
+def test_valid_batch():
+    records = [donation(), donation(contact_info="ana@example.com", quantity=7),
+               donation(contact_info="+63917123456", quantity=" 2147483647 ")]
+    donations, errors = validate_donations(records)
+    assert errors == []
+    assert [i for i, _ in donations] == [0, 1, 2]
+    assert donations[0][1] == ("Ana Cruz", "09171234567", "", "Cebu City", "Cebu", "Pencil", 5)
+    assert [donation[6] for _, donation in donations] == [5, 7, 2147483647]
+
+
+def test_errors_in_record_and_form_order():
+    records = [
+        donation(donor_name="", quantity="0"),
+        donation(),
+        donation(contact_info="0917", supply_name="Select an item", quantity="ten"),
+        {"donor_name": "Ben"},
+    ]
+    donations, errors = validate_donations(records)
+    assert [i for i, _ in donations] == [1]
+    assert errors == [
+        (0, "donor_name", "Please fill in the Donor Name field"),
+        (0, "quantity", "Quantity must be greater than 0"),
+        (2, "contact_info", CONTACT_ERROR),
+        (2, "supply_name", "Please fill in the Supply Name field"),
+        (2, "quantity", "Quantity must be a valid number"),
+        (3, "contact_info", CONTACT_ERROR),
+        (3, "city", "Please fill in the City field"),
+        (3, "province", "Please fill in the Province field"),
+        (3, "supply_name", "Please fill in the Supply Name field"),
+        (3, "quantity", "Please fill in the Quantity field"),
+    ]
+
+
+def test_contacts():
+    contacts = ["09171234567", "0917123456", "ana@example", "+63917123456", "a.b+c@mail.example.ph",
+                "09171234567\n09171234567", "09171234567 x", ""]
+    _, errors = validate_donations([donation(contact_info=contact) for contact in contacts])
+    assert [i for i, field, _ in errors if field == "contact_info"] == [1, 2, 5, 6, 7]
+
+
+def test_quantity_limits():
+    _, errors = validate_donations([donation(quantity=quantity) for quantity in
+                                    ["-3", "2147483648", "1.5", "+4", "", "٣"]])
+    assert [(i, message) for i, _, message in errors] == [
+        (0, "Quantity must be greater than 0"),
+        (1, "Quantity cannot exceed 2,147,483,647"),
+        (2, "Quantity must be a valid number"),
+        (4, "Please fill in the Quantity field"),
+        (5, "Quantity must be a valid number"),
+    ]
+
+
+def test_validate_donation():
+    assert validate_donation(donation()) is None
+    assert validate_donation(donation(city=" ", quantity="-1")) == "Please fill in the City field"
+
+
+def test_requests():
+    records = [
+        {"classroom": " Grade 1-A ", "supply_name": "Pencil", "quantity": "30"},
+        {"classroom": "Grade 2-B", "supply_name": "Notebook", "quantity": 5, "priority": "-2"},
+        {"classroom": "", "supply_name": "Select an item", "quantity": "0", "priority": "high"},
+        {"classroom": "Grade 3-C", "supply_name": "Crayons", "quantity": "4", "priority": "2147483648"},
+    ]
+    requests, errors = validate_requests(records)
+    assert requests == [(0, ("Grade 1-A", "Pencil", 30, 0)), (1, ("Grade 2-B", "Notebook", 5, -2))]
+    assert errors == [
+        (2, "classroom", "Please fill in the Classroom field"),
+        (2, "supply_name", "Please fill in the Supply Name field"),
+        (2, "quantity", "Quantity must be greater than 0"),
+        (2, "priority", "Priority must be a whole number"),
+        (3, "priority", "Priority must be a whole number"),
+    ]